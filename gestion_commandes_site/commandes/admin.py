@@ -1,22 +1,103 @@
 from django.contrib import admin
-from django.core.mail import send_mail
 from django.conf import settings
-from .models import Fournisseur, Livraison, Produit, Commande, LigneCommande
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils import timezone
+from django.utils.functional import cached_property
+from .models import (
+    AbonnementWebhook, Commande, EnvoiWebhook, Fournisseur, LigneCommande, Livraison, Produit, ReleveVersement,
+    TarifZone, ZoneLivraison,
+)
+from .roles import invalider_role_fournisseur
 
 
+class EstimatedCountPaginator(Paginator):
+    """Paginator qui évite le COUNT(*) complet sur les grosses tables non filtrées.
 
-admin.site.register(Commande)
-admin.site.register(LigneCommande)
+    Sans filtre, le nombre de lignes est lu dans les statistiques du moteur
+    (pg_class.reltuples sous PostgreSQL, sqlite_stat1 sous SQLite après ANALYZE).
+    En dessous de SEUIL lignes, ou si aucune estimation n'est disponible, le
+    comptage exact est conservé.
+    """
+    SEUIL = 10000
 
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if getattr(qs, 'query', None) is not None and not qs.query.where:
+            estimation = self._estimation(qs)
+            if estimation is not None and estimation >= self.SEUIL:
+                return estimation
+        return super().count
 
+    @staticmethod
+    def _estimation(qs):
+        connection = connections[qs.db]
+        table = qs.model._meta.db_table
+        try:
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+                elif connection.vendor == 'sqlite':
+                    cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+                else:
+                    return None
+                row = cursor.fetchone()
+        except Exception:
+            # Table de statistiques absente (pas encore d'ANALYZE)
+            return None
+        if not row or row[0] is None:
+            return None
+        return int(str(row[0]).split()[0])
 
-# ...existing code...
 
-@admin.register(Livraison)
-class LivraisonAdmin(admin.ModelAdmin):
-    list_display = ('commande', 'statut', 'date_prevue', 'date_effective')
+class GrosseTableAdmin(admin.ModelAdmin):
+    """Réglages communs aux tables volumineuses (commandes, lignes, livraisons)."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+class LigneCommandeInline(admin.TabularInline):
+    model = LigneCommande
+    extra = 0
+    autocomplete_fields = ('produit',)
+
+
+@admin.register(Commande)
+class CommandeAdmin(GrosseTableAdmin):
+    list_display = ('id', 'client', 'statut', 'date_commande')
+    list_select_related = ('client',)
     list_filter = ('statut',)
-# ...existing code...
+    date_hierarchy = 'date_commande'
+    # Recherches exactes uniquement (pas de LIKE '%...%' sur 1M de lignes)
+    search_fields = ('=id', '=client__username')
+    raw_id_fields = ('client',)
+    inlines = [LigneCommandeInline]
+
+
+@admin.register(LigneCommande)
+class LigneCommandeAdmin(GrosseTableAdmin):
+    list_display = ('id', 'commande_id', 'produit', 'quantite', 'prix_unitaire')
+    list_select_related = ('produit',)
+    search_fields = ('=commande__id',)
+    raw_id_fields = ('commande',)
+    autocomplete_fields = ('produit',)
+
+
+@admin.register(Livraison)
+class LivraisonAdmin(GrosseTableAdmin):
+    list_display = ('numero_commande', 'statut', 'transport', 'date_prevue', 'date_effective')
+    list_filter = ('statut', 'transport')
+    date_hierarchy = 'date_prevue'
+    search_fields = ('=commande__id',)
+    raw_id_fields = ('commande',)
+
+    @admin.display(description='Commande', ordering='commande_id')
+    def numero_commande(self, obj):
+        # commande_id évite une requête par ligne sur la table des commandes
+        return f"#{obj.commande_id}"
+
 
 @admin.register(Fournisseur)
 class FournisseurAdmin(admin.ModelAdmin):
@@ -28,7 +109,12 @@ class FournisseurAdmin(admin.ModelAdmin):
     def approve_fournisseurs(self, request, queryset):
         """Action admin: marque les fournisseurs sélectionnés comme approuvés.
         Envoie un e-mail si la configuration d'e-mail est présente (utile en dev with console backend)."""
-        updated = queryset.update(approved=True)
+        # Import différé : l'envoi d'e-mails ne sert qu'à cette action
+        from django.core.mail import send_mail
+
+        # update() ne passe pas par save() : updated_at (auto_now) est renseigné ici
+        updated = queryset.update(approved=True, updated_at=timezone.now())
+        invalider_role_fournisseur(*queryset.values_list('user_id', flat=True))
         # envoyer un e-mail de notification si possible
         for f in queryset:
             try:
@@ -48,7 +134,8 @@ class FournisseurAdmin(admin.ModelAdmin):
     approve_fournisseurs.short_description = 'Approuver les fournisseurs sélectionnés'
 
     def revoke_approval(self, request, queryset):
-        updated = queryset.update(approved=False)
+        updated = queryset.update(approved=False, updated_at=timezone.now())
+        invalider_role_fournisseur(*queryset.values_list('user_id', flat=True))
         self.message_user(request, "%d approbation(s) révoquée(s)." % updated)
 
     revoke_approval.short_description = 'Révoquer l\'approbation des fournisseurs sélectionnés'
@@ -58,3 +145,73 @@ class ProduitAdmin(admin.ModelAdmin):
     list_display = ('nom', 'fournisseur', 'prix', 'is_active')
     list_filter = ('is_active', 'fournisseur')
     search_fields = ('nom', 'slug')
+
+
+@admin.register(ReleveVersement)
+class ReleveVersementAdmin(admin.ModelAdmin):
+    """Consultation seule : les relevés sont créés par la commande calculer_versements."""
+    list_display = ('fournisseur', 'debut', 'fin', 'ventes_brutes', 'commission', 'net', 'nb_commandes')
+    list_select_related = ('fournisseur',)
+    list_filter = ('debut',)
+    search_fields = ('fournisseur__nom',)
+    actions = ['exporter_csv']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description='Exporter les relevés sélectionnés (CSV)')
+    def exporter_csv(self, request, queryset):
+        from django.http import HttpResponse
+        from .versements import exporter_csv
+
+        response = HttpResponse(content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="releves_versement.csv"'
+        exporter_csv(queryset.order_by('debut', 'fournisseur_id'), response)
+        return response
+
+
+class TarifZoneInline(admin.TabularInline):
+    model = TarifZone
+    extra = 1
+
+
+@admin.register(ZoneLivraison)
+class ZoneLivraisonAdmin(admin.ModelAdmin):
+    list_display = ('nom', 'prefixes_postaux', 'ordre', 'actif')
+    list_filter = ('actif',)
+    list_editable = ('ordre', 'actif')
+    search_fields = ('nom', 'villes', 'prefixes_postaux')
+    inlines = [TarifZoneInline]
+
+
+@admin.register(AbonnementWebhook)
+class AbonnementWebhookAdmin(admin.ModelAdmin):
+    list_display = ('nom', 'url', 'entite', 'actif', 'curseur', 'created_at')
+    list_filter = ('actif', 'entite')
+    search_fields = ('nom', 'url')
+    readonly_fields = ('curseur', 'created_at')
+
+
+@admin.register(EnvoiWebhook)
+class EnvoiWebhookAdmin(admin.ModelAdmin):
+    """Suivi des envois ; la file « morte » se consulte avec le filtre statut = Abandonné."""
+    list_display = ('id', 'abonnement', 'statut', 'nb_evenements', 'tentatives', 'code_http', 'prochain_essai', 'created_at')
+    list_select_related = ('abonnement',)
+    list_filter = ('statut', 'abonnement')
+    readonly_fields = [f.name for f in EnvoiWebhook._meta.fields]
+    actions = ['renvoyer']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Renvoyer les envois abandonnés sélectionnés')
+    def renvoyer(self, request, queryset):
+        from .webhooks import renvoyer
+
+        self.message_user(request, "%d envoi(s) remis en file." % renvoyer(queryset))
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CommandesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'commandes'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .sessions import verifier_cache_partage
+
+        verifier_cache_partage()
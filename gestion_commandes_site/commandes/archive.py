@@ -0,0 +1,136 @@
+"""Archivage des commandes terminées (tables chaudes -> tables froides).
+
+Les commandes livrées ou annulées depuis plus de N jours sont copiées dans
+CommandeArchive / LigneCommandeArchive / LivraisonArchive puis supprimées des
+tables utilisées par les tableaux de bord, par lots et dans une transaction
+par lot. Les liens fournisseur et les positions GPS (réduites au passage)
+sont copiés dans CommandeFournisseurArchive / SegmentPositionsArchive ; les
+notifications fournisseur, déjà envoyées ou périmées, sont supprimées avec
+la commande.
+"""
+import heapq
+from datetime import timedelta
+from operator import attrgetter
+
+from django.db import transaction
+from django.db.models import Prefetch, Q
+from django.utils import timezone
+
+from . import positions
+from .models import (
+    Commande, CommandeFournisseur, LigneCommande, Livraison, SegmentPositions,
+    CommandeArchive, CommandeFournisseurArchive, LigneCommandeArchive, LivraisonArchive, SegmentPositionsArchive,
+)
+
+
+def commandes_archivables(cutoff):
+    """Commandes terminées, antérieures à `cutoff`, dont la livraison (si elle existe) est terminée."""
+    return Commande.objects.filter(
+        statut__in=Commande.STATUTS_TERMINES,
+        date_commande__lt=cutoff,
+    ).filter(
+        Q(livraison__isnull=True) | Q(livraison__statut__in=Livraison.STATUTS_TERMINES)
+    )
+
+
+def _archiver_lot(ids):
+    """Copie puis supprime un lot de commandes. Doit être appelé dans une transaction."""
+    commandes = list(Commande.objects.filter(pk__in=ids))
+    lignes = list(LigneCommande.objects.filter(commande_id__in=ids))
+    livraisons = list(Livraison.objects.filter(commande_id__in=ids))
+
+    CommandeArchive.objects.bulk_create([
+        CommandeArchive(
+            id=c.id, client_id=c.client_id, date_commande=c.date_commande, statut=c.statut,
+        )
+        for c in commandes
+    ])
+    LigneCommandeArchive.objects.bulk_create([
+        LigneCommandeArchive(
+            commande_id=lc.commande_id, produit_id=lc.produit_id, quantite=lc.quantite,
+            prix_unitaire=lc.prix_unitaire,
+        )
+        for lc in lignes
+    ])
+    LivraisonArchive.objects.bulk_create([
+        LivraisonArchive(
+            id=liv.id, commande_id=liv.commande_id, transport=liv.transport,
+            adresse_livraison=liv.adresse_livraison, montant=liv.montant, description=liv.description,
+            date_prevue=liv.date_prevue, date_effective=liv.date_effective, date_livraison=liv.date_livraison,
+            statut=liv.statut, assigned_at=liv.assigned_at, delivered_at=liv.delivered_at,
+        )
+        for liv in livraisons
+    ])
+
+    CommandeFournisseurArchive.objects.bulk_create([
+        CommandeFournisseurArchive(
+            fournisseur_id=lien.fournisseur_id, commande_id=lien.commande_id,
+            date_commande=lien.date_commande, statut=lien.statut,
+        )
+        for lien in CommandeFournisseur.objects.filter(commande_id__in=ids)
+    ])
+    livraison_ids = [liv.id for liv in livraisons]
+    non_reduites = SegmentPositions.objects.filter(livraison_id__in=livraison_ids, reduit=False)
+    positions.reduire_livraisons(list(non_reduites.values_list('livraison_id', flat=True).distinct()))
+    SegmentPositionsArchive.objects.bulk_create([
+        SegmentPositionsArchive(
+            livraison_id=seg.livraison_id, debut=seg.debut, nb_points=seg.nb_points, donnees=seg.donnees,
+        )
+        for seg in SegmentPositions.objects.filter(livraison_id__in=livraison_ids)
+    ])
+
+    # Lignes, livraison, liens, segments et notifications suivent par CASCADE
+    Commande.objects.filter(pk__in=ids).delete()
+    return len(commandes)
+
+
+def archiver_commandes(jours=90, batch_size=500, dry_run=False):
+    """Archive les commandes terminées depuis plus de `jours` jours.
+
+    Retourne le nombre de commandes archivées (ou archivables si dry_run).
+    """
+    cutoff = timezone.now() - timedelta(days=jours)
+    qs = commandes_archivables(cutoff).order_by('pk')
+    if dry_run:
+        return qs.count()
+
+    total = 0
+    last_pk = 0
+    while True:
+        # Pagination par clé : chaque lot relit l'index au lieu d'un OFFSET croissant
+        ids = list(qs.filter(pk__gt=last_pk).values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            total += _archiver_lot(ids)
+        last_pk = ids[-1]
+    return total
+
+
+def prefetch_lignes(model):
+    """Prefetch des lignes (avec produit et fournisseur) adapté à Commande ou CommandeArchive."""
+    lignes = model._meta.get_field('lignes').related_model
+    return Prefetch('lignes', queryset=lignes.objects.select_related('produit__fournisseur'))
+
+
+def historique_commandes(client=None, statut=None, avec_lignes=False):
+    """Itère sur les commandes chaudes puis archivées, fusionnées par date décroissante.
+
+    Les deux requêtes sont lues en flux (iterator) : la mémoire reste bornée
+    même pour un historique volumineux.
+    """
+    hot = Commande.objects.all()
+    cold = CommandeArchive.objects.all()
+    if client is not None:
+        hot = hot.filter(client=client)
+        cold = cold.filter(client=client)
+    if statut:
+        hot = hot.filter(statut=statut)
+        cold = cold.filter(statut=statut)
+    if avec_lignes:
+        # Avec iterator(chunk_size), le préchargement est fait par paquet
+        hot = hot.prefetch_related(prefetch_lignes(Commande))
+        cold = cold.prefetch_related(prefetch_lignes(CommandeArchive))
+    hot = hot.order_by('-date_commande').iterator(chunk_size=500)
+    cold = cold.order_by('-date_commande').iterator(chunk_size=500)
+    return heapq.merge(hot, cold, key=attrgetter('date_commande'), reverse=True)
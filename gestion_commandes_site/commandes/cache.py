@@ -0,0 +1,34 @@
+"""Backends de cache comptant les lectures réussies et manquées (commandes_cache_lectures_total).
+
+À utiliser à la place du backend Django correspondant dans CACHES, par
+exemple 'BACKEND': 'commandes.cache.RedisCache'.
+"""
+from django.core.cache.backends import locmem, redis
+
+from .metriques import CACHE
+
+_ABSENT = object()
+
+
+class _LecturesComptees:
+    def get(self, key, default=None, version=None):
+        valeur = super().get(key, _ABSENT, version)
+        if valeur is _ABSENT:
+            CACHE.inc('miss')
+            return default
+        CACHE.inc('hit')
+        return valeur
+
+
+class LocMemCache(_LecturesComptees, locmem.LocMemCache):
+    # get_many et get_or_set de BaseCache passent par get : déjà comptés
+    pass
+
+
+class RedisCache(_LecturesComptees, redis.RedisCache):
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        valeurs = super().get_many(keys, version)
+        CACHE.inc('hit', n=len(valeurs))
+        CACHE.inc('miss', n=len(keys) - len(valeurs))
+        return valeurs
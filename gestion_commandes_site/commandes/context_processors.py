@@ -0,0 +1,16 @@
+from django.utils.functional import SimpleLazyObject
+
+from .notifications import non_lues
+
+
+def fournisseur(request):
+    """Profil fournisseur résolu par FournisseurProfileMiddleware, pour les templates."""
+    profile = getattr(request, 'fournisseur', None)
+    # Tout est paresseux : le rôle n'est résolu que si le gabarit l'utilise
+    return {
+        'fournisseur_courant': profile,
+        'est_fournisseur': SimpleLazyObject(lambda: bool(profile)),
+        'est_fournisseur_approuve': SimpleLazyObject(lambda: bool(profile and profile.approved)),
+        # Une requête sur index partiel, seulement si le gabarit l'affiche
+        'notifications_non_lues': SimpleLazyObject(lambda: non_lues(profile.pk) if profile else 0),
+    }
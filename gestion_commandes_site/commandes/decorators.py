@@ -6,6 +6,12 @@ def is_fournisseur(user):
     """Renvoie True si l'utilisateur est authentifié et a un fournisseur_profile lié."""
     return user.is_authenticated and hasattr(user, "fournisseur_profile")
 
+def _request_est_fournisseur(request):
+    """Utilise le profil déjà résolu par FournisseurProfileMiddleware quand il est présent."""
+    if hasattr(request, 'fournisseur'):
+        return bool(request.fournisseur)
+    return is_fournisseur(request.user)
+
 def fournisseur_required(view_func=None, login_url='login'):
     """
     Décorateur pour restreindre l'accès aux vues aux seuls fournisseurs.
@@ -21,7 +27,7 @@ def fournisseur_required(view_func=None, login_url='login'):
         def _wrapped(request, *args, **kwargs):
             if not request.user.is_authenticated:
                 return redirect(login_url)
-            if not is_fournisseur(request.user):
+            if not _request_est_fournisseur(request):
                 raise PermissionDenied
             return func(request, *args, **kwargs)
         return _wrapped
@@ -0,0 +1,89 @@
+"""Exports CSV partagés entre les vues (téléchargement direct) et les jobs de rapport.
+
+Chaque export retourne (entête, total, lots) : `lots` produit, pour chaque
+unité d'avancement (une commande, un produit), la liste des lignes CSV
+correspondantes. `total` est le nombre d'unités, utilisé pour la progression.
+
+Les montants viennent du prix figé sur chaque ligne ; une ligne sans prix
+(antérieure à `prix_unitaire`) est exportée sans prix ni total.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Count, F, Q, Sum
+
+from .archive import historique_commandes
+from .models import Commande, CommandeArchive, LigneCommande, LigneCommandeArchive, Produit
+
+
+CENTIME = Decimal('0.01')
+ENTETE_COMMANDES = ['id', 'date_commande', 'produit', 'fournisseur', 'quantite', 'prix_unitaire', 'total', 'statut']
+ENTETE_VENTES = ['produit', 'slug', 'prix_unitaire', 'quantite_vendue', 'montant', 'lignes_sans_prix']
+
+
+def _lignes_commande(c):
+    lignes = []
+    for lc in c.lignes.all():
+        produit = lc.produit
+        prix_unitaire = lc.prix_unitaire
+        lignes.append([
+            c.id,
+            c.date_commande.isoformat(),
+            produit.nom if produit else '',
+            produit.fournisseur.nom if produit else '',
+            lc.quantite,
+            '' if prix_unitaire is None else str(prix_unitaire),
+            '' if prix_unitaire is None else str(prix_unitaire * lc.quantite),
+            c.statut,
+        ])
+    return lignes
+
+
+def export_commandes(statut=None):
+    """Une ligne CSV par ligne de commande, commandes courantes et archivées."""
+    total = 0
+    for model in (Commande, CommandeArchive):
+        qs = model.objects.all()
+        if statut:
+            qs = qs.filter(statut=statut)
+        total += qs.count()
+    lots = (_lignes_commande(c) for c in historique_commandes(statut=statut, avec_lignes=True))
+    return ENTETE_COMMANDES, total, lots
+
+
+def export_ventes_fournisseur(fournisseur_id, debut=None, fin=None):
+    """Quantités et montants vendus par produit du fournisseur (lignes courantes et archivées).
+
+    `debut` / `fin` : bornes ISO 8601 sur la date de commande, [debut, fin[.
+    `prix_unitaire` est le prix actuel du catalogue ; `montant` somme les prix
+    payés, hors lignes sans prix (comptées dans `lignes_sans_prix`).
+    """
+    ventes = defaultdict(lambda: [0, Decimal('0'), 0])
+    for model in (LigneCommande, LigneCommandeArchive):
+        qs = model.objects.filter(produit__fournisseur_id=fournisseur_id)
+        if debut:
+            qs = qs.filter(commande__date_commande__gte=debut)
+        if fin:
+            qs = qs.filter(commande__date_commande__lt=fin)
+        agregats = qs.order_by().values_list('produit_id').annotate(
+            q=Sum('quantite'),
+            m=Sum(F('quantite') * F('prix_unitaire')),
+            n=Count('id', filter=Q(prix_unitaire__isnull=True)),
+        )
+        for produit_id, quantite, montant, sans_prix in agregats:
+            cumul = ventes[produit_id]
+            cumul[0] += quantite
+            cumul[1] += montant or 0
+            cumul[2] += sans_prix
+    produits = Produit.objects.filter(fournisseur_id=fournisseur_id).order_by('nom').only('nom', 'slug', 'prix')
+    lots = (
+        [[p.nom, p.slug, str(p.prix), ventes[p.pk][0], str(ventes[p.pk][1].quantize(CENTIME)), ventes[p.pk][2]]]
+        for p in produits.iterator(chunk_size=500)
+        if p.pk in ventes
+    )
+    return ENTETE_VENTES, len(ventes), lots
+
+EXPORTS = {
+    'commandes_csv': export_commandes,
+    'ventes_fournisseur_csv': export_ventes_fournisseur,
+}
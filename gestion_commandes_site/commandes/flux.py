@@ -0,0 +1,240 @@
+"""Flux temps réel des changements de statut (Server-Sent Events).
+
+Source : le journal EvenementStatut, dont l'id croissant sert de curseur.
+Dans chaque processus ASGI, une seule tâche (le Diffuseur) interroge le
+journal toutes les FLUX_INTERVALLE secondes (`id > curseur`, parcours de la
+clé primaire) tant qu'au moins un client est connecté, et répartit les
+nouveaux événements dans la file de chaque abonné : le coût en base ne
+dépend pas du nombre de clients.
+
+Un id est attribué à l'INSERT mais visible au commit : un événement peut
+apparaître sous le dernier id lu. Le Diffuseur relit donc la plage des ids
+de moins de JOURNAL_DELAI_COMMIT secondes (voir EvenementStatut.ids_stables)
+et diffuse une fois chaque événement validé en retard ; un client qui se
+reconnecte peut alors recevoir de nouveau quelques événements.
+
+À la (re)connexion, le navigateur envoie l'en-tête Last-Event-ID ; les
+événements manqués sont relus une fois, puis le client rejoint la
+diffusion. Sous WSGI (pas de flux long), la réponse contient seulement le
+rattrapage, jusqu'aux événements de plus de JOURNAL_DELAI_COMMIT secondes,
+et se termine : EventSource se reconnecte après `retry` ms, ce qui revient
+à une scrutation indexée par client.
+"""
+import asyncio
+import json
+import time
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import EvenementStatut
+
+# Événements lus par requête de scrutation
+LOT = 500
+# Au-delà, le client a trop de retard : il doit recharger la page
+RATTRAPAGE_MAX = 1000
+# Événements en attente au-delà desquels un client trop lent est déconnecté
+FILE_MAX = 1000
+RETRY_MS = 3000
+
+ENTITES = {code: label.lower() for code, label in EvenementStatut.ENTITE_CHOICES}
+
+
+def _reglage(nom, defaut):
+    return getattr(settings, nom, defaut)
+
+
+def _libelles():
+    from .models import Commande, Livraison
+
+    return {
+        EvenementStatut.ENTITE_COMMANDE: dict(Commande._meta.get_field('statut').choices),
+        EvenementStatut.ENTITE_LIVRAISON: dict(Livraison._meta.get_field('statut').choices),
+    }
+
+
+LIBELLES = _libelles()
+
+
+def message(evenement):
+    """Événement SSE `statut` (l'id SSE est celui du journal)."""
+    code = evenement.statut_code
+    donnees = json.dumps({
+        'entite': ENTITES[evenement.entite],
+        'id': evenement.entite_id,
+        'statut': code,
+        'libelle': str(LIBELLES[evenement.entite].get(code, code)),
+        'horodatage': evenement.horodatage.isoformat(),
+    })
+    return f"id: {evenement.pk}\nevent: statut\ndata: {donnees}\n\n"
+
+
+def _condition(cles, entite):
+    if cles is not None:
+        cond = Q(pk__in=[])
+        for ent, ident in cles:
+            cond |= Q(entite=ent, entite_id=ident)
+        return cond
+    if entite is not None:
+        return Q(entite=entite)
+    return Q()
+
+
+class Abonne:
+    """Un client connecté : filtre (paires (entité, id) ou entité seule) et file d'événements."""
+
+    def __init__(self, cles=None, entite=None):
+        self.cles = cles
+        self.entite = entite
+        self.file = asyncio.Queue()
+        self.deborde = False
+
+    def accepte(self, evenement):
+        if self.cles is not None:
+            return (evenement.entite, evenement.entite_id) in self.cles
+        return self.entite is None or evenement.entite == self.entite
+
+    def pousser(self, texte):
+        if self.file.qsize() >= FILE_MAX:
+            # Client trop lent : fin du flux, il se reconnectera avec Last-Event-ID
+            self.deborde = True
+            self.file.put_nowait(None)
+            return False
+        self.file.put_nowait(texte)
+        return True
+
+
+class Diffuseur:
+    """Scrutation unique du journal, partagée par les abonnés d'une boucle asyncio.
+
+    `stable` : id sous lequel plus aucun événement ne peut apparaître ;
+    `diffuses` : {id: horodatage} des événements déjà diffusés au-dessus.
+    """
+
+    def __init__(self, boucle):
+        self.boucle = boucle
+        self.abonnes = set()
+        self.stable = None
+        self.diffuses = {}
+        self.tache = None
+
+    @property
+    def curseur(self):
+        """Dernier id diffusé."""
+        return max(self.diffuses, default=self.stable)
+
+    async def abonner(self, abonne):
+        """Inscrit l'abonné ; retourne le curseur à partir duquel la diffusion le servira."""
+        if self.stable is None:
+            stable = await EvenementStatut.ids_stables().afirst() or 0
+            recents = {
+                pk: horodatage async for pk, horodatage
+                in EvenementStatut.objects.filter(pk__gt=stable).values_list('pk', 'horodatage')
+            }
+            # Un autre abonné a pu initialiser le curseur pendant l'attente
+            if self.stable is None:
+                self.stable, self.diffuses = stable, recents
+        self.abonnes.add(abonne)
+        if self.tache is None or self.tache.done():
+            self.tache = self.boucle.create_task(self._scruter())
+        return self.curseur
+
+    def desabonner(self, abonne):
+        self.abonnes.discard(abonne)
+
+    async def _lire(self):
+        """Événements validés en retard sous le curseur, puis au plus LOT nouveaux."""
+        retard = []
+        curseur = self.curseur
+        if curseur > self.stable:
+            ids = EvenementStatut.objects.filter(pk__gt=self.stable, pk__lte=curseur).values_list('pk', flat=True)
+            manquants = [pk async for pk in ids if pk not in self.diffuses]
+            if manquants:
+                retard = [e async for e in EvenementStatut.objects.filter(pk__in=manquants).order_by('pk')]
+        nouveaux = [e async for e in EvenementStatut.objects.filter(pk__gt=curseur).order_by('pk')[:LOT]]
+        return retard + nouveaux, len(nouveaux) == LOT
+
+    def _avancer(self, evenements):
+        """Retient les événements diffusés et avance `stable` (même règle que EvenementStatut.ids_stables)."""
+        for e in evenements:
+            self.diffuses[e.pk] = e.horodatage
+        limite = EvenementStatut.limite_stable()
+        anciens = [pk for pk, horodatage in self.diffuses.items() if horodatage <= limite]
+        if anciens:
+            self.stable = max(self.stable, *anciens)
+            self.diffuses = {pk: h for pk, h in self.diffuses.items() if pk > self.stable}
+
+    async def _scruter(self):
+        intervalle = _reglage('FLUX_INTERVALLE', 0.5)
+        while self.abonnes:
+            evenements, suite = await self._lire()
+            for abonne in list(self.abonnes):
+                for e in evenements:
+                    if abonne.accepte(e) and not abonne.pousser(message(e)):
+                        self.desabonner(abonne)
+                        break
+            self._avancer(evenements)
+            if not suite:
+                await asyncio.sleep(intervalle)
+        # Plus d'abonné : le curseur sera relu à la prochaine connexion
+        self.stable, self.diffuses = None, {}
+
+
+_diffuseur = None
+
+
+def diffuseur():
+    global _diffuseur
+    boucle = asyncio.get_running_loop()
+    if _diffuseur is None or _diffuseur.boucle is not boucle:
+        _diffuseur = Diffuseur(boucle)
+    return _diffuseur
+
+
+async def rattrapage(dernier_id, jusqua, cles=None, entite=None):
+    """Messages des événements ]dernier_id, jusqua] du filtre, ou un événement `recharger` si trop nombreux."""
+    if dernier_id is None or dernier_id >= jusqua:
+        return []
+    qs = EvenementStatut.objects.filter(_condition(cles, entite), pk__gt=dernier_id, pk__lte=jusqua).order_by('pk')
+    evenements = [e async for e in qs[:RATTRAPAGE_MAX + 1]]
+    if len(evenements) > RATTRAPAGE_MAX:
+        return [f"id: {jusqua}\nevent: recharger\ndata: {{}}\n\n"]
+    return [message(e) for e in evenements]
+
+
+async def reponse_courte(dernier_id, cles=None, entite=None):
+    """Rattrapage seul (serveur WSGI) : jusqu'au dernier événement stable du journal."""
+    jusqua = await EvenementStatut.ids_stables().afirst() or 0
+    debut = f"retry: {RETRY_MS}\nid: {max(jusqua, dernier_id or 0)}\n\n"
+    return [debut] + await rattrapage(dernier_id, jusqua, cles, entite)
+
+
+async def evenements(dernier_id, cles=None, entite=None):
+    """Flux continu (ASGI) : rattrapage, puis diffusion, avec commentaires de maintien de connexion.
+
+    Le flux se termine après FLUX_DUREE_MAX secondes ; le navigateur se
+    reconnecte sans perte grâce à Last-Event-ID.
+    """
+    maintien = _reglage('FLUX_MAINTIEN', 15)
+    fin = time.monotonic() + _reglage('FLUX_DUREE_MAX', 300)
+    diffusion = diffuseur()
+    abonne = Abonne(cles, entite)
+    curseur = await diffusion.abonner(abonne)
+    try:
+        yield f"retry: {RETRY_MS}\nid: {max(curseur, dernier_id or 0)}\n\n"
+        for texte in await rattrapage(dernier_id, curseur, cles, entite):
+            yield texte
+        while not abonne.deborde:
+            reste = fin - time.monotonic()
+            if reste <= 0:
+                break
+            try:
+                texte = await asyncio.wait_for(abonne.file.get(), min(maintien, reste))
+            except asyncio.TimeoutError:
+                yield ": maintien\n\n"
+                continue
+            if texte is None:
+                break
+            yield texte
+    finally:
+        diffusion.desabonner(abonne)
@@ -22,7 +22,7 @@ class LivraisonForm(forms.ModelForm):
 
 
         
-from .models import Fournisseur, Produit
+from .models import Fournisseur, PreferenceNotification, Produit
 
 class FournisseurForm(forms.ModelForm):
     class Meta:
@@ -34,7 +34,30 @@ class FournisseurForm(forms.ModelForm):
 
 
 
+class PreferenceNotificationForm(forms.ModelForm):
+    class Meta:
+        model = PreferenceNotification
+        fields = ['recapitulatif', 'intervalle_minutes', 'email']
+        widgets = {
+            'intervalle_minutes': forms.NumberInput(attrs={'min': 1}),
+        }
+
+
 class ProduitForm(forms.ModelForm):
     class Meta:
         model = Produit
-        fields = ['nom', 'slug', 'images', 'description', 'prix', 'quantite_minimale', 'is_active']
\ No newline at end of file
+        fields = ['nom', 'slug', 'images', 'description', 'prix', 'quantite_minimale', 'is_active']
+
+
+class ProduitImportForm(forms.Form):
+    FORMAT_CHOICES = [('', 'Détection automatique'), ('csv', 'CSV'), ('ndjson', 'NDJSON')]
+
+    fichier = forms.FileField(
+        label="Fichier",
+        help_text="Colonnes : nom, prix, slug (optionnel), description, quantite_minimale, is_active",
+    )
+    format = forms.ChoiceField(choices=FORMAT_CHOICES, required=False)
+    mettre_a_jour = forms.BooleanField(
+        required=False, initial=True,
+        label="Mettre à jour les produits existants (même slug)",
+    )
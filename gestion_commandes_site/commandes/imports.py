@@ -0,0 +1,221 @@
+"""Import en masse de produits pour un fournisseur (CSV ou NDJSON).
+
+Le fichier est lu en flux et traité par lots : pour chaque lot, les slugs
+existants sont récupérés en une requête, les slugs manquants sont générés
+en mémoire, puis les produits sont créés (bulk_create) ou mis à jour
+(bulk_update) dans une transaction.
+"""
+import csv
+import io
+import json
+import re
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import slugify
+
+from . import versions
+from .models import Produit
+
+FORMATS = ('csv', 'ndjson')
+CHAMPS_MAJ = ['nom', 'description', 'prix', 'quantite_minimale', 'is_active', 'updated_at']
+SLUG_MAX = Produit._meta.get_field('slug').max_length
+NOM_MAX = Produit._meta.get_field('nom').max_length
+# Nombre de bornes OR par requête (limite de profondeur d'expression SQLite)
+TERMES_PAR_REQUETE = 200
+MAX_ERREURS = 1000
+
+
+@dataclass
+class RapportImport:
+    crees: int = 0
+    mis_a_jour: int = 0
+    nb_erreurs: int = 0
+    # (numéro de ligne, message) ; limité à MAX_ERREURS entrées
+    erreurs: list = field(default_factory=list)
+
+    def erreur(self, numero, message):
+        self.nb_erreurs += 1
+        if len(self.erreurs) < MAX_ERREURS:
+            self.erreurs.append((numero, message))
+
+
+def detecter_format(nom_fichier):
+    return 'ndjson' if nom_fichier.lower().endswith(('.ndjson', '.jsonl', '.json')) else 'csv'
+
+
+def lire_lignes(fichier, format='csv'):
+    """Itère sur (numéro de ligne, dict) sans charger le fichier en mémoire."""
+    if isinstance(fichier, io.TextIOBase):
+        texte = fichier
+    else:
+        texte = io.TextIOWrapper(fichier, encoding='utf-8-sig', newline='')
+    if format == 'csv':
+        reader = csv.DictReader(texte)
+        for row in reader:
+            yield reader.line_num, row
+    elif format == 'ndjson':
+        for numero, ligne in enumerate(texte, start=1):
+            if not ligne.strip():
+                continue
+            try:
+                row = json.loads(ligne)
+            except ValueError as e:
+                yield numero, e
+                continue
+            yield numero, row if isinstance(row, dict) else ValueError("objet JSON attendu")
+    else:
+        raise ValueError(f"Format inconnu : {format}")
+
+
+def _booleen(valeur, defaut=True):
+    if valeur in (None, ''):
+        return defaut
+    if isinstance(valeur, bool):
+        return valeur
+    return str(valeur).strip().lower() in ('1', 'true', 'vrai', 'oui', 'yes', 'y')
+
+
+def valider_ligne(row):
+    """Retourne les champs nettoyés d'une ligne ou lève ValueError."""
+    if isinstance(row, Exception):
+        raise ValueError(f"ligne illisible : {row}")
+    nom = str(row.get('nom') or '').strip()
+    if not nom:
+        raise ValueError("nom obligatoire")
+    if len(nom) > NOM_MAX:
+        raise ValueError(f"nom trop long ({NOM_MAX} caractères max)")
+    try:
+        prix = Decimal(str(row.get('prix', '')).strip().replace(',', '.'))
+    except InvalidOperation:
+        raise ValueError("prix invalide")
+    if not prix.is_finite() or prix < 0 or prix.as_tuple().exponent < -2 or prix >= Decimal('1e8'):
+        raise ValueError("prix invalide")
+    try:
+        quantite_minimale = int(row.get('quantite_minimale') or 1)
+    except (TypeError, ValueError):
+        raise ValueError("quantite_minimale invalide")
+    if quantite_minimale < 1:
+        raise ValueError("quantite_minimale doit être >= 1")
+    slug = ''
+    if row.get('slug'):
+        slug = slugify(str(row['slug']))
+        if not slug or len(slug) > SLUG_MAX:
+            raise ValueError("slug invalide")
+    return {
+        'nom': nom,
+        'slug': slug,
+        'description': str(row.get('description') or ''),
+        'prix': prix,
+        'quantite_minimale': quantite_minimale,
+        'is_active': _booleen(row.get('is_active')),
+    }
+
+
+def _base_slug(nom):
+    # Laisse la place pour un suffixe "-NNNNN"
+    return slugify(nom)[:SLUG_MAX - 8].strip('-') or 'produit'
+
+
+def _slugs_existants(exacts, bases):
+    """Une requête (par tranche de TERMES_PAR_REQUETE) : slugs exacts + slugs "base-N".
+
+    Les suffixes sont cherchés par intervalle [base-, base.) pour rester sur l'index unique.
+    """
+    termes = [Q(slug__in=list(exacts | bases))] if exacts or bases else []
+    termes += [Q(slug__gt=f'{b}-', slug__lt=f'{b}.') for b in bases]
+    existants = {}
+    for i in range(0, len(termes), TERMES_PAR_REQUETE):
+        q = Q()
+        for t in termes[i:i + TERMES_PAR_REQUETE]:
+            q |= t
+        existants.update(
+            (slug, (pk, fournisseur_id))
+            for slug, pk, fournisseur_id in Produit.objects.filter(q).values_list('slug', 'pk', 'fournisseur_id')
+        )
+    return existants
+
+
+def _traiter_lot(fournisseur, lot, rapport, mettre_a_jour):
+    valides = []
+    for numero, row in lot:
+        try:
+            valides.append((numero, valider_ligne(row)))
+        except ValueError as e:
+            rapport.erreur(numero, str(e))
+    if not valides:
+        return
+
+    exacts = {data['slug'] for _, data in valides if data['slug']}
+    bases = {_base_slug(data['nom']) for _, data in valides if not data['slug']}
+    existants = _slugs_existants(exacts, bases)
+
+    # Prochain suffixe libre pour chaque base
+    suffixes = {}
+    for base in bases:
+        motif = re.compile(rf'^{re.escape(base)}-(\d+)$')
+        numeros = [int(m.group(1)) for m in map(motif.match, existants) if m]
+        suffixes[base] = max(numeros, default=1) + 1
+
+    now = timezone.now()
+    a_creer, a_maj, numeros_lot = [], [], []
+    # Les slugs explicites du lot sont réservés avant toute génération
+    pris = set(existants) | exacts
+    explicites_vus = set()
+    for numero, data in valides:
+        slug = data.pop('slug')
+        if slug and slug in existants:
+            pk, fournisseur_id = existants[slug]
+            if fournisseur_id != fournisseur.pk:
+                rapport.erreur(numero, f"slug « {slug} » déjà utilisé par un autre fournisseur")
+            elif not mettre_a_jour:
+                rapport.erreur(numero, f"slug « {slug} » déjà existant")
+            else:
+                a_maj.append(Produit(pk=pk, fournisseur=fournisseur, slug=slug, updated_at=now, **data))
+                numeros_lot.append(numero)
+            continue
+        if slug:
+            if slug in explicites_vus:
+                rapport.erreur(numero, f"slug « {slug} » en double dans le fichier")
+                continue
+            explicites_vus.add(slug)
+        else:
+            base = _base_slug(data['nom'])
+            slug = base
+            while slug in pris:
+                slug = f"{base}-{suffixes[base]}"
+                suffixes[base] += 1
+        pris.add(slug)
+        a_creer.append(Produit(fournisseur=fournisseur, slug=slug, **data))
+        numeros_lot.append(numero)
+
+    try:
+        with transaction.atomic():
+            Produit.objects.bulk_create(a_creer)
+            Produit.objects.bulk_update(a_maj, CHAMPS_MAJ)
+            # bulk_create / bulk_update n'envoient pas post_save (voir signals.py)
+            if a_creer or a_maj:
+                versions.incrementer(versions.CATALOGUE)
+    except IntegrityError as e:
+        # Conflit avec un import concurrent : le lot entier est rejeté
+        for numero in numeros_lot:
+            rapport.erreur(numero, f"lot rejeté : {e}")
+        return
+    rapport.crees += len(a_creer)
+    rapport.mis_a_jour += len(a_maj)
+
+
+def importer_produits(fournisseur, fichier, format='csv', batch_size=500, mettre_a_jour=True):
+    """Importe les produits de `fichier` pour `fournisseur` et retourne un RapportImport."""
+    rapport = RapportImport()
+    lignes = lire_lignes(fichier, format)
+    while True:
+        lot = list(islice(lignes, batch_size))
+        if not lot:
+            break
+        _traiter_lot(fournisseur, lot, rapport, mettre_a_jour)
+    return rapport
@@ -0,0 +1,127 @@
+"""Jobs de rapport : exports longs exécutés hors requête HTTP.
+
+Une vue crée un RapportJob (en attente) ; la commande `executer_rapports`
+réserve les jobs et les exécute dans un pool de processus. Le fichier est
+écrit sous MEDIA_ROOT/reports/, la progression est mise à jour au fil de
+l'export, puis le fichier est supprimé à expiration.
+"""
+import csv
+import os
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .exports import EXPORTS
+from .models import RapportJob
+
+DOSSIER = 'reports'
+
+
+class LimiteJobsAtteinte(Exception):
+    pass
+
+
+def max_jobs_par_utilisateur():
+    return getattr(settings, 'RAPPORTS_MAX_JOBS_PAR_UTILISATEUR', 2)
+
+
+def duree_vie():
+    return timedelta(seconds=getattr(settings, 'RAPPORTS_DUREE_VIE', 24 * 3600))
+
+
+def creer_job(user, type, parametres=None):
+    """Met un export en file d'attente ; lève LimiteJobsAtteinte au-delà du quota par utilisateur."""
+    if type not in EXPORTS:
+        raise ValueError(f"Type de rapport inconnu : {type}")
+    with transaction.atomic():
+        # Verrou sur l'utilisateur : deux demandes simultanées ne dépassent pas le quota
+        get_user_model().objects.select_for_update().filter(pk=user.pk).exists()
+        actifs = RapportJob.objects.filter(user=user, statut__in=RapportJob.STATUTS_ACTIFS).count()
+        if actifs >= max_jobs_par_utilisateur():
+            raise LimiteJobsAtteinte()
+        return RapportJob.objects.create(user=user, type=type, parametres=parametres or {})
+
+
+def reserver_jobs(limite):
+    """Passe au plus `limite` jobs en attente à « en cours » et retourne leurs ids.
+
+    La mise à jour conditionnelle sur le statut évite qu'un job soit pris par deux workers.
+    """
+    ids = []
+    candidats = (
+        RapportJob.objects.filter(statut='en_attente')
+        .order_by('created_at').values_list('pk', flat=True)[:limite]
+    )
+    for pk in candidats:
+        if RapportJob.objects.filter(pk=pk, statut='en_attente').update(
+            statut='en_cours', started_at=timezone.now(), progression=0,
+        ):
+            ids.append(pk)
+    return ids
+
+
+def _terminer(job_id, **champs):
+    now = timezone.now()
+    RapportJob.objects.filter(pk=job_id).update(finished_at=now, expires_at=now + duree_vie(), **champs)
+
+
+def echouer_job(job_id, erreur):
+    """Marque en échec un job resté « en cours » (processus du pool interrompu)."""
+    RapportJob.objects.filter(pk=job_id, statut='en_cours').update(
+        statut='echec', erreur=erreur[:1000], finished_at=timezone.now(), expires_at=timezone.now() + duree_vie(),
+    )
+
+
+def executer_job(job_id):
+    """Exécute un job réservé (appelé dans un processus du pool)."""
+    close_old_connections()
+    job = RapportJob.objects.get(pk=job_id)
+    nom = f'{DOSSIER}/{job.pk}-{secrets.token_hex(8)}.csv'
+    chemin = os.path.join(settings.MEDIA_ROOT, nom)
+    partiel = chemin + '.part'
+    try:
+        entete, total, lots = EXPORTS[job.type](**job.parametres)
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        with open(partiel, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(entete)
+            faits, affiche = 0, 0
+            for lignes in lots:
+                writer.writerows(lignes)
+                faits += 1
+                # Au plus une écriture en base par point de pourcentage
+                progression = min(99, faits * 100 // total) if total else 0
+                if progression != affiche:
+                    RapportJob.objects.filter(pk=job_id).update(progression=progression)
+                    affiche = progression
+        os.replace(partiel, chemin)
+        _terminer(job_id, statut='termine', progression=100, fichier=nom)
+    except Exception as e:
+        if os.path.exists(partiel):
+            os.remove(partiel)
+        _terminer(job_id, statut='echec', erreur=str(e)[:1000])
+        raise
+    finally:
+        close_old_connections()
+    return job_id
+
+
+def liberer_jobs_bloques(delai=None):
+    """Marque en échec les jobs « en cours » depuis trop longtemps (worker arrêté)."""
+    if delai is None:
+        delai = timedelta(seconds=getattr(settings, 'RAPPORTS_TIMEOUT', 3600))
+    bloques = RapportJob.objects.filter(statut='en_cours', started_at__lt=timezone.now() - delai)
+    now = timezone.now()
+    return bloques.update(statut='echec', erreur='Interrompu', finished_at=now, expires_at=now + duree_vie())
+
+
+def purger_jobs_expires():
+    """Supprime les fichiers et les jobs expirés ; retourne le nombre de jobs supprimés."""
+    expires = RapportJob.objects.filter(expires_at__lt=timezone.now())
+    for fichier in expires.exclude(fichier='').values_list('fichier', flat=True).iterator():
+        RapportJob.fichier.field.storage.delete(fichier)
+    return expires.delete()[0]
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from commandes.archive import archiver_commandes
+
+
+class Command(BaseCommand):
+    help = "Déplace les commandes terminées (livrées / annulées) anciennes vers les tables d'archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jours', type=int, default=90,
+                            help="Âge minimal (en jours) des commandes à archiver (défaut : 90).")
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Nombre de commandes déplacées par transaction (défaut : 500).")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Affiche seulement le nombre de commandes archivables.")
+
+    def handle(self, *args, **options):
+        total = archiver_commandes(
+            jours=options['jours'],
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+        if options['dry_run']:
+            self.stdout.write(f"{total} commande(s) archivable(s).")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{total} commande(s) archivée(s)."))
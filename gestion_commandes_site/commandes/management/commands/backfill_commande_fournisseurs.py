@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from commandes.models import Commande, CommandeFournisseur
+
+
+class Command(BaseCommand):
+    help = "Reconstruit la table d'appartenance commande <-> fournisseur (CommandeFournisseur)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Nombre de commandes traitées par transaction (défaut : 1000).")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = 0
+        last_pk = 0
+        while True:
+            ids = list(
+                Commande.objects.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                CommandeFournisseur.reconstruire(ids)
+            total += len(ids)
+            last_pk = ids[-1]
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} commande(s) traitée(s), {CommandeFournisseur.objects.count()} lien(s) fournisseur."
+        ))
@@ -0,0 +1,82 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from django.db.models.functions import Length
+from django.test import Client
+from django.urls import reverse
+
+from commandes import positions
+from commandes.models import Commande, Livraison, SegmentPositions
+
+
+class Command(BaseCommand):
+    help = ("Mesure le débit de l'envoi de positions (pile complète de middlewares, commits réels), "
+            "la taille du stockage et la réduction ; les données créées sont supprimées à la fin.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--livraisons', type=int, default=50,
+                            help="Livraisons en transit simulées (défaut : 50).")
+        parser.add_argument('--envois', type=int, default=2000,
+                            help="Nombre total d'envois de positions (défaut : 2000).")
+        parser.add_argument('--points', type=int, default=10,
+                            help="Points par envoi (défaut : 10).")
+
+    def handle(self, *args, **options):
+        n_livraisons, envois, n_points = options['livraisons'], options['envois'], options['points']
+        commandes = Commande.objects.bulk_create([Commande() for _ in range(n_livraisons)])
+        try:
+            self._mesurer([c.pk for c in commandes], envois, n_points)
+        finally:
+            # Livraisons et segments suivent par cascade
+            Commande.objects.filter(pk__in=[c.pk for c in commandes]).delete()
+
+    def _mesurer(self, commande_ids, envois, n_points):
+        livraisons = Livraison.objects.bulk_create([
+            Livraison(commande_id=pk, statut='en_transit', transport='moto') for pk in commande_ids
+        ])
+        livraison_ids = [liv.pk for liv in livraisons]
+        client = Client(HTTP_HOST='localhost')
+        requetes = [
+            (reverse('commandes:livraison-positions', args=[pk]), f'Bearer {positions.jeton_livreur(pk)}')
+            for pk in livraison_ids
+        ]
+
+        t0 = int(time.time() * 1000) - envois * n_points * 1000
+        corps = []
+        for i in range(envois):
+            base = t0 + i * n_points * 1000
+            points = [[base + k * 1000, -18.9 + (i * n_points + k) * 1e-5, 47.5 + k * 1e-5] for k in range(n_points)]
+            corps.append(json.dumps({'points': points}))
+
+        debut = time.perf_counter()
+        for i, donnees in enumerate(corps):
+            url, jeton = requetes[i % len(requetes)]
+            reponse = client.post(url, donnees, content_type='application/json', HTTP_AUTHORIZATION=jeton)
+            if reponse.status_code != 201:
+                self.stderr.write(f"Envoi refusé ({reponse.status_code}) : {reponse.content[:200]!r}")
+                return
+        duree = time.perf_counter() - debut
+        self.stdout.write(
+            f"Envois : {envois} x {n_points} point(s) en {duree:.2f} s -> "
+            f"{envois / duree:.0f} envois/s, {envois * n_points / duree:.0f} points/s, "
+            f"{duree / envois * 1000:.2f} ms/envoi"
+        )
+
+        segments = SegmentPositions.objects.filter(livraison_id__in=livraison_ids)
+        octets = segments.aggregate(o=Sum(Length('donnees')))['o'] or 0
+        total = envois * n_points
+        self.stdout.write(f"Stockage : {segments.count()} segment(s), {octets} octets de points "
+                          f"({octets / total:.1f} octets/point)")
+
+        debut = time.perf_counter()
+        derniere = positions.derniere_position(livraison_ids[0])
+        self.stdout.write(f"Dernière position : {derniere} en {(time.perf_counter() - debut) * 1000:.2f} ms")
+
+        Livraison.objects.filter(pk__in=livraison_ids).update(statut='livree')
+        debut = time.perf_counter()
+        n, avant, apres = positions.reduire_segments()
+        self.stdout.write(
+            f"Réduction : {n} livraison(s), {avant} -> {apres} point(s) en {time.perf_counter() - debut:.2f} s"
+        )
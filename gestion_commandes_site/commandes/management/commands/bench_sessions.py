@@ -0,0 +1,96 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from commandes.models import Commande, Fournisseur, Produit
+
+MOTEURS = {
+    'db': 'django.contrib.sessions.backends.db',
+    'commandes': 'commandes.sessions',
+}
+MOT_DE_PASSE = 'bench-sessions'
+# Le rendu des pages n'est pas mesuré : gabarit de base minimal
+TEMPLATES_BENCH = [{
+    'BACKEND': 'django.template.backends.django.DjangoTemplates',
+    'OPTIONS': {
+        'context_processors': [
+            'django.template.context_processors.request',
+            'django.contrib.auth.context_processors.auth',
+            'django.contrib.messages.context_processors.messages',
+        ],
+        'loaders': [
+            ('django.template.loaders.locmem.Loader', {'base.html': '{% block content %}{% endblock %}'}),
+            'django.template.loaders.app_directories.Loader',
+        ],
+    },
+}]
+
+
+class Annulation(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("Compare les écritures sur django_session entre le moteur db de Django et commandes.sessions "
+            "sur un parcours d'achat simulé (données créées puis annulées).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--utilisateurs', type=int, default=20,
+                            help="Nombre de parcours simulés par moteur (défaut : 20).")
+        parser.add_argument('--ajouts', type=int, default=10,
+                            help="Ajouts au panier par phase (anonyme puis connecté) (défaut : 10).")
+
+    def _parcours(self, user, produit, ajouts):
+        client = Client(HTTP_HOST='localhost')
+        for _ in range(ajouts):
+            client.post(f'/cart/add/{produit.pk}/')
+        client.post('/login/', {'username': user.username, 'password': MOT_DE_PASSE})
+        for _ in range(ajouts):
+            client.post(f'/cart/add/{produit.pk}/')
+            client.get('/cart/')
+        client.get(f'/cart/remove/{produit.pk}/')
+        client.post(f'/cart/add/{produit.pk}/')
+        client.post('/checkout/', {'adresse': 'bench', 'methode': 'moto'})
+        # Action avec message flash puis redirection
+        commande = Commande.objects.filter(client=user).latest('pk')
+        client.post(f'/fournisseur/commande/{commande.pk}/marquer-prete/')
+        return ajouts * 3 + 5
+
+    def _mesurer(self, moteur, options):
+        User = get_user_model()
+        with override_settings(
+            SESSION_ENGINE=MOTEURS[moteur], THROTTLE_RATES={}, TEMPLATES=TEMPLATES_BENCH,
+            PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+        ):
+            caches['default'].clear()
+            requetes, debut = 0, time.perf_counter()
+            with CaptureQueriesContext(connection) as ctx:
+                for i in range(options['utilisateurs']):
+                    user = User.objects.create_user(f'bench-sessions-{moteur}-{i}', password=MOT_DE_PASSE)
+                    fournisseur = Fournisseur.objects.create(user=user, nom='Bench', email='bench@example.com', approved=True)
+                    produit = Produit.objects.create(nom='Bench', slug=f'bench-sessions-{moteur}-{i}', prix=1, fournisseur=fournisseur)
+                    requetes += self._parcours(user, produit, options['ajouts'])
+            duree = time.perf_counter() - debut
+        ecritures = [
+            q['sql'] for q in ctx.captured_queries
+            if 'django_session' in q['sql'] and q['sql'].split(None, 1)[0] in ('INSERT', 'UPDATE', 'DELETE')
+        ]
+        return requetes, len(ecritures), duree
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'moteur':<12} {'requêtes':>9} {'écritures session':>18} {'par requête':>12} {'durée':>8}")
+        for moteur in MOTEURS:
+            try:
+                with transaction.atomic():
+                    requetes, ecritures, duree = self._mesurer(moteur, options)
+                    raise Annulation
+            except Annulation:
+                pass
+            self.stdout.write(
+                f"{moteur:<12} {requetes:>9} {ecritures:>18} {ecritures / requetes:>12.2f} {duree:>7.2f}s"
+            )
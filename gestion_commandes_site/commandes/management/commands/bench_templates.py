@@ -0,0 +1,108 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.test import RequestFactory, override_settings
+
+from commandes.models import Commande, Fournisseur, LigneCommande, Produit
+from commandes.views.backoffice import _commandes_qs
+from commandes.views.catalogue import _catalogue_qs
+from commandes.views.commun import LIGNES_PREFETCH
+
+CONTEXT_PROCESSORS = [
+    'django.template.context_processors.request',
+    'django.contrib.auth.context_processors.auth',
+    'django.contrib.messages.context_processors.messages',
+    'commandes.context_processors.fournisseur',
+]
+# Gabarit de base minimal : seul le contenu des pages est mesuré
+BASE = ('django.template.loaders.locmem.Loader', {'base.html': '{% block content %}{% endblock %}'})
+LOADERS = [BASE, 'django.template.loaders.app_directories.Loader']
+MODES = {
+    'sans cache': {'loaders': LOADERS, 'fragments': 'django.core.cache.backends.dummy.DummyCache'},
+    'chargeur en cache': {
+        'loaders': [('django.template.loaders.cached.Loader', LOADERS)],
+        'fragments': 'django.core.cache.backends.dummy.DummyCache',
+    },
+    'chargeur + fragments': {
+        'loaders': [('django.template.loaders.cached.Loader', LOADERS)],
+        'fragments': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+
+class Annulation(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("Mesure le rendu de commandes/index.html et commandes/commandes_list.html "
+            "(N lignes, données créées puis annulées) selon la configuration des gabarits.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lignes', type=int, default=1000,
+                            help="Produits et commandes affichés (défaut : 1000).")
+        parser.add_argument('--repetitions', type=int, default=5,
+                            help="Rendus mesurés par mode (défaut : 5).")
+
+    def _donnees(self, n):
+        user = get_user_model().objects.create_user('bench-templates')
+        fournisseur = Fournisseur.objects.create(user=user, nom='Bench', email='bench@example.com', approved=True)
+        produits = Produit.objects.bulk_create([
+            Produit(nom=f'Produit {i}', slug=f'bench-templates-{i}', prix=1000 + i, fournisseur=fournisseur,
+                    description='Description du produit de test ' * 6)
+            for i in range(n)
+        ])
+        commandes = Commande.objects.bulk_create([Commande(client=user) for _ in range(n)])
+        LigneCommande.objects.bulk_create([
+            LigneCommande(commande=c, produit=produits[(i + k) % n], quantite=k + 1)
+            for i, c in enumerate(commandes) for k in range(2)
+        ])
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        # Requêtes exécutées une fois : seul le rendu est mesuré
+        return request, [
+            ('commandes/index.html', {'produits': list(_catalogue_qs()[:n])}),
+            ('commandes/commandes_list.html', {
+                'commandes': list(_commandes_qs().prefetch_related(LIGNES_PREFETCH)[:n]),
+                'statut_choices': Commande._meta.get_field('statut').choices,
+            }),
+        ]
+
+    def _mesurer(self, mode, pages, request, repetitions):
+        config = MODES[mode]
+        templates = [{
+            'BACKEND': 'django.template.backends.django.DjangoTemplates',
+            'OPTIONS': {'context_processors': CONTEXT_PROCESSORS, 'loaders': config['loaders']},
+        }]
+        cache_settings = {'default': {'BACKEND': 'commandes.cache.LocMemCache'},
+                          'fragments': {'BACKEND': config['fragments'], 'TIMEOUT': 600,
+                                        'OPTIONS': {'MAX_ENTRIES': 100000}}}
+        resultats = []
+        with override_settings(TEMPLATES=templates, CACHES=cache_settings):
+            caches['fragments'].clear()
+            for nom, contexte in pages:
+                durees = []
+                for _ in range(repetitions + 1):
+                    debut = time.perf_counter()
+                    render_to_string(nom, contexte, request=request)
+                    durees.append(time.perf_counter() - debut)
+                # Premier rendu (compilation, cache froid) puis moyenne des suivants
+                resultats.append((nom, durees[0], sum(durees[1:]) / repetitions))
+        return resultats
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'gabarit':<32} {'mode':<22} {'1er rendu':>10} {'rendus suivants':>16}")
+        try:
+            with transaction.atomic():
+                request, pages = self._donnees(options['lignes'])
+                for mode in MODES:
+                    for nom, premier, moyenne in self._mesurer(mode, pages, request, options['repetitions']):
+                        self.stdout.write(f"{nom:<32} {mode:<22} {premier * 1000:>8.1f}ms {moyenne * 1000:>14.1f}ms")
+                raise Annulation
+        except Annulation:
+            pass
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from commandes import throttling
+from commandes.middleware import ThrottleMiddleware
+
+
+class Command(BaseCommand):
+    help = "Mesure le coût du throttling (consommation d'un jeton et process_view complet) sur le cache configuré."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100000,
+                            help="Nombre d'appels mesurés (défaut : 100000).")
+
+    def _mesurer(self, libelle, fonction, iterations):
+        debut = time.perf_counter()
+        for _ in range(iterations):
+            fonction()
+        duree = time.perf_counter() - debut
+        self.stdout.write(f"{libelle:<50} {duree / iterations * 1e6:8.2f} µs/appel")
+
+    def handle(self, *args, **options):
+        n = options['iterations']
+        cache = throttling.cache_throttle()
+        self.stdout.write(f"Cache : {cache.__class__.__name__}, {n} itérations")
+
+        # Seau assez grand pour que toutes les requêtes soient acceptées, puis seau vide
+        self._mesurer("consommer() (accepté)",
+                      lambda: throttling.consommer(cache, 'throttle:bench:accepte', n + 1, 3600), n)
+        self._mesurer("consommer() (rejeté)",
+                      lambda: throttling.consommer(cache, 'throttle:bench:rejete', 0, 3600), n)
+
+        url = reverse('commandes:add_to_cart', args=[1])
+        request = RequestFactory().post(url, REMOTE_ADDR='203.0.113.7')
+        request.resolver_match = resolve(url)
+        middleware = ThrottleMiddleware(lambda r: None)
+        middleware.regles = throttling.charger_regles({'add_to_cart': {'ip': f'{n + 1}/h'}})
+        vue = request.resolver_match.func
+        self._mesurer("ThrottleMiddleware.process_view (règle IP)",
+                      lambda: middleware.process_view(request, vue, (), {}), n)
+        middleware.regles = throttling.charger_regles({'checkout': {'ip': '1/h'}})
+        self._mesurer("ThrottleMiddleware.process_view (URL non limitée)",
+                      lambda: middleware.process_view(request, vue, (), {}), n)
+        cache.delete_many(['throttle:bench:accepte', 'throttle:bench:rejete'])
@@ -0,0 +1,38 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from commandes.versements import calculer_releves
+
+
+def mois_precedent():
+    """(premier jour, dernier jour) du mois précédent."""
+    fin = timezone.localdate().replace(day=1) - timedelta(days=1)
+    return fin.replace(day=1), fin
+
+
+class Command(BaseCommand):
+    help = "Calcule les relevés de versement des fournisseurs (ventes livrées, commission, net) pour une période."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--debut', type=date.fromisoformat,
+                            help="Premier jour de la période (AAAA-MM-JJ ; défaut : début du mois précédent).")
+        parser.add_argument('--fin', type=date.fromisoformat,
+                            help="Dernier jour inclus de la période (AAAA-MM-JJ ; défaut : fin du mois précédent).")
+
+    def handle(self, *args, **options):
+        debut, fin = mois_precedent()
+        debut = options['debut'] or debut
+        fin = options['fin'] or fin
+        chrono = time.monotonic()
+        try:
+            releves = calculer_releves(debut, fin)
+        except ValueError as e:
+            raise CommandError(e)
+        total = sum(r.net for r in releves)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(releves)} relevé(s) créé(s) du {debut} au {fin} (net total {total}) "
+            f"en {time.monotonic() - chrono:.1f} s."
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from commandes.notifications import envoyer_recapitulatifs
+
+
+class Command(BaseCommand):
+    help = ("Envoie aux fournisseurs les e-mails récapitulatifs de nouvelles commandes dont le délai est écoulé "
+            "(à planifier toutes les quelques minutes).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Compte les récapitulatifs dus sans les envoyer.")
+
+    def handle(self, *args, **options):
+        envoyes, ignores, echecs = envoyer_recapitulatifs(dry_run=options['dry_run'])
+        verbe = "à envoyer" if options['dry_run'] else "envoyé(s)"
+        message = f"{envoyes} récapitulatif(s) {verbe}, {ignores} fournisseur(s) sans e-mail"
+        if echecs:
+            self.stdout.write(self.style.WARNING(f"{message}, {echecs} échec(s)."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{message}."))
@@ -0,0 +1,38 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from commandes.webhooks import liberer_envois_bloques, planifier, traiter
+
+
+class Command(BaseCommand):
+    help = ("Regroupe les changements de statut en lots et les poste aux abonnements webhook "
+            "(signature, nouvels essais, abandon après WEBHOOKS_MAX_TENTATIVES).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                            help="Nombre de POST simultanés (défaut : 4).")
+        parser.add_argument('--intervalle', type=float, default=2,
+                            help="Délai (secondes) entre deux scrutations quand rien n'est dû (défaut : 2).")
+        parser.add_argument('--une-fois', action='store_true',
+                            help="Planifie et poste les envois dus puis s'arrête.")
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        # Les threads ne font que les POST : réservation et résultats restent dans ce thread
+        with ThreadPoolExecutor(workers) as pool:
+            while True:
+                liberes = liberer_envois_bloques()
+                if liberes:
+                    self.stderr.write(f"{liberes} envoi(s) bloqué(s) remis en file.")
+                lots = planifier()
+                resultats = traiter(pool, workers)
+                if lots or resultats:
+                    detail = ', '.join(f"{statut} : {n}" for statut, n in sorted(resultats.items()))
+                    self.stdout.write(f"{lots} lot(s) planifié(s) ; {detail or 'aucun envoi dû'}.")
+                if resultats:
+                    continue
+                if options['une_fois']:
+                    break
+                time.sleep(options['intervalle'])
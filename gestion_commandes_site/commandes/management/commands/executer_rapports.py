@@ -0,0 +1,55 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.core.management.base import BaseCommand
+
+from commandes.jobs import (
+    echouer_job, executer_job, liberer_jobs_bloques, purger_jobs_expires, reserver_jobs,
+)
+
+
+class Command(BaseCommand):
+    help = "Exécute les jobs de rapport en attente dans un pool de processus et purge les fichiers expirés."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2,
+                            help="Nombre de processus d'export (défaut : 2).")
+        parser.add_argument('--intervalle', type=float, default=5,
+                            help="Délai (secondes) entre deux scrutations de la file (défaut : 5).")
+        parser.add_argument('--une-fois', action='store_true',
+                            help="Traite les jobs en attente puis s'arrête.")
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        # "spawn" : aucun processus n'hérite des connexions ouvertes du parent ;
+        # chaque processus initialise Django avant de recevoir un job.
+        contexte = multiprocessing.get_context('spawn')
+        en_cours = {}
+        with ProcessPoolExecutor(workers, mp_context=contexte, initializer=django.setup) as pool:
+            while True:
+                purges = purger_jobs_expires()
+                if purges:
+                    self.stdout.write(f"{purges} rapport(s) expiré(s) supprimé(s).")
+                liberer_jobs_bloques()
+
+                for job_id in reserver_jobs(workers - len(en_cours)):
+                    en_cours[pool.submit(executer_job, job_id)] = job_id
+
+                if not en_cours:
+                    if options['une_fois']:
+                        break
+                    time.sleep(options['intervalle'])
+                    continue
+
+                termines, _ = wait(en_cours, timeout=options['intervalle'], return_when=FIRST_COMPLETED)
+                for future in termines:
+                    job_id = en_cours.pop(future)
+                    erreur = future.exception()
+                    if erreur is None:
+                        self.stdout.write(self.style.SUCCESS(f"Rapport #{job_id} terminé."))
+                    else:
+                        # Sans effet si le job a déjà enregistré son échec
+                        echouer_job(job_id, str(erreur))
+                        self.stderr.write(f"Rapport #{job_id} en échec : {erreur}")
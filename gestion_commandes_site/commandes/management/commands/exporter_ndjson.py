@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from commandes.transfert import exporter
+
+
+class Command(BaseCommand):
+    help = "Exporte les données (utilisateurs et application commandes par défaut) en NDJSON gzip, par ordre de clé primaire."
+
+    def add_arguments(self, parser):
+        parser.add_argument('dossier', help="Dossier de destination (créé si besoin).")
+        parser.add_argument('--modeles', nargs='+', metavar='LABEL',
+                            help="Applications ou modèles à exporter (ex. commandes, auth.user, commandes.produit).")
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="Lignes lues par requête (défaut : 5000).")
+
+    def handle(self, *args, **options):
+        debut = time.monotonic()
+        try:
+            manifest = exporter(options['dossier'], options['modeles'], options['batch_size'], log=self.stdout.write)
+        except (LookupError, ValueError) as e:
+            raise CommandError(e)
+        total = sum(m['lignes'] for m in manifest['modeles'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} ligne(s) exportée(s) en {time.monotonic() - debut:.1f} s vers {options['dossier']}."
+        ))
@@ -0,0 +1,24 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from commandes.versements import exporter_csv, releves_periode
+
+
+class Command(BaseCommand):
+    help = "Exporte en CSV les relevés de versement compris dans une période."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--debut', type=date.fromisoformat, help="Relevés commençant ce jour ou après (AAAA-MM-JJ).")
+        parser.add_argument('--fin', type=date.fromisoformat, help="Relevés finissant ce jour ou avant (AAAA-MM-JJ).")
+        parser.add_argument('--sortie', help="Fichier CSV de destination (défaut : sortie standard).")
+
+    def handle(self, *args, **options):
+        releves = releves_periode(options['debut'], options['fin'])
+        if not options['sortie']:
+            exporter_csv(releves, sys.stdout)
+            return
+        with open(options['sortie'], 'w', newline='', encoding='utf-8') as sortie:
+            n = exporter_csv(releves, sortie)
+        self.stdout.write(self.style.SUCCESS(f"{n} relevé(s) exporté(s) vers {options['sortie']}."))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from commandes.transfert import importer
+
+
+class Command(BaseCommand):
+    help = "Importe un export NDJSON gzip (exporter_ndjson) par lots, avec reprise après interruption."
+
+    def add_arguments(self, parser):
+        parser.add_argument('dossier', help="Dossier produit par exporter_ndjson.")
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="Lignes insérées par transaction (défaut : 5000).")
+        parser.add_argument('--reprendre', action='store_true',
+                            help="Reprend un import interrompu à partir du dernier lot validé.")
+
+    def handle(self, *args, **options):
+        debut = time.monotonic()
+        try:
+            importer(options['dossier'], options['batch_size'], options['reprendre'], log=self.stdout.write)
+        except (LookupError, ValueError, FileNotFoundError) as e:
+            raise CommandError(e)
+        self.stdout.write(self.style.SUCCESS(f"Import terminé en {time.monotonic() - debut:.1f} s."))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from commandes.imports import FORMATS, detecter_format, importer_produits
+from commandes.models import Fournisseur
+
+
+class Command(BaseCommand):
+    help = "Importe en masse les produits d'un fournisseur depuis un fichier CSV ou NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier', help="Chemin du fichier à importer.")
+        parser.add_argument('--fournisseur', type=int, required=True, help="Identifiant du fournisseur.")
+        parser.add_argument('--format', choices=FORMATS, help="Format du fichier (déduit de l'extension par défaut).")
+        parser.add_argument('--batch-size', type=int, default=500, help="Lignes traitées par lot (défaut : 500).")
+        parser.add_argument('--sans-mise-a-jour', action='store_true',
+                            help="Signale en erreur les slugs existants au lieu de mettre à jour les produits.")
+
+    def handle(self, *args, **options):
+        try:
+            fournisseur = Fournisseur.objects.get(pk=options['fournisseur'])
+        except Fournisseur.DoesNotExist:
+            raise CommandError(f"Fournisseur {options['fournisseur']} introuvable.")
+
+        with open(options['fichier'], 'rb') as fichier:
+            rapport = importer_produits(
+                fournisseur,
+                fichier,
+                format=options['format'] or detecter_format(options['fichier']),
+                batch_size=options['batch_size'],
+                mettre_a_jour=not options['sans_mise_a_jour'],
+            )
+
+        for numero, message in rapport.erreurs:
+            self.stderr.write(f"ligne {numero} : {message}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{rapport.crees} créé(s), {rapport.mis_a_jour} mis à jour, {rapport.nb_erreurs} erreur(s)."
+        ))
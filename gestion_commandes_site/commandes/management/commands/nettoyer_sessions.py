@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+
+class Command(BaseCommand):
+    help = "Supprime les sessions expirées de la base, par lots."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Sessions supprimées par requête (défaut : 1000).")
+
+    def handle(self, *args, **options):
+        store = import_string(settings.SESSION_ENGINE + '.SessionStore')
+        try:
+            total = store.clear_expired(batch_size=options['batch_size'])
+        except TypeError:
+            # Moteur standard de Django : suppression en une fois
+            total = store.clear_expired()
+        if total is None:
+            self.stdout.write(self.style.SUCCESS("Sessions expirées supprimées."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{total} session(s) expirée(s) supprimée(s)."))
@@ -0,0 +1,85 @@
+import json
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Exécuté dans un processus neuf (python -X importtime) : phases d'un démarrage de worker
+SCRIPT = """
+import json, sys, time
+from wsgiref.util import setup_testing_defaults
+debut = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+wsgi = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+urls = time.perf_counter()
+environ = {'PATH_INFO': sys.argv[1], 'HTTP_HOST': sys.argv[2], 'SERVER_NAME': sys.argv[2]}
+setup_testing_defaults(environ)
+statut = []
+reponse = application(environ, lambda s, h, exc_info=None: statut.append(s))
+b''.join(reponse)
+premiere = time.perf_counter()
+print(json.dumps({
+    'setup': setup - debut, 'wsgi': wsgi - setup, 'urls': urls - wsgi,
+    'premiere_requete': premiere - urls, 'total': premiere - debut, 'statut': statut[0],
+}))
+"""
+LIGNE_IMPORTTIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+class Command(BaseCommand):
+    help = ("Mesure le démarrage d'un worker dans un processus neuf : django.setup(), application WSGI, "
+            "chargement des URLs et première requête, avec les imports les plus coûteux (-X importtime).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='/', help="Chemin de la première requête (défaut : /).")
+        parser.add_argument('--host', default=None,
+                            help="En-tête Host de la requête (défaut : premier ALLOWED_HOSTS ou localhost).")
+        parser.add_argument('--top', type=int, default=15, help="Imports affichés (défaut : 15).")
+        parser.add_argument('--repetitions', type=int, default=3,
+                            help="Démarrages mesurés ; le plus rapide est retenu (défaut : 3).")
+
+    def _demarrer(self, url, host):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE))
+        resultat = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', SCRIPT, url, host],
+            capture_output=True, text=True, env=env, cwd=settings.BASE_DIR,
+        )
+        if resultat.returncode != 0:
+            raise CommandError(resultat.stderr.strip().splitlines()[-1])
+        return json.loads(resultat.stdout.strip().splitlines()[-1]), resultat.stderr
+
+    def handle(self, *args, **options):
+        hosts = [h for h in settings.ALLOWED_HOSTS if h not in ('*', '')]
+        host = options['host'] or (hosts[0].lstrip('.') if hosts else 'localhost')
+        essais = [self._demarrer(options['url'], host) for _ in range(max(options['repetitions'], 1))]
+        phases, importtime = min(essais, key=lambda essai: essai[0]['total'])
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Démarrage (meilleur de {len(essais)}) — {phases['statut']}"))
+        for cle, libelle in (('setup', 'django.setup()'), ('wsgi', 'application WSGI'),
+                             ('urls', 'URLconf (vues)'), ('premiere_requete', 'première requête'),
+                             ('total', 'total')):
+            self.stdout.write(f"  {libelle:<22} {phases[cle] * 1000:8.1f} ms")
+
+        imports = []
+        for ligne in importtime.splitlines():
+            m = LIGNE_IMPORTTIME.match(ligne)
+            if m:
+                imports.append((int(m.group(2)), int(m.group(1)), len(m.group(3)), m.group(4)))
+        # Imports de premier niveau (niveau d'indentation minimal) et modules du projet
+        niveau = min((i[2] for i in imports), default=0)
+        for titre, selection in (
+            ("Imports de premier niveau (cumulé)", [i for i in imports if i[2] == niveau]),
+            ("Modules de l'application (cumulé)", [i for i in imports if i[3].split('.')[0] == 'commandes']),
+        ):
+            self.stdout.write(self.style.MIGRATE_HEADING(titre))
+            for cumule, propre, _, module in sorted(selection, reverse=True)[:options['top']]:
+                self.stdout.write(f"  {cumule / 1000:8.1f} ms  (propre {propre / 1000:6.1f} ms)  {module}")
@@ -0,0 +1,69 @@
+import io
+import pstats
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from commandes import profilage
+
+TRIS = ('cumulative', 'tottime', 'ncalls')
+
+
+class Command(BaseCommand):
+    help = ("Fusionne les profils écrits par ProfilingMiddleware et affiche, par vue, "
+            "les fonctions les plus coûteuses.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('vues', nargs='*',
+                            help="Vues à afficher (ex. commandes.produit_detail) ; toutes par défaut.")
+        parser.add_argument('--limite', type=int, default=15,
+                            help="Fonctions affichées par vue (défaut : 15).")
+        parser.add_argument('--tri', choices=TRIS, default='cumulative',
+                            help="Critère de tri (défaut : cumulative).")
+        parser.add_argument('--piles', action='store_true',
+                            help="Écrit aussi <vue>.collapsed (piles fusionnées, pour flamegraph) dans le dossier.")
+        parser.add_argument('--jeton', action='store_true',
+                            help="Affiche une valeur d'en-tête X-Profilage valide et quitte.")
+
+    def handle(self, *args, **options):
+        if options['jeton']:
+            self.stdout.write(profilage.jeton())
+            return
+        racine = profilage.dossier()
+        if not racine.is_dir():
+            raise CommandError(f"Aucun profil dans {racine}.")
+        reps = sorted(p for p in racine.iterdir() if p.is_dir())
+        if options['vues']:
+            reps = [p for p in reps if p.name in options['vues']]
+        for rep in reps:
+            fichiers = sorted(rep.glob('*.prof'))
+            if not fichiers:
+                continue
+            self._top(rep.name, fichiers, options)
+            if options['piles']:
+                self._fusionner_piles(rep)
+
+    def _top(self, vue, fichiers, options):
+        sortie = io.StringIO()
+        stats = pstats.Stats(str(fichiers[0]), stream=sortie)
+        for fichier in fichiers[1:]:
+            stats.add(str(fichier))
+        stats.strip_dirs().sort_stats(options['tri']).print_stats(options['limite'])
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{vue} — {len(fichiers)} requête(s), {stats.total_tt / len(fichiers) * 1000:.1f} ms en moyenne"
+        ))
+        # En-tête de pstats (fichiers lus, total) inutile : on garde le tableau
+        lignes = sortie.getvalue().splitlines()
+        debut = next((i for i, ligne in enumerate(lignes) if ligne.lstrip().startswith('ncalls')), 0)
+        self.stdout.write('\n'.join(lignes[debut:]).rstrip() + '\n')
+
+    def _fusionner_piles(self, rep):
+        piles = Counter()
+        for fichier in rep.glob('*.txt'):
+            for ligne in fichier.read_text(encoding='utf-8').splitlines():
+                pile, _, nombre = ligne.rpartition(' ')
+                if pile:
+                    piles[pile] += int(nombre)
+        cible = rep.parent / f'{rep.name}.collapsed'
+        cible.write_text(''.join(f'{pile} {n}\n' for pile, n in piles.most_common()), encoding='utf-8')
+        self.stdout.write(f"Piles fusionnées : {cible}")
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from commandes.positions import reduire_segments
+
+
+class Command(BaseCommand):
+    help = ("Réduit les positions des livraisons terminées (un point par intervalle) ; "
+            "les livraisons en cours gardent toutes leurs positions.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalle', type=float, default=30,
+                            help="Écart minimal (secondes) entre deux points conservés (défaut : 30).")
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help="Livraisons réduites par transaction (défaut : 200).")
+        parser.add_argument('--boucle', type=float, metavar='SECONDES',
+                            help="Recommence toutes les SECONDES secondes au lieu de s'arrêter.")
+
+    def handle(self, *args, **options):
+        while True:
+            debut = time.monotonic()
+            livraisons, avant, apres = reduire_segments(options['intervalle'], options['batch_size'])
+            if livraisons or not options['boucle']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{livraisons} livraison(s) réduite(s) : {avant} -> {apres} point(s) "
+                    f"en {time.monotonic() - debut:.1f} s."
+                ))
+            if not options['boucle']:
+                break
+            time.sleep(options['boucle'])
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from commandes.models import Livraison
+from commandes.zones import repricer_livraisons
+
+
+class Command(BaseCommand):
+    help = "Recalcule le montant des livraisons en attente selon les zones et tarifs de livraison actuels."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--statuts', nargs='+', default=['prep'],
+                            choices=[code for code, _ in Livraison._meta.get_field('statut').choices],
+                            help="Statuts des livraisons à recalculer (défaut : prep).")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Livraisons lues et réécrites par requête (défaut : 1000).")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Compte les montants qui changeraient sans les enregistrer.")
+
+    def handle(self, *args, **options):
+        examinees, modifiees = repricer_livraisons(
+            statuts=options['statuts'],
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+        verbe = "à modifier" if options['dry_run'] else "modifiée(s)"
+        self.stdout.write(self.style.SUCCESS(f"{examinees} livraison(s) examinée(s), {modifiees} {verbe}."))
@@ -0,0 +1,256 @@
+"""Métriques applicatives au format texte Prometheus (vue /metrics).
+
+Les compteurs et histogrammes sont tenus en mémoire par chaque processus
+(un verrou par métrique, mises à jour en O(1)). Avec plusieurs workers,
+chaque processus publie périodiquement (METRIQUES_INTERVALLE secondes, et à
+chaque scrape) un instantané JSON dans METRIQUES_DOSSIER ; la vue /metrics
+additionne les fichiers de tous les processus. Les fichiers des processus
+arrêtés sont conservés pour que les compteurs ne reculent pas : vider le
+dossier au redémarrage du serveur. Sans METRIQUES_DOSSIER, seules les
+valeurs du processus qui répond sont exposées.
+
+Les jauges (files d'attente) sont calculées au moment du scrape.
+"""
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+DUREES = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Compteur:
+    type = 'counter'
+
+    def __init__(self, nom, aide, labels=()):
+        self.nom = nom
+        self.aide = aide
+        self.labels = tuple(labels)
+        self._valeurs = {}
+        self._verrou = threading.Lock()
+
+    def inc(self, *valeurs_labels, n=1):
+        with self._verrou:
+            self._valeurs[valeurs_labels] = self._valeurs.get(valeurs_labels, 0) + n
+
+    def instantane(self):
+        with self._verrou:
+            return [[list(cle), v] for cle, v in self._valeurs.items()]
+
+    @staticmethod
+    def fusionner(total, valeur):
+        return (total or 0) + valeur
+
+    def lignes(self, valeurs):
+        for cle, v in sorted(valeurs.items()):
+            yield f'{self.nom}{_labels(self.labels, cle)} {_nombre(v)}'
+
+
+class Histogramme:
+    type = 'histogram'
+
+    def __init__(self, nom, aide, labels=(), bornes=DUREES):
+        self.nom = nom
+        self.aide = aide
+        self.labels = tuple(labels)
+        self.bornes = tuple(bornes)
+        self._valeurs = {}
+        self._verrou = threading.Lock()
+
+    def observer(self, valeur, *valeurs_labels):
+        # Compteurs par tranche (non cumulés), somme et nombre : cumulés à l'export
+        i = bisect.bisect_left(self.bornes, valeur)
+        with self._verrou:
+            etat = self._valeurs.get(valeurs_labels)
+            if etat is None:
+                etat = self._valeurs[valeurs_labels] = [[0] * (len(self.bornes) + 1), 0.0, 0]
+            etat[0][i] += 1
+            etat[1] += valeur
+            etat[2] += 1
+
+    def instantane(self):
+        with self._verrou:
+            return [[list(cle), [list(e[0]), e[1], e[2]]] for cle, e in self._valeurs.items()]
+
+    @staticmethod
+    def fusionner(total, valeur):
+        if total is None:
+            return [list(valeur[0]), valeur[1], valeur[2]]
+        return [[a + b for a, b in zip(total[0], valeur[0])], total[1] + valeur[1], total[2] + valeur[2]]
+
+    def lignes(self, valeurs):
+        for cle, (tranches, somme, nombre) in sorted(valeurs.items()):
+            cumul = 0
+            for borne, n in zip(self.bornes + ('+Inf',), tranches):
+                cumul += n
+                le = borne if borne == '+Inf' else _nombre(borne)
+                yield f'{self.nom}_bucket{_labels(self.labels + ("le",), cle + (le,))} {cumul}'
+            yield f'{self.nom}_sum{_labels(self.labels, cle)} {_nombre(somme)}'
+            yield f'{self.nom}_count{_labels(self.labels, cle)} {nombre}'
+
+
+def _nombre(v):
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+def _labels(noms, valeurs):
+    if not noms:
+        return ''
+    paires = []
+    for nom, valeur in zip(noms, valeurs):
+        valeur = str(valeur).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+        paires.append(f'{nom}="{valeur}"')
+    return '{' + ','.join(paires) + '}'
+
+
+class Registre:
+    def __init__(self):
+        self.metriques = {}
+        # Nom de fichier unique par processus (un pid peut être réutilisé)
+        self.identifiant = f'{os.getpid()}-{time.time_ns()}'
+        self._publication = 0.0
+        self._verrou = threading.Lock()
+
+    def ajouter(self, metrique):
+        self.metriques[metrique.nom] = metrique
+        return metrique
+
+    def instantane(self):
+        return {nom: m.instantane() for nom, m in self.metriques.items()}
+
+    def _dossier(self):
+        dossier = getattr(settings, 'METRIQUES_DOSSIER', None)
+        return Path(dossier) if dossier else None
+
+    def publier(self):
+        """Écrit l'instantané du processus dans le dossier partagé (remplacement atomique)."""
+        dossier = self._dossier()
+        if dossier is None:
+            return
+        # Le pid peut changer après un fork (workers préchargés)
+        if not self.identifiant.startswith(f'{os.getpid()}-'):
+            self.identifiant = f'{os.getpid()}-{time.time_ns()}'
+        dossier.mkdir(parents=True, exist_ok=True)
+        chemin = dossier / f'{self.identifiant}.json'
+        temporaire = chemin.with_suffix('.tmp')
+        temporaire.write_text(json.dumps(self.instantane()), encoding='utf-8')
+        os.replace(temporaire, chemin)
+        self._publication = time.monotonic()
+
+    def publier_si_necessaire(self):
+        if time.monotonic() - self._publication < getattr(settings, 'METRIQUES_INTERVALLE', 5):
+            return
+        # Un seul thread publie ; les autres continuent sans attendre
+        if not self._verrou.acquire(blocking=False):
+            return
+        try:
+            self.publier()
+        except OSError:
+            pass
+        finally:
+            self._verrou.release()
+
+    def agreger(self):
+        """Valeurs {nom: {labels: valeur}} de tous les processus (ou du seul processus courant)."""
+        dossier = self._dossier()
+        if dossier is None:
+            instantanes = [self.instantane()]
+        else:
+            self.publier()
+            instantanes = []
+            for chemin in dossier.glob('*.json'):
+                try:
+                    instantanes.append(json.loads(chemin.read_text(encoding='utf-8')))
+                except (OSError, ValueError):
+                    # Fichier supprimé ou en cours de remplacement
+                    continue
+        totaux = {nom: {} for nom in self.metriques}
+        for instantane in instantanes:
+            for nom, valeurs in instantane.items():
+                metrique = self.metriques.get(nom)
+                if metrique is None:
+                    continue
+                for cle, valeur in valeurs:
+                    cle = tuple(cle)
+                    totaux[nom][cle] = metrique.fusionner(totaux[nom].get(cle), valeur)
+        return totaux
+
+    def exposer(self, jauges=()):
+        """Texte au format d'exposition Prometheus ; `jauges` : [(nom, aide, labels, {valeurs: n})]."""
+        lignes = []
+        for nom, valeurs in self.agreger().items():
+            metrique = self.metriques[nom]
+            lignes.append(f'# HELP {nom} {metrique.aide}')
+            lignes.append(f'# TYPE {nom} {metrique.type}')
+            lignes.extend(metrique.lignes(valeurs))
+        for nom, aide, labels, valeurs in jauges:
+            lignes.append(f'# HELP {nom} {aide}')
+            lignes.append(f'# TYPE {nom} gauge')
+            for cle, v in sorted(valeurs.items()):
+                lignes.append(f'{nom}{_labels(labels, cle)} {_nombre(v)}')
+        return '\n'.join(lignes) + '\n'
+
+
+registre = Registre()
+
+
+@atexit.register
+def _publier_a_la_sortie():
+    if registre._publication:
+        try:
+            registre.publier()
+        except Exception:
+            pass
+
+
+REQUETES = registre.ajouter(Compteur(
+    'commandes_http_requetes_total', "Requêtes HTTP traitées, par vue, méthode et code de statut.",
+    ('vue', 'methode', 'statut'),
+))
+DUREE_REQUETES = registre.ajouter(Histogramme(
+    'commandes_http_duree_secondes', "Durée de traitement des requêtes HTTP, par vue.", ('vue',),
+))
+SQL_REQUETES = registre.ajouter(Compteur(
+    'commandes_sql_requetes_total', "Requêtes SQL exécutées, par vue.", ('vue',),
+))
+SQL_DUREE = registre.ajouter(Compteur(
+    'commandes_sql_duree_secondes_total', "Temps passé dans les requêtes SQL, par vue.", ('vue',),
+))
+CACHE = registre.ajouter(Compteur(
+    'commandes_cache_lectures_total', "Lectures de cache par résultat (hit / miss).", ('resultat',),
+))
+CHECKOUT = registre.ajouter(Compteur(
+    'commandes_checkout_total', "Validations de commande par résultat (succes, panier_vide, erreur).",
+    ('resultat',),
+))
+
+
+def jauges_files_attente():
+    """Taille des files d'attente de tâches de fond (calculée à chaque scrape)."""
+    from django.db.models import Count
+
+    from .models import EnvoiWebhook, NotificationFournisseur, RapportJob
+
+    rapports = dict(
+        RapportJob.objects.filter(statut__in=RapportJob.STATUTS_ACTIFS)
+        .values_list('statut').annotate(n=Count('id')).order_by()
+    )
+    valeurs = {('rapports', statut): rapports.get(statut, 0) for statut in RapportJob.STATUTS_ACTIFS}
+    # Les envois abandonnés restent comptés : une file morte qui grossit doit alerter
+    statuts_webhooks = EnvoiWebhook.STATUTS_ACTIFS + ('mort',)
+    webhooks = dict(
+        EnvoiWebhook.objects.filter(statut__in=statuts_webhooks)
+        .values_list('statut').annotate(n=Count('id')).order_by()
+    )
+    valeurs.update({('webhooks', statut): webhooks.get(statut, 0) for statut in statuts_webhooks})
+    # Récapitulatifs fournisseurs non envoyés (index partiel notif_a_envoyer_idx)
+    valeurs[('notifications', 'en_attente')] = NotificationFournisseur.objects.filter(envoyee_at__isnull=True).count()
+    return [(
+        'commandes_file_attente_taches', "Tâches de fond en attente ou en cours, par file.",
+        ('file', 'statut'), valeurs,
+    )]
@@ -0,0 +1,192 @@
+"""Middlewares de l'application, utilisables sous WSGI comme sous ASGI.
+
+Chacun est synchrone et asynchrone (sync_capable / async_capable) : sous
+ASGI, la chaîne reste asynchrone jusqu'à la vue et le flux SSE des statuts
+(vue asynchrone) n'est pas exécuté dans un thread.
+"""
+import contextvars
+import time
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+from . import metriques, profilage, throttling
+from .roles import resoudre_fournisseur
+
+
+class _SyncEtAsync:
+    """Base des middlewares à double mode : __call__ en WSGI, __acall__ sous ASGI."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.traiter(request)
+
+    def traiter(self, request):
+        raise NotImplementedError
+
+    async def __acall__(self, request):
+        raise NotImplementedError
+
+
+class FournisseurProfileMiddleware(_SyncEtAsync):
+    """Expose `request.fournisseur` (profil fournisseur ou None), résolu à la première lecture.
+
+    Objet paresseux : les requêtes qui ne le lisent pas ne consultent ni la
+    version du rôle ni la session. Le tester par sa valeur de vérité
+    (`if request.fournisseur`), jamais avec `is None`.
+    À placer après AuthenticationMiddleware.
+    """
+
+    def traiter(self, request):
+        request.fournisseur = SimpleLazyObject(lambda: resoudre_fournisseur(request))
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # Résolu (ORM synchrone) seulement par les vues synchrones qui le lisent
+        request.fournisseur = SimpleLazyObject(lambda: resoudre_fournisseur(request))
+        return await self.get_response(request)
+
+
+class ThrottleMiddleware(MiddlewareMixin):
+    """Applique THROTTLE_RATES aux vues par nom d'URL ; répond 429 avec Retry-After.
+
+    Le contrôle a lieu dans process_view : la vue (et l'écriture de session) n'est pas exécutée.
+    MiddlewareMixin gère les deux modes ; sous ASGI, process_view (cache synchrone)
+    est exécuté dans un thread, la vue et sa réponse restent asynchrones.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.regles = throttling.charger_regles()
+        self.cache = throttling.cache_throttle()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        if not self.regles or match is None:
+            return None
+        nom = match.view_name if match.view_name in self.regles else match.url_name
+        regle = self.regles.get(nom)
+        if regle is None:
+            return None
+        methodes, seaux = regle
+        if methodes is not None and request.method not in methodes:
+            return None
+        attente = throttling.verifier(request, nom, seaux, self.cache)
+        if attente:
+            return throttling.reponse_trop_de_requetes(attente)
+        return None
+
+
+class ProfilingMiddleware(_SyncEtAsync):
+    """Profile (cProfile + piles échantillonnées) une fraction des requêtes ou celles portant un jeton signé.
+
+    Voir commandes/profilage.py. À placer en tête de MIDDLEWARE pour couvrir
+    les middlewares suivants ; le contenu des réponses en streaming n'est pas profilé.
+    """
+
+    def traiter(self, request):
+        if not profilage.a_profiler(request):
+            return self.get_response(request)
+        return self.profiler(request, self.get_response)
+
+    async def __acall__(self, request):
+        if not profilage.a_profiler(request):
+            return await self.get_response(request)
+        # La suite de la chaîne tourne dans un thread profilé : les vues synchrones
+        # (sync_to_async) reviennent s'exécuter dans ce thread, comme sous WSGI
+        return await sync_to_async(self.profiler)(request, async_to_sync(self.get_response))
+
+    def profiler(self, request, get_response):
+        with profilage.Profil() as profil:
+            response = get_response(request)
+        if not profil.actif:
+            return response
+        try:
+            chemin = profil.enregistrer(profilage.nom_vue(request))
+        except OSError:
+            # Le profilage ne doit jamais faire échouer la requête
+            return response
+        if profilage.ENTETE in request.META:
+            response['X-Profilage-Fichier'] = f'{chemin.parent.name}/{chemin.name}'
+        return response
+
+
+# Compteur SQL (nombre, durée) de la requête mesurée en cours. Une ContextVar
+# suit la requête jusque dans les threads de sync_to_async, où s'exécutent les
+# vues synchrones sous ASGI ; hors requête mesurée elle vaut None.
+_sql_requete = contextvars.ContextVar('sql_requete', default=None)
+
+
+def _compter_sql(execute, sql, params, many, context):
+    compteur = _sql_requete.get()
+    if compteur is None:
+        return execute(sql, params, many, context)
+    debut = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        compteur[0] += 1
+        compteur[1] += time.perf_counter() - debut
+
+
+def _installer_compteur(connection, **kwargs):
+    if _compter_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_compter_sql)
+
+
+# Chaque connexion ouverte, quel que soit le thread, porte le compteur
+connection_created.connect(_installer_compteur)
+
+
+class MetriquesMiddleware(_SyncEtAsync):
+    """Durée, code de statut et requêtes SQL de chaque requête, par vue (voir commandes/metriques.py).
+
+    À placer en tête de MIDDLEWARE pour mesurer toute la chaîne.
+    """
+
+    def traiter(self, request):
+        # Connexions du thread ouvertes avant le chargement de ce module
+        for connection in connections.all(initialized_only=True):
+            _installer_compteur(connection)
+        sql = [0, 0.0]
+        jeton = _sql_requete.set(sql)
+        debut = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _sql_requete.reset(jeton)
+        self.publier(request, response, time.perf_counter() - debut, sql)
+        return response
+
+    async def __acall__(self, request):
+        sql = [0, 0.0]
+        jeton = _sql_requete.set(sql)
+        debut = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _sql_requete.reset(jeton)
+        self.publier(request, response, time.perf_counter() - debut, sql)
+        return response
+
+    def publier(self, request, response, duree, sql):
+        match = request.resolver_match
+        vue = match.view_name if match is not None and match.url_name else ''
+        metriques.REQUETES.inc(vue, request.method, str(response.status_code))
+        metriques.DUREE_REQUETES.observer(duree, vue)
+        if sql[0]:
+            metriques.SQL_REQUETES.inc(vue, n=sql[0])
+            metriques.SQL_DUREE.inc(vue, n=sql[1])
+        metriques.registre.publier_si_necessaire()
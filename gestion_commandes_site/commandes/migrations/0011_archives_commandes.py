@@ -0,0 +1,89 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commandes', '0010_alter_commande_options_alter_livraison_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommandeArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('quantite', models.PositiveIntegerField()),
+                ('date_commande', models.DateTimeField()),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('en_cours', 'En cours de livraison'), ('livree', 'Livrée'), ('annulee', 'Annulée')], max_length=20)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-date_commande'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LigneCommandeArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('quantite', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LivraisonArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('transport', models.CharField(blank=True, choices=[('moto', 'Moto'), ('voiture', 'Voiture'), ('a_pied', 'À pied'), ('trottinette', 'Trottinette')], max_length=30, null=True)),
+                ('adresse_livraison', models.CharField(blank=True, max_length=255)),
+                ('montant', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('description', models.TextField(blank=True)),
+                ('date_prevue', models.DateTimeField(blank=True, null=True)),
+                ('date_effective', models.DateTimeField(blank=True, null=True)),
+                ('date_livraison', models.DateTimeField(blank=True, null=True)),
+                ('statut', models.CharField(choices=[('prep', 'Préparée'), ('en_transit', 'En transit'), ('livree', 'Livrée'), ('retournee', 'Retournée')], max_length=20)),
+                ('assigned_at', models.DateTimeField(blank=True, null=True)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='commande',
+            index=models.Index(fields=['statut', 'date_commande'], name='commande_statut_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='commandearchive',
+            name='client',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='commandes_archivees', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='commandearchive',
+            name='produit',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='commandes.produit'),
+        ),
+        migrations.AddField(
+            model_name='lignecommandearchive',
+            name='commande',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lignes', to='commandes.commandearchive'),
+        ),
+        migrations.AddField(
+            model_name='lignecommandearchive',
+            name='produit',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='commandes.produit'),
+        ),
+        migrations.AddField(
+            model_name='livraisonarchive',
+            name='commande',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='livraison', to='commandes.commandearchive'),
+        ),
+        migrations.AddIndex(
+            model_name='commandearchive',
+            index=models.Index(fields=['client', '-date_commande'], name='cmdarch_client_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commandearchive',
+            index=models.Index(fields=['statut', '-date_commande'], name='cmdarch_statut_date_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commandes', '0011_archives_commandes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommandeFournisseur',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_commande', models.DateTimeField()),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('en_cours', 'En cours de livraison'), ('livree', 'Livrée'), ('annulee', 'Annulée')], max_length=20)),
+                ('commande', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='liens_fournisseurs', to='commandes.commande')),
+                ('fournisseur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='liens_commandes', to='commandes.fournisseur')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['fournisseur', 'date_commande'], name='cmdfourn_fourn_date_idx'), models.Index(fields=['fournisseur', 'statut', 'date_commande'], name='cmdfourn_fourn_statut_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('fournisseur', 'commande'), name='cmdfourn_fournisseur_commande_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_liens_fournisseurs(apps, schema_editor):
+    Commande = apps.get_model('commandes', 'Commande')
+    LigneCommande = apps.get_model('commandes', 'LigneCommande')
+    CommandeFournisseur = apps.get_model('commandes', 'CommandeFournisseur')
+    last_pk = 0
+    while True:
+        commandes = list(
+            Commande.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', 'date_commande', 'statut', 'produit__fournisseur_id')[:BATCH_SIZE]
+        )
+        if not commandes:
+            break
+        infos = {pk: (date, statut) for pk, date, statut, _ in commandes}
+        paires = {(pk, fid) for pk, _, _, fid in commandes if fid}
+        paires.update(
+            LigneCommande.objects.filter(commande_id__in=infos.keys())
+            .values_list('commande_id', 'produit__fournisseur_id')
+        )
+        CommandeFournisseur.objects.bulk_create(
+            [
+                CommandeFournisseur(fournisseur_id=fid, commande_id=cid,
+                                    date_commande=infos[cid][0], statut=infos[cid][1])
+                for cid, fid in paires
+            ],
+            ignore_conflicts=True,
+        )
+        last_pk = commandes[-1][0]
+
+
+def reverse_func(apps, schema_editor):
+    apps.get_model('commandes', 'CommandeFournisseur').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('commandes', '0012_commandefournisseur'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_liens_fournisseurs, reverse_func),
+    ]
@@ -0,0 +1,58 @@
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def _lots(qs):
+    """Parcourt (pk, produit_id, quantite) par lots, en pagination par clé."""
+    last_pk = 0
+    while True:
+        lot = list(
+            qs.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', 'produit_id', 'quantite')[:BATCH_SIZE]
+        )
+        if not lot:
+            break
+        yield lot
+        last_pk = lot[-1][0]
+
+
+def creer_lignes(apps, schema_editor):
+    """Crée une LigneCommande pour chaque commande "produit unique" qui n'en a pas."""
+    Commande = apps.get_model('commandes', 'Commande')
+    LigneCommande = apps.get_model('commandes', 'LigneCommande')
+    CommandeArchive = apps.get_model('commandes', 'CommandeArchive')
+    LigneCommandeArchive = apps.get_model('commandes', 'LigneCommandeArchive')
+
+    legacy = Commande.objects.filter(produit__isnull=False, lignes__isnull=True)
+    for lot in _lots(legacy):
+        LigneCommande.objects.bulk_create([
+            LigneCommande(commande_id=pk, produit_id=produit_id, quantite=quantite)
+            for pk, produit_id, quantite in lot
+        ])
+    # Les liens fournisseur de ces commandes existent déjà (0013)
+
+    legacy_archive = CommandeArchive.objects.filter(produit__isnull=False, lignes__isnull=True)
+    for lot in _lots(legacy_archive):
+        # Identifiants négatifs : ils ne peuvent pas entrer en collision avec
+        # ceux des lignes "chaudes" archivées plus tard (toujours positifs).
+        LigneCommandeArchive.objects.bulk_create([
+            LigneCommandeArchive(id=-pk, commande_id=pk, produit_id=produit_id, quantite=quantite)
+            for pk, produit_id, quantite in lot
+        ])
+
+
+def reverse_func(apps, schema_editor):
+    # Les lignes créées restent valides ; le champ Commande.produit est
+    # ré-ajouté vide par la migration suivante en sens inverse.
+    pass
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('commandes', '0013_backfill_commandefournisseur'),
+    ]
+
+    operations = [
+        migrations.RunPython(creer_lignes, reverse_func),
+    ]
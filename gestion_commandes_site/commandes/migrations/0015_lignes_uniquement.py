@@ -0,0 +1,56 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:02
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def restaurer_produit_unique(apps, schema_editor):
+    """Sens inverse : recopie la première ligne de chaque commande dans les champs produit / quantite."""
+    for nom_commande, nom_ligne in (('Commande', 'LigneCommande'), ('CommandeArchive', 'LigneCommandeArchive')):
+        Commande = apps.get_model('commandes', nom_commande)
+        Ligne = apps.get_model('commandes', nom_ligne)
+        premiere = Ligne.objects.filter(commande_id=OuterRef('pk')).order_by('pk')
+        Commande.objects.update(
+            produit_id=Subquery(premiere.values('produit_id')[:1]),
+            quantite=Subquery(premiere.values('quantite')[:1]),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commandes', '0014_backfill_lignes_commandes_simples'),
+    ]
+
+    # En sens inverse, les champs sont recréés vides (quantite nullable),
+    # remplis depuis les lignes, puis quantite redevient obligatoire : une
+    # commande sans ligne bloque alors le retour arrière.
+    operations = [
+        migrations.AlterField(
+            model_name='commande',
+            name='quantite',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='commandearchive',
+            name='quantite',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.RunPython(migrations.RunPython.noop, restaurer_produit_unique),
+        migrations.RemoveField(
+            model_name='commande',
+            name='produit',
+        ),
+        migrations.RemoveField(
+            model_name='commande',
+            name='quantite',
+        ),
+        migrations.RemoveField(
+            model_name='commandearchive',
+            name='produit',
+        ),
+        migrations.RemoveField(
+            model_name='commandearchive',
+            name='quantite',
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:07
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commandes', '0017_index_admin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EvenementStatut',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entite', models.PositiveSmallIntegerField(choices=[(1, 'Commande'), (2, 'Livraison')])),
+                ('entite_id', models.BigIntegerField()),
+                ('statut', models.PositiveSmallIntegerField()),
+                ('horodatage', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['entite', 'entite_id', 'horodatage'], name='evt_entite_horodatage_idx'), models.Index(fields=['entite', 'statut', 'horodatage'], name='evt_statut_horodatage_idx')],
+            },
+        ),
+    ]
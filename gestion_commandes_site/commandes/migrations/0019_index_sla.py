@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commandes', '0018_evenementstatut'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='livraison',
+            index=models.Index(fields=['assigned_at'], name='livraison_assigned_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('commandes', '0020_rapportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Panier',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='panier', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PanierLigne',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantite', models.PositiveIntegerField(default=1)),
+                ('panier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lignes', to='commandes.panier')),
+                ('produit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='commandes.produit')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('panier', 'produit'), name='panierligne_panier_produit_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commandes', '0021_panier'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lignecommande',
+            index=models.Index(fields=['produit', 'commande'], name='lignecmd_produit_cmd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produit',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_at'], name='produit_actif_date_idx'),
+        ),
+    ]
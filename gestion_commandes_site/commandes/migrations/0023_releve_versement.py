@@ -0,0 +1,64 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commandes', '0022_index_plans'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReleveVersement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('debut', models.DateField()),
+                ('fin', models.DateField()),
+                ('ventes_brutes', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('taux_commission', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('compte_bancaire', models.CharField(blank=True, max_length=255)),
+                ('commission', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('net', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('nb_commandes', models.PositiveIntegerField()),
+                ('nb_lignes', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-debut', 'fournisseur_id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='lignecommande',
+            name='prix_unitaire',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='lignecommandearchive',
+            name='prix_unitaire',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='livraison',
+            index=models.Index(fields=['statut', 'delivered_at'], name='livraison_statut_livree_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='livraisonarchive',
+            index=models.Index(fields=['statut', 'delivered_at'], name='livarch_statut_livree_idx'),
+        ),
+        migrations.AddField(
+            model_name='releveversement',
+            name='fournisseur',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='releves_versement', to='commandes.fournisseur'),
+        ),
+        migrations.AddIndex(
+            model_name='releveversement',
+            index=models.Index(fields=['debut', 'fin'], name='releve_periode_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='releveversement',
+            constraint=models.UniqueConstraint(fields=('fournisseur', 'debut', 'fin'), name='releve_fourn_periode_uniq'),
+        ),
+    ]
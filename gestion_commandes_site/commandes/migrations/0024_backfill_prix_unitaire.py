@@ -0,0 +1,13 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Plus de remplissage : le prix courant du produit n'est pas celui payé à la
+    # commande. Les lignes antérieures à prix_unitaire gardent un prix inconnu
+    # (NULL) ; les relevés de versement refusent les périodes qui en contiennent.
+
+    dependencies = [
+        ('commandes', '0023_releve_versement'),
+    ]
+
+    operations = []
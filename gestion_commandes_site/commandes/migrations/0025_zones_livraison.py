@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commandes', '0024_backfill_prix_unitaire'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ZoneLivraison',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom', models.CharField(max_length=100, unique=True)),
+                ('villes', models.TextField(blank=True, help_text='Villes ou quartiers de la zone, un par ligne')),
+                ('prefixes_postaux', models.CharField(blank=True, help_text='Préfixes de codes postaux séparés par des virgules ou des espaces (ex. 101, 1012)', max_length=500)),
+                ('ordre', models.PositiveSmallIntegerField(default=0)),
+                ('actif', models.BooleanField(default=True)),
+            ],
+            options={
+                'ordering': ['ordre', 'nom'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TarifZone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transport', models.CharField(max_length=30)),
+                ('montant', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('zone', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tarifs', to='commandes.zonelivraison')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('zone', 'transport'), name='tarifzone_zone_transport_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commandes', '0025_zones_livraison'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PreferenceNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recapitulatif', models.BooleanField(default=True, help_text='Recevoir les nouvelles commandes par e-mail')),
+                ('intervalle_minutes', models.PositiveIntegerField(default=15, help_text="Délai maximal entre une nouvelle commande et l'e-mail récapitulatif")),
+                ('email', models.EmailField(blank=True, help_text='Adresse de réception (par défaut, celle du fournisseur)', max_length=254)),
+                ('fournisseur', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='preference_notification', to='commandes.fournisseur')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='NotificationFournisseur',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nb_articles', models.PositiveIntegerField(default=0)),
+                ('montant', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('lue', models.BooleanField(default=False)),
+                ('envoyee_at', models.DateTimeField(blank=True, null=True)),
+                ('commande', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='commandes.commande')),
+                ('fournisseur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='commandes.fournisseur')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('lue', False)), fields=['fournisseur'], name='notif_non_lues_idx'), models.Index(condition=models.Q(('envoyee_at__isnull', True)), fields=['fournisseur', 'created_at'], name='notif_a_envoyer_idx')],
+                'constraints': [models.UniqueConstraint(fields=('fournisseur', 'commande'), name='notif_fourn_commande_uniq')],
+            },
+        ),
+    ]
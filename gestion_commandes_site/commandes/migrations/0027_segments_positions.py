@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commandes', '0026_notifications_fournisseurs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SegmentPositions',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('debut', models.DateTimeField()),
+                ('nb_points', models.PositiveIntegerField()),
+                ('donnees', models.BinaryField()),
+                ('reduit', models.BooleanField(default=False)),
+                ('livraison', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segments_positions', to='commandes.livraison')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['livraison', 'debut'], name='segpos_livraison_debut_idx'), models.Index(condition=models.Q(('reduit', False)), fields=['livraison'], name='segpos_a_reduire_idx')],
+            },
+        ),
+    ]
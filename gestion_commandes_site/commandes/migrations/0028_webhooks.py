@@ -0,0 +1,52 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:49
+
+import commandes.models
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commandes', '0027_segments_positions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AbonnementWebhook',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom', models.CharField(max_length=100)),
+                ('url', models.URLField(max_length=500)),
+                ('secret', models.CharField(default=commandes.models._secret_webhook, help_text='Clé de signature HMAC-SHA256', max_length=64)),
+                ('entite', models.PositiveSmallIntegerField(blank=True, choices=[(1, 'Commande'), (2, 'Livraison')], null=True)),
+                ('actif', models.BooleanField(default=True)),
+                ('curseur', models.BigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EnvoiWebhook',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('premier_evenement', models.BigIntegerField()),
+                ('dernier_evenement', models.BigIntegerField()),
+                ('nb_evenements', models.PositiveIntegerField()),
+                ('corps', models.TextField()),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('en_cours', 'En cours'), ('envoye', 'Envoyé'), ('mort', 'Abandonné')], default='en_attente', max_length=20)),
+                ('tentatives', models.PositiveSmallIntegerField(default=0)),
+                ('prochain_essai', models.DateTimeField(default=django.utils.timezone.now)),
+                ('code_http', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('erreur', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('envoye_at', models.DateTimeField(blank=True, null=True)),
+                ('abonnement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='envois', to='commandes.abonnementwebhook')),
+            ],
+            options={
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['statut', 'prochain_essai'], name='envoiwh_statut_essai_idx'), models.Index(fields=['abonnement', 'statut'], name='envoiwh_abonnement_statut_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commandes', '0028_webhooks'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='commandefournisseur',
+            name='commande',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='liens_fournisseurs', to='commandes.commande'),
+        ),
+        migrations.AlterField(
+            model_name='notificationfournisseur',
+            name='commande',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='commandes.commande'),
+        ),
+        migrations.AlterField(
+            model_name='segmentpositions',
+            name='livraison',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='segments_positions', to='commandes.livraison'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commandes', '0029_liens_conserves_archivage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionDonnees',
+            fields=[
+                ('cle', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('valeur', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,118 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def _lots(qs):
+    """Parcourt les objets de `qs` par lots, en pagination par clé."""
+    last_pk = 0
+    while True:
+        lot = list(qs.filter(pk__gt=last_pk).order_by('pk')[:BATCH_SIZE])
+        if not lot:
+            break
+        yield lot
+        last_pk = lot[-1].pk
+
+
+def deplacer_vers_archives(apps, schema_editor):
+    """Les liens et segments des commandes déjà archivées (conservés sans contrainte
+    depuis 0029) passent dans les tables d'archive ; les notifications orphelines
+    sont supprimées. Les contraintes de clé étrangère sont rétablies en 0033."""
+    Commande = apps.get_model('commandes', 'Commande')
+    Livraison = apps.get_model('commandes', 'Livraison')
+    CommandeFournisseur = apps.get_model('commandes', 'CommandeFournisseur')
+    CommandeFournisseurArchive = apps.get_model('commandes', 'CommandeFournisseurArchive')
+    NotificationFournisseur = apps.get_model('commandes', 'NotificationFournisseur')
+    SegmentPositions = apps.get_model('commandes', 'SegmentPositions')
+    SegmentPositionsArchive = apps.get_model('commandes', 'SegmentPositionsArchive')
+    CommandeArchive = apps.get_model('commandes', 'CommandeArchive')
+    LivraisonArchive = apps.get_model('commandes', 'LivraisonArchive')
+
+    liens = CommandeFournisseur.objects.exclude(commande_id__in=Commande.objects.values('pk'))
+    for lot in _lots(liens.filter(commande_id__in=CommandeArchive.objects.values('pk'))):
+        CommandeFournisseurArchive.objects.bulk_create([
+            CommandeFournisseurArchive(
+                fournisseur_id=lien.fournisseur_id, commande_id=lien.commande_id,
+                date_commande=lien.date_commande, statut=lien.statut,
+            )
+            for lien in lot
+        ], ignore_conflicts=True)
+    liens.delete()
+
+    segments = SegmentPositions.objects.exclude(livraison_id__in=Livraison.objects.values('pk'))
+    for lot in _lots(segments.filter(livraison_id__in=LivraisonArchive.objects.values('pk'))):
+        SegmentPositionsArchive.objects.bulk_create([
+            SegmentPositionsArchive(
+                livraison_id=seg.livraison_id, debut=seg.debut, nb_points=seg.nb_points,
+                donnees=seg.donnees, reduit=seg.reduit,
+            )
+            for seg in lot
+        ])
+    segments.delete()
+
+    NotificationFournisseur.objects.exclude(commande_id__in=Commande.objects.values('pk')).delete()
+
+
+def restaurer_depuis_archives(apps, schema_editor):
+    """Sens inverse : les lignes d'archive retournent dans les tables sans contrainte (0029)."""
+    CommandeFournisseur = apps.get_model('commandes', 'CommandeFournisseur')
+    CommandeFournisseurArchive = apps.get_model('commandes', 'CommandeFournisseurArchive')
+    SegmentPositions = apps.get_model('commandes', 'SegmentPositions')
+    SegmentPositionsArchive = apps.get_model('commandes', 'SegmentPositionsArchive')
+
+    for lot in _lots(CommandeFournisseurArchive.objects.all()):
+        CommandeFournisseur.objects.bulk_create([
+            CommandeFournisseur(
+                fournisseur_id=lien.fournisseur_id, commande_id=lien.commande_id,
+                date_commande=lien.date_commande, statut=lien.statut,
+            )
+            for lien in lot
+        ], ignore_conflicts=True)
+    for lot in _lots(SegmentPositionsArchive.objects.all()):
+        SegmentPositions.objects.bulk_create([
+            SegmentPositions(
+                livraison_id=seg.livraison_id, debut=seg.debut, nb_points=seg.nb_points,
+                donnees=seg.donnees, reduit=seg.reduit,
+            )
+            for seg in lot
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commandes', '0031_fournisseur_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommandeFournisseurArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_commande', models.DateTimeField()),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('en_cours', 'En cours de livraison'), ('livree', 'Livrée'), ('annulee', 'Annulée')], max_length=20)),
+                ('commande', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='liens_fournisseurs', to='commandes.commandearchive')),
+                ('fournisseur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='liens_commandes_archivees', to='commandes.fournisseur')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['fournisseur', 'date_commande'], name='cmdfourn_arch_fourn_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('fournisseur', 'commande'), name='cmdfourn_arch_fourn_cmd_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SegmentPositionsArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('debut', models.DateTimeField()),
+                ('nb_points', models.PositiveIntegerField()),
+                ('donnees', models.BinaryField()),
+                ('reduit', models.BooleanField(default=True)),
+                ('livraison', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segments_positions', to='commandes.livraisonarchive')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['livraison', 'debut'], name='segpos_arch_livraison_idx')],
+            },
+        ),
+        migrations.RunPython(deplacer_vers_archives, restaurer_depuis_archives),
+    ]
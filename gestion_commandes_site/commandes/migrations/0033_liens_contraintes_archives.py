@@ -0,0 +1,53 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def renumeroter_lignes_archivees(apps, schema_editor):
+    """Les lignes créées par 0014 pour les commandes archivées avaient un identifiant
+    négatif (-pk de la commande) : elles reçoivent un identifiant de la séquence."""
+    LigneCommandeArchive = apps.get_model('commandes', 'LigneCommandeArchive')
+    while True:
+        lot = list(LigneCommandeArchive.objects.filter(pk__lt=0).order_by('pk')[:BATCH_SIZE])
+        if not lot:
+            break
+        LigneCommandeArchive.objects.bulk_create([
+            LigneCommandeArchive(
+                commande_id=l.commande_id, produit_id=l.produit_id, quantite=l.quantite,
+                prix_unitaire=l.prix_unitaire,
+            )
+            for l in lot
+        ])
+        LigneCommandeArchive.objects.filter(pk__in=[l.pk for l in lot]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commandes', '0032_archives_liens_segments'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='commandefournisseur',
+            name='commande',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='liens_fournisseurs', to='commandes.commande'),
+        ),
+        migrations.AlterField(
+            model_name='lignecommandearchive',
+            name='id',
+            field=models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID'),
+        ),
+        migrations.AlterField(
+            model_name='notificationfournisseur',
+            name='commande',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='commandes.commande'),
+        ),
+        migrations.AlterField(
+            model_name='segmentpositions',
+            name='livraison',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segments_positions', to='commandes.livraison'),
+        ),
+        migrations.RunPython(renumeroter_lignes_archivees, migrations.RunPython.noop),
+    ]
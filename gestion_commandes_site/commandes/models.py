@@ -1,4 +1,7 @@
-from django.db import models
+import secrets
+from datetime import timedelta
+
+from django.db import models, transaction
 from django.conf import settings
 from django.utils import timezone
 
@@ -15,6 +18,8 @@ class Fournisseur(models.Model):
     ville = models.CharField(max_length=100, blank=True)
     approved = models.BooleanField(default=False, help_text="Validé par l'admin pour vendre")
     created_at = models.DateTimeField(auto_now_add=True)
+    # Validateur HTTP des pages produit, qui affichent les coordonnées du fournisseur
+    updated_at = models.DateTimeField(auto_now=True)
 
     # Champs facturation / commission
     commission_rate = models.DecimalField(
@@ -26,6 +31,18 @@ class Fournisseur(models.Model):
     def __str__(self):
         return self.nom or getattr(self.user, "get_full_name", lambda: "")() or getattr(self.user, "username", "")
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .roles import invalider_role_fournisseur
+        invalider_role_fournisseur(self.user_id)
+
+    def delete(self, *args, **kwargs):
+        user_id = self.user_id
+        result = super().delete(*args, **kwargs)
+        from .roles import invalider_role_fournisseur
+        invalider_role_fournisseur(user_id)
+        return result
+
 class Produit(models.Model):
     nom = models.CharField(max_length=100)
     slug = models.SlugField(max_length=128, unique=True)
@@ -36,18 +53,49 @@ class Produit(models.Model):
     quantite_minimale = models.PositiveIntegerField(default=1, help_text="Quantité minimale de commande")
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Catalogue : produits actifs, les plus récents d'abord. Index partiel : le filtre
+            # booléen est rendu "WHERE is_active" (sans comparaison), inutilisable par un index composite.
+            models.Index(fields=['created_at'], condition=models.Q(is_active=True), name='produit_actif_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nom} (Min: {self.quantite_minimale})"
 
+class Panier(models.Model):
+    """Panier persistant d'un utilisateur connecté (clé primaire = utilisateur)."""
+    user = models.OneToOneField(USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='panier')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Panier de l'utilisateur {self.user_id}"
+
+
+class PanierLigne(models.Model):
+    panier = models.ForeignKey(Panier, on_delete=models.CASCADE, related_name='lignes')
+    produit = models.ForeignKey(Produit, on_delete=models.CASCADE, related_name='+')
+    quantite = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['panier', 'produit'], name='panierligne_panier_produit_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantite} x produit {self.produit_id} (panier {self.panier_id})"
+
+
 class Commande(models.Model):
+    # Statuts considérés comme terminés (candidats à l'archivage)
+    STATUTS_TERMINES = ('livree', 'annulee')
+
     # Nouveau: lien vers l'utilisateur qui a passé la commande
     client = models.ForeignKey(USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='commandes')
-    produit = models.ForeignKey(Produit, on_delete=models.CASCADE, null=True, blank=True)
-    quantite = models.PositiveIntegerField()
+    # Les produits commandés sont portés exclusivement par LigneCommande
     date_commande = models.DateTimeField(auto_now_add=True)
     statut = models.CharField(
         max_length=20,
@@ -59,23 +107,118 @@ class Commande(models.Model):
         ],
         default='en_attente'
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    est_archivee = False
 
     class Meta:
         ordering = ['-date_commande']
+        indexes = [
+            models.Index(fields=['statut', 'date_commande'], name='commande_statut_date_idx'),
+            models.Index(fields=['date_commande'], name='commande_date_idx'),
+            models.Index(fields=['client', 'date_commande'], name='commande_client_date_idx'),
+        ]
 
     def __str__(self):
         user_part = f" pour {self.client.username}" if self.client else ""
-        return f"Commande {self.id}{user_part} - {self.produit.nom if self.produit else '—'}"
+        return f"Commande {self.id}{user_part}"
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        # Maintient la table d'appartenance commande <-> fournisseur
+        if not adding:
+            self.liens_fournisseurs.update(statut=self.statut, date_commande=self.date_commande)
 
 class LigneCommande(models.Model):
     commande = models.ForeignKey(Commande, on_delete=models.CASCADE, related_name='lignes')
     produit = models.ForeignKey(Produit, on_delete=models.CASCADE)
     quantite = models.PositiveIntegerField()
+    # Prix du produit au moment de la commande (base des ventes et des versements) ;
+    # NULL pour les lignes antérieures au champ, dont le prix payé est inconnu
+    prix_unitaire = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Dernière commande d'un produit, lue dans l'ordre de l'index
+            models.Index(fields=['produit', 'commande'], name='lignecmd_produit_cmd_idx'),
+        ]
 
     def __str__(self):
-        return f"Ligne de commande {self.id} - {self.produit.nom}"
+        return f"Ligne de commande {self.id} (commande #{self.commande_id})"
+
+    def save(self, *args, **kwargs):
+        if self.prix_unitaire is None:
+            self.prix_unitaire = self.produit.prix
+        super().save(*args, **kwargs)
+        CommandeFournisseur.lier(self.commande, [self.produit.fournisseur_id])
+
+    def delete(self, *args, **kwargs):
+        commande_id = self.commande_id
+        result = super().delete(*args, **kwargs)
+        CommandeFournisseur.reconstruire([commande_id])
+        return result
+
+
+class CommandeFournisseur(models.Model):
+    """Table d'appartenance dénormalisée : une ligne par (fournisseur, commande).
+
+    Remplace les jointures `lignes__produit__fournisseur` + DISTINCT des vues
+    fournisseur par une recherche indexée.
+    Maintenue par Commande.save / LigneCommande.save ; voir aussi la commande
+    `backfill_commande_fournisseurs`.
+    """
+    fournisseur = models.ForeignKey(Fournisseur, on_delete=models.CASCADE, related_name='liens_commandes')
+    commande = models.ForeignKey(Commande, on_delete=models.CASCADE, related_name='liens_fournisseurs')
+    # Copies de Commande.date_commande / Commande.statut pour filtrer et trier sur l'index
+    date_commande = models.DateTimeField()
+    statut = models.CharField(max_length=20, choices=Commande._meta.get_field('statut').choices)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['fournisseur', 'commande'], name='cmdfourn_fournisseur_commande_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['fournisseur', 'date_commande'], name='cmdfourn_fourn_date_idx'),
+            models.Index(fields=['fournisseur', 'statut', 'date_commande'], name='cmdfourn_fourn_statut_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"Commande #{self.commande_id} / fournisseur #{self.fournisseur_id}"
+
+    @classmethod
+    def lier(cls, commande, fournisseur_ids):
+        """Ajoute (sans doublon) les liens entre `commande` et les fournisseurs donnés."""
+        cls.objects.bulk_create(
+            [
+                cls(fournisseur_id=fid, commande_id=commande.pk,
+                    date_commande=commande.date_commande, statut=commande.statut)
+                for fid in set(fournisseur_ids) if fid
+            ],
+            ignore_conflicts=True,
+        )
+
+    @classmethod
+    def reconstruire(cls, commande_ids):
+        """Recalcule entièrement les liens des commandes données."""
+        commande_ids = list(commande_ids)
+        paires = set(
+            LigneCommande.objects.filter(commande_id__in=commande_ids)
+            .values_list('commande_id', 'produit__fournisseur_id')
+        )
+        infos = dict(
+            (pk, (date, statut)) for pk, date, statut in
+            Commande.objects.filter(pk__in=commande_ids).values_list('pk', 'date_commande', 'statut')
+        )
+        cls.objects.filter(commande_id__in=commande_ids).delete()
+        cls.objects.bulk_create([
+            cls(fournisseur_id=fid, commande_id=cid, date_commande=infos[cid][0], statut=infos[cid][1])
+            for cid, fid in paires if cid in infos
+        ])
 
 class Livraison(models.Model):
+    STATUTS_TERMINES = ('livree', 'retournee')
+
     TRANSPORT_CHOICES = [
         ('moto', 'Moto'),
         ('voiture', 'Voiture'),
@@ -114,20 +257,37 @@ class Livraison(models.Model):
 
     assigned_at = models.DateTimeField(null=True, blank=True)
     delivered_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Livraison"
         verbose_name_plural = "Livraisons"
         ordering = ['-date_prevue']
+        indexes = [
+            models.Index(fields=['statut'], name='livraison_statut_idx'),
+            models.Index(fields=['date_prevue'], name='livraison_date_prevue_idx'),
+            # Période du rapport SLA
+            models.Index(fields=['assigned_at'], name='livraison_assigned_idx'),
+            # Livraisons effectuées sur une période (versements fournisseurs)
+            models.Index(fields=['statut', 'delivered_at'], name='livraison_statut_livree_idx'),
+        ]
 
     def set_tarif(self):
-        """Définit le montant en fonction du type de transport."""
+        """Définit le montant selon la zone de l'adresse et le transport (tarif forfaitaire à défaut)."""
         if self.transport:
-            tarif = self.TARIFS.get(self.transport, 0)
-            self.montant = tarif
+            from .zones import tarif_livraison
+            tarif = tarif_livraison(self.adresse_livraison, self.transport)
+            self.montant = tarif if tarif is not None else self.TARIFS.get(self.transport, 0)
+
+    @classmethod
+    def statut_valide(cls, statut):
+        return statut in dict(cls._meta.get_field('statut').choices)
 
     def update_status(self, new_status):
-        """Gère automatiquement les dates selon le statut et enregistre."""
+        """Gère automatiquement les dates selon le statut et enregistre (avec l'événement, atomiquement)."""
+        if not self.statut_valide(new_status):
+            raise ValueError(f"Statut de livraison inconnu : {new_status!r}")
+        ancien_statut = self.statut
         self.statut = new_status
 
         if new_status == "en_transit" and not self.assigned_at:
@@ -139,7 +299,10 @@ class Livraison(models.Model):
             if not self.date_effective:
                 self.date_effective = timezone.now()
 
-        self.save()
+        with transaction.atomic():
+            self.save()
+            if new_status != ancien_statut:
+                EvenementStatut.enregistrer(self)
 
     def save(self, *args, **kwargs):
         # Si montant non renseigné mais transport renseigné, calcule le tarif
@@ -148,4 +311,500 @@ class Livraison(models.Model):
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"Livraison commande #{self.commande.id}"
\ No newline at end of file
+        return f"Livraison commande #{self.commande_id}"
+
+
+# === Zones de livraison ===
+
+class ZoneLivraison(models.Model):
+    """Zone tarifaire, reconnue dans une adresse par code postal ou par nom de ville / quartier.
+
+    La résolution passe par l'index en mémoire de commandes/zones.py,
+    reconstruit quand une zone ou un tarif change.
+    """
+    nom = models.CharField(max_length=100, unique=True)
+    villes = models.TextField(blank=True, help_text="Villes ou quartiers de la zone, un par ligne")
+    prefixes_postaux = models.CharField(
+        max_length=500, blank=True,
+        help_text="Préfixes de codes postaux séparés par des virgules ou des espaces (ex. 101, 1012)",
+    )
+    # À préfixe ou nom identique, la zone de plus petit ordre l'emporte
+    ordre = models.PositiveSmallIntegerField(default=0)
+    actif = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ['ordre', 'nom']
+
+    def __str__(self):
+        return self.nom
+
+    def liste_villes(self):
+        return [v.strip() for v in self.villes.splitlines() if v.strip()]
+
+    def liste_prefixes(self):
+        return [p for p in self.prefixes_postaux.replace(',', ' ').split() if p]
+
+
+class TarifZone(models.Model):
+    zone = models.ForeignKey(ZoneLivraison, on_delete=models.CASCADE, related_name='tarifs')
+    # Code de transport, tel qu'envoyé par le checkout ou enregistré sur la livraison
+    transport = models.CharField(max_length=30)
+    montant = models.DecimalField(max_digits=8, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['zone', 'transport'], name='tarifzone_zone_transport_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.zone} / {self.transport} : {self.montant}"
+
+
+# === Journal des changements de statut (append-only) ===
+
+class EvenementStatut(models.Model):
+    """Un changement de statut d'une commande ou d'une livraison.
+
+    Les lignes ne sont jamais modifiées. Entité et statut sont encodés en
+    petits entiers (voir STATUTS) pour garder la table et ses index compacts ;
+    l'id croissant sert aussi de curseur de lecture.
+    """
+    ENTITE_COMMANDE = 1
+    ENTITE_LIVRAISON = 2
+    ENTITE_CHOICES = [
+        (ENTITE_COMMANDE, 'Commande'),
+        (ENTITE_LIVRAISON, 'Livraison'),
+    ]
+    # Code entier d'un statut = position (à partir de 1) dans les choices du modèle.
+    # Ne jamais réordonner : ajouter les nouveaux statuts en fin de liste.
+    STATUTS = {
+        ENTITE_COMMANDE: [code for code, _ in Commande._meta.get_field('statut').choices],
+        ENTITE_LIVRAISON: [code for code, _ in Livraison._meta.get_field('statut').choices],
+    }
+
+    entite = models.PositiveSmallIntegerField(choices=ENTITE_CHOICES)
+    entite_id = models.BigIntegerField()
+    statut = models.PositiveSmallIntegerField()
+    horodatage = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['entite', 'entite_id', 'horodatage'], name='evt_entite_horodatage_idx'),
+            models.Index(fields=['entite', 'statut', 'horodatage'], name='evt_statut_horodatage_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_entite_display()} #{self.entite_id} -> {self.statut_code} ({self.horodatage})"
+
+    @classmethod
+    def encoder(cls, entite, statut):
+        return cls.STATUTS[entite].index(statut) + 1
+
+    @classmethod
+    def decoder(cls, entite, code):
+        return cls.STATUTS[entite][code - 1]
+
+    @property
+    def statut_code(self):
+        return self.decoder(self.entite, self.statut)
+
+    @classmethod
+    def _entite_de(cls, obj):
+        if isinstance(obj, (Commande, CommandeArchive)):
+            return cls.ENTITE_COMMANDE
+        if isinstance(obj, (Livraison, LivraisonArchive)):
+            return cls.ENTITE_LIVRAISON
+        raise TypeError(f"Pas de journal de statut pour {type(obj).__name__}")
+
+    @classmethod
+    def enregistrer(cls, *objets, horodatage=None):
+        """Journalise le statut courant des commandes / livraisons données (un seul INSERT)."""
+        horodatage = horodatage or timezone.now()
+        evenements = []
+        for obj in objets:
+            entite = cls._entite_de(obj)
+            evenements.append(cls(
+                entite=entite, entite_id=obj.pk,
+                statut=cls.encoder(entite, obj.statut), horodatage=horodatage,
+            ))
+        return cls.objects.bulk_create(evenements)
+
+    @classmethod
+    def ids_stables(cls, maintenant=None):
+        """Ids des événements plus vieux que JOURNAL_DELAI_COMMIT secondes, du plus récent au plus ancien.
+
+        Un id est attribué à l'INSERT mais n'est visible qu'au commit : un id
+        inférieur au dernier lu peut encore apparaître tant que sa transaction
+        est ouverte. Les lecteurs du journal par curseur (webhooks, flux SSE)
+        n'avancent donc pas au-delà du premier id de cette liste ; seules les
+        transactions plus longues que le délai peuvent encore être manquées.
+        Parcours de la clé primaire à rebours, arrêté au premier événement assez ancien.
+        """
+        limite = cls.limite_stable(maintenant)
+        return cls.objects.filter(horodatage__lte=limite).order_by('-pk').values_list('pk', flat=True)
+
+    @classmethod
+    def limite_stable(cls, maintenant=None):
+        """Horodatage au-delà duquel un événement n'est pas encore considéré comme stable."""
+        return (maintenant or timezone.now()) - timedelta(seconds=getattr(settings, 'JOURNAL_DELAI_COMMIT', 5))
+
+    @classmethod
+    def timeline_commande(cls, commande_id):
+        """Événements d'une commande et de sa livraison (courante ou archivée), dans l'ordre."""
+        livraison_ids = list(Livraison.objects.filter(commande_id=commande_id).values_list('pk', flat=True))
+        if not livraison_ids:
+            livraison_ids = list(LivraisonArchive.objects.filter(commande_id=commande_id).values_list('pk', flat=True))
+        cond = models.Q(entite=cls.ENTITE_COMMANDE, entite_id=commande_id)
+        if livraison_ids:
+            cond |= models.Q(entite=cls.ENTITE_LIVRAISON, entite_id__in=livraison_ids)
+        return cls.objects.filter(cond).order_by('horodatage', 'id')
+
+    @classmethod
+    def entre(cls, entite, statut, debut, fin):
+        """Transitions vers `statut` dans [debut, fin[ (servi par evt_statut_horodatage_idx)."""
+        return cls.objects.filter(
+            entite=entite, statut=cls.encoder(entite, statut),
+            horodatage__gte=debut, horodatage__lt=fin,
+        )
+
+
+# === Archives (données froides) ===
+# Copies des commandes terminées déplacées hors des tables "chaudes" par la
+# commande `archiver_commandes`. Les identifiants d'origine des commandes et
+# des livraisons sont conservés.
+
+class CommandeArchive(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    client = models.ForeignKey(USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='commandes_archivees')
+    date_commande = models.DateTimeField()
+    statut = models.CharField(max_length=20, choices=Commande._meta.get_field('statut').choices)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    est_archivee = True
+
+    class Meta:
+        ordering = ['-date_commande']
+        indexes = [
+            models.Index(fields=['client', '-date_commande'], name='cmdarch_client_date_idx'),
+            models.Index(fields=['statut', '-date_commande'], name='cmdarch_statut_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"Commande archivée {self.id}"
+
+
+class LigneCommandeArchive(models.Model):
+    # Identifiant propre : les lignes des commandes archivées avant la migration
+    # vers LigneCommande (0014) n'ont jamais eu de LigneCommande
+    commande = models.ForeignKey(CommandeArchive, on_delete=models.CASCADE, related_name='lignes')
+    produit = models.ForeignKey(Produit, on_delete=models.SET_NULL, null=True, related_name='+')
+    quantite = models.PositiveIntegerField()
+    prix_unitaire = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    def __str__(self):
+        return f"Ligne archivée {self.id}"
+
+
+class LivraisonArchive(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    commande = models.OneToOneField(CommandeArchive, on_delete=models.CASCADE, related_name='livraison')
+    transport = models.CharField(max_length=30, choices=Livraison.TRANSPORT_CHOICES, blank=True, null=True)
+    adresse_livraison = models.CharField(max_length=255, blank=True)
+    montant = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    description = models.TextField(blank=True)
+    date_prevue = models.DateTimeField(null=True, blank=True)
+    date_effective = models.DateTimeField(null=True, blank=True)
+    date_livraison = models.DateTimeField(null=True, blank=True)
+    statut = models.CharField(max_length=20, choices=Livraison._meta.get_field('statut').choices)
+    assigned_at = models.DateTimeField(null=True, blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['statut', 'delivered_at'], name='livarch_statut_livree_idx'),
+        ]
+
+    def __str__(self):
+        return f"Livraison archivée commande #{self.commande_id}"
+
+
+class CommandeFournisseurArchive(models.Model):
+    """Liens fournisseur des commandes archivées (copie de CommandeFournisseur)."""
+    fournisseur = models.ForeignKey(Fournisseur, on_delete=models.CASCADE, related_name='liens_commandes_archivees')
+    commande = models.ForeignKey(CommandeArchive, on_delete=models.CASCADE, related_name='liens_fournisseurs')
+    date_commande = models.DateTimeField()
+    statut = models.CharField(max_length=20, choices=Commande._meta.get_field('statut').choices)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['fournisseur', 'commande'], name='cmdfourn_arch_fourn_cmd_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['fournisseur', 'date_commande'], name='cmdfourn_arch_fourn_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"Commande archivée #{self.commande_id} / fournisseur #{self.fournisseur_id}"
+
+
+class RapportJob(models.Model):
+    """Export long exécuté hors requête HTTP par la commande `executer_rapports`."""
+    TYPE_CHOICES = [
+        ('commandes_csv', 'Export des commandes (CSV)'),
+        ('ventes_fournisseur_csv', 'Ventes fournisseur (CSV)'),
+    ]
+    STATUT_CHOICES = [
+        ('en_attente', 'En attente'),
+        ('en_cours', 'En cours'),
+        ('termine', 'Terminé'),
+        ('echec', 'Échec'),
+    ]
+    STATUTS_ACTIFS = ('en_attente', 'en_cours')
+
+    user = models.ForeignKey(USER_MODEL, on_delete=models.CASCADE, related_name='rapport_jobs')
+    type = models.CharField(max_length=30, choices=TYPE_CHOICES)
+    parametres = models.JSONField(default=dict, blank=True)
+    statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default='en_attente')
+    progression = models.PositiveSmallIntegerField(default=0)
+    fichier = models.FileField(upload_to='reports/', blank=True)
+    erreur = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['statut', 'created_at'], name='rapportjob_statut_idx'),
+            models.Index(fields=['user', 'statut'], name='rapportjob_user_statut_idx'),
+            models.Index(fields=['expires_at'], name='rapportjob_expiration_idx'),
+        ]
+
+    def __str__(self):
+        return f"Rapport {self.get_type_display()} #{self.id} ({self.statut})"
+
+
+# === Versements fournisseurs ===
+
+class ReleveImmuable(Exception):
+    """Modification ou suppression d'un relevé de versement déjà enregistré."""
+
+
+class ReleveVersementQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        raise ReleveImmuable("Les relevés de versement ne sont pas modifiables.")
+
+    def delete(self):
+        raise ReleveImmuable("Les relevés de versement ne sont pas supprimables.")
+
+
+class ReleveVersement(models.Model):
+    """Ce que la plateforme doit à un fournisseur pour une période (jours `debut` à `fin` inclus).
+
+    Calculé par commandes/versements.py à partir des livraisons effectuées ;
+    immuable une fois créé (une correction passe par un nouveau relevé).
+    """
+    fournisseur = models.ForeignKey(Fournisseur, on_delete=models.PROTECT, related_name='releves_versement')
+    debut = models.DateField()
+    fin = models.DateField()
+    ventes_brutes = models.DecimalField(max_digits=14, decimal_places=2)
+    # Copies des réglages du fournisseur au moment du calcul
+    taux_commission = models.DecimalField(max_digits=5, decimal_places=2)
+    compte_bancaire = models.CharField(max_length=255, blank=True)
+    commission = models.DecimalField(max_digits=14, decimal_places=2)
+    net = models.DecimalField(max_digits=14, decimal_places=2)
+    nb_commandes = models.PositiveIntegerField()
+    nb_lignes = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ReleveVersementQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-debut', 'fournisseur_id']
+        constraints = [
+            models.UniqueConstraint(fields=['fournisseur', 'debut', 'fin'], name='releve_fourn_periode_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['debut', 'fin'], name='releve_periode_idx'),
+        ]
+
+    def __str__(self):
+        return f"Relevé {self.fournisseur_id} du {self.debut} au {self.fin}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ReleveImmuable("Les relevés de versement ne sont pas modifiables.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ReleveImmuable("Les relevés de versement ne sont pas supprimables.")
+
+
+# === Notifications fournisseurs ===
+
+class NotificationFournisseur(models.Model):
+    """Nouvelle commande pour un fournisseur, enregistrée au commit du checkout.
+
+    `lue` alimente le compteur de l'espace fournisseur ; `envoyee_at` est
+    renseigné quand la notification a été incluse dans un récapitulatif
+    e-mail (voir commandes/notifications.py).
+    """
+    fournisseur = models.ForeignKey(Fournisseur, on_delete=models.CASCADE, related_name='notifications')
+    commande = models.ForeignKey(Commande, on_delete=models.CASCADE, related_name='+')
+    # Part du fournisseur dans la commande, figée à l'enregistrement
+    nb_articles = models.PositiveIntegerField(default=0)
+    montant = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    lue = models.BooleanField(default=False)
+    envoyee_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['fournisseur', 'commande'], name='notif_fourn_commande_uniq'),
+        ]
+        indexes = [
+            # Compteur « non lues » : index partiel, ne contient que les lignes comptées
+            models.Index(fields=['fournisseur'], condition=models.Q(lue=False), name='notif_non_lues_idx'),
+            # Récapitulatifs à envoyer
+            models.Index(fields=['fournisseur', 'created_at'], condition=models.Q(envoyee_at__isnull=True),
+                         name='notif_a_envoyer_idx'),
+        ]
+
+    def __str__(self):
+        return f"Notification commande #{self.commande_id} / fournisseur #{self.fournisseur_id}"
+
+
+class PreferenceNotification(models.Model):
+    """Réglages des récapitulatifs e-mail d'un fournisseur (valeurs par défaut si absent)."""
+    fournisseur = models.OneToOneField(Fournisseur, on_delete=models.CASCADE, related_name='preference_notification')
+    recapitulatif = models.BooleanField(default=True, help_text="Recevoir les nouvelles commandes par e-mail")
+    intervalle_minutes = models.PositiveIntegerField(
+        default=15, help_text="Délai maximal entre une nouvelle commande et l'e-mail récapitulatif",
+    )
+    email = models.EmailField(blank=True, help_text="Adresse de réception (par défaut, celle du fournisseur)")
+
+    def __str__(self):
+        return f"Préférences de notification de {self.fournisseur}"
+
+
+# === Positions des livreurs ===
+
+class SegmentPositions(models.Model):
+    """Lot de positions d'une livraison, encodé en binaire (voir commandes/positions.py).
+
+    Chaque point occupe 12 octets dans `donnees` : décalage en millisecondes
+    depuis `debut` (entier non signé 32 bits), latitude et longitude en
+    millionièmes de degré (entiers signés 32 bits). Un envoi du livreur
+    ajoute un segment ; les segments ne sont jamais modifiés, seulement
+    remplacés par un segment réduit (`reduit`) une fois la livraison terminée.
+    """
+    livraison = models.ForeignKey(Livraison, on_delete=models.CASCADE, related_name='segments_positions')
+    debut = models.DateTimeField()
+    nb_points = models.PositiveIntegerField()
+    donnees = models.BinaryField()
+    reduit = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['livraison', 'debut'], name='segpos_livraison_debut_idx'),
+            # Segments restant à réduire (index partiel : vide en régime établi)
+            models.Index(fields=['livraison'], condition=models.Q(reduit=False), name='segpos_a_reduire_idx'),
+        ]
+
+    def __str__(self):
+        return f"Positions livraison #{self.livraison_id} ({self.nb_points} points)"
+
+
+class SegmentPositionsArchive(models.Model):
+    """Segments des livraisons archivées (copie de SegmentPositions, réduits à l'archivage)."""
+    livraison = models.ForeignKey(LivraisonArchive, on_delete=models.CASCADE, related_name='segments_positions')
+    debut = models.DateTimeField()
+    nb_points = models.PositiveIntegerField()
+    donnees = models.BinaryField()
+    reduit = models.BooleanField(default=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['livraison', 'debut'], name='segpos_arch_livraison_idx'),
+        ]
+
+    def __str__(self):
+        return f"Positions livraison archivée #{self.livraison_id} ({self.nb_points} points)"
+
+
+# === Webhooks sortants ===
+
+def _secret_webhook():
+    return secrets.token_hex(32)
+
+
+class AbonnementWebhook(models.Model):
+    """Point de réception d'un partenaire pour les changements de statut.
+
+    `curseur` est l'id du dernier EvenementStatut déjà mis en file pour cet
+    abonnement (voir commandes/webhooks.py).
+    """
+    nom = models.CharField(max_length=100)
+    url = models.URLField(max_length=500)
+    secret = models.CharField(max_length=64, default=_secret_webhook, help_text="Clé de signature HMAC-SHA256")
+    # Vide : commandes et livraisons
+    entite = models.PositiveSmallIntegerField(choices=EvenementStatut.ENTITE_CHOICES, null=True, blank=True)
+    actif = models.BooleanField(default=True)
+    curseur = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.nom
+
+    def save(self, *args, **kwargs):
+        # Un nouvel abonnement reçoit les événements à venir, pas tout l'historique
+        if self._state.adding and not self.curseur:
+            self.curseur = EvenementStatut.objects.aggregate(m=models.Max('pk'))['m'] or 0
+        super().save(*args, **kwargs)
+
+
+class EnvoiWebhook(models.Model):
+    """Lot d'événements à poster à un abonnement : un POST signé, réessayé jusqu'à MAX tentatives."""
+    STATUT_CHOICES = [
+        ('en_attente', 'En attente'),
+        ('en_cours', 'En cours'),
+        ('envoye', 'Envoyé'),
+        ('mort', 'Abandonné'),
+    ]
+    STATUTS_ACTIFS = ('en_attente', 'en_cours')
+
+    abonnement = models.ForeignKey(AbonnementWebhook, on_delete=models.CASCADE, related_name='envois')
+    premier_evenement = models.BigIntegerField()
+    dernier_evenement = models.BigIntegerField()
+    nb_evenements = models.PositiveIntegerField()
+    corps = models.TextField()
+    statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default='en_attente')
+    tentatives = models.PositiveSmallIntegerField(default=0)
+    prochain_essai = models.DateTimeField(default=timezone.now)
+    code_http = models.PositiveSmallIntegerField(null=True, blank=True)
+    erreur = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    envoye_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['statut', 'prochain_essai'], name='envoiwh_statut_essai_idx'),
+            models.Index(fields=['abonnement', 'statut'], name='envoiwh_abonnement_statut_idx'),
+        ]
+
+    def __str__(self):
+        return f"Envoi #{self.id} vers {self.abonnement_id} ({self.statut})"
+
+
+# === Versions partagées entre processus ===
+
+class VersionDonnees(models.Model):
+    """Version d'une donnée mémorisée hors de la base (voir commandes/versions.py)."""
+    cle = models.CharField(max_length=100, primary_key=True)
+    valeur = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.cle} = {self.valeur}"
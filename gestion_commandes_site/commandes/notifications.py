@@ -0,0 +1,151 @@
+"""Notifications de nouvelles commandes aux fournisseurs.
+
+Le checkout enregistre, après commit, une notification par fournisseur
+concerné. La commande `envoyer_recapitulatifs` (à lancer toutes les quelques
+minutes) regroupe les notifications en attente par fournisseur en une
+requête groupée et envoie un e-mail récapitulatif par fournisseur dont la
+plus ancienne notification a dépassé son intervalle, sur une seule
+connexion SMTP.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Count, Max, Min, Sum
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import NotificationFournisseur
+
+logger = logging.getLogger(__name__)
+
+# Fournisseurs par UPDATE lors du marquage des notifications envoyées
+BATCH_SIZE = 500
+
+
+def parts_fournisseurs(items):
+    """{fournisseur_id: (nb_articles, montant)} à partir des lignes du panier."""
+    parts = defaultdict(lambda: [0, Decimal('0')])
+    for it in items:
+        part = parts[it['produit'].fournisseur_id]
+        part[0] += it['qty']
+        part[1] += it['subtotal']
+    return {fid: tuple(part) for fid, part in parts.items() if fid}
+
+
+def enregistrer_nouvelle_commande(commande_id, parts):
+    """Une notification par fournisseur de la commande (`parts` : voir parts_fournisseurs)."""
+    NotificationFournisseur.objects.bulk_create(
+        [
+            NotificationFournisseur(fournisseur_id=fid, commande_id=commande_id, nb_articles=n, montant=montant)
+            for fid, (n, montant) in parts.items()
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def non_lues(fournisseur_id):
+    """Nombre de notifications non lues (index partiel notif_non_lues_idx)."""
+    return NotificationFournisseur.objects.filter(fournisseur_id=fournisseur_id, lue=False).count()
+
+
+def marquer_lues(fournisseur_id):
+    return NotificationFournisseur.objects.filter(fournisseur_id=fournisseur_id, lue=False).update(lue=True)
+
+
+def _en_attente(plafond):
+    """Une ligne par fournisseur ayant des notifications non envoyées d'id <= plafond."""
+    return (
+        NotificationFournisseur.objects
+        .filter(envoyee_at__isnull=True, pk__lte=plafond)
+        .values(
+            'fournisseur_id', 'fournisseur__nom', 'fournisseur__email',
+            'fournisseur__preference_notification__recapitulatif',
+            'fournisseur__preference_notification__intervalle_minutes',
+            'fournisseur__preference_notification__email',
+        )
+        .annotate(
+            nb=Count('id'), articles=Sum('nb_articles'), montant=Sum('montant'),
+            premiere=Min('created_at'), derniere=Max('created_at'),
+        )
+        .order_by()
+    )
+
+
+def _message(ligne, destinataire):
+    lien = getattr(settings, 'SITE_URL', '') + reverse('commandes:commandes-fournisseur')
+    nb = ligne['nb']
+    corps = "\n".join([
+        f"Bonjour {ligne['fournisseur__nom']},",
+        '',
+        f"Vous avez reçu {nb} nouvelle(s) commande(s) "
+        f"entre le {timezone.localtime(ligne['premiere']):%d/%m/%Y %H:%M} "
+        f"et le {timezone.localtime(ligne['derniere']):%d/%m/%Y %H:%M} :",
+        f"- articles : {ligne['articles'] or 0}",
+        f"- montant : {Decimal(ligne['montant'] or 0).quantize(Decimal('0.01'))}",
+        '',
+        f"Détail : {lien}",
+    ])
+    return EmailMessage(
+        f"{nb} nouvelle(s) commande(s)",
+        corps,
+        getattr(settings, 'DEFAULT_FROM_EMAIL', 'no-reply@localhost'),
+        [destinataire],
+    )
+
+
+def _marquer_envoyees(fournisseur_ids, plafond, quand):
+    fournisseur_ids = list(fournisseur_ids)
+    for i in range(0, len(fournisseur_ids), BATCH_SIZE):
+        NotificationFournisseur.objects.filter(
+            fournisseur_id__in=fournisseur_ids[i:i + BATCH_SIZE], envoyee_at__isnull=True, pk__lte=plafond,
+        ).update(envoyee_at=quand)
+
+
+def envoyer_recapitulatifs(maintenant=None, dry_run=False):
+    """Envoie les récapitulatifs dus ; retourne (envoyés, ignorés, en échec).
+
+    Les notifications des fournisseurs ayant désactivé les récapitulatifs (ou
+    sans adresse) sont marquées traitées sans e-mail. Un envoi en échec laisse
+    les notifications en attente pour le passage suivant.
+    """
+    maintenant = maintenant or timezone.now()
+    defaut = getattr(settings, 'NOTIFICATIONS_INTERVALLE_MINUTES', 15)
+    # Les notifications créées pendant l'envoi attendent le passage suivant
+    plafond = NotificationFournisseur.objects.aggregate(m=Max('pk'))['m']
+    if plafond is None:
+        return 0, 0, 0
+
+    a_envoyer, ignores = [], []
+    for ligne in _en_attente(plafond):
+        actif = ligne['fournisseur__preference_notification__recapitulatif']
+        destinataire = ligne['fournisseur__preference_notification__email'] or ligne['fournisseur__email']
+        if actif is False or not destinataire:
+            ignores.append(ligne['fournisseur_id'])
+            continue
+        intervalle = ligne['fournisseur__preference_notification__intervalle_minutes']
+        if intervalle is None:
+            intervalle = defaut
+        if ligne['premiere'] <= maintenant - timedelta(minutes=intervalle):
+            a_envoyer.append((ligne['fournisseur_id'], _message(ligne, destinataire)))
+
+    if dry_run:
+        return len(a_envoyer), len(ignores), 0
+
+    envoyes, echecs = [], 0
+    if a_envoyer:
+        with get_connection() as connexion:
+            for fournisseur_id, message in a_envoyer:
+                message.connection = connexion
+                try:
+                    message.send()
+                except Exception:
+                    logger.exception("Échec du récapitulatif pour le fournisseur %s", fournisseur_id)
+                    echecs += 1
+                else:
+                    envoyes.append(fournisseur_id)
+    _marquer_envoyees(envoyes + ignores, plafond, maintenant)
+    return len(envoyes), len(ignores), echecs
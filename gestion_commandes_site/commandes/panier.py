@@ -0,0 +1,111 @@
+"""Panier : en session pour les visiteurs, en base (Panier / PanierLigne) pour les utilisateurs connectés.
+
+En base, chaque ajout ou retrait ne touche qu'une ligne (UPDATE, INSERT en
+cas d'absence) au lieu de réécrire toute la session ; le panier suit
+l'utilisateur d'un appareil à l'autre. Le panier de session est fusionné
+dans le panier en base à la connexion.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Panier, PanierLigne, Produit
+
+SESSION_KEY = 'cart'
+# Quantité maximale d'un ajout (saisie du formulaire)
+QUANTITE_MAX = 9999
+
+
+def _connecte(request):
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_authenticated
+
+
+def _ajouter_en_base(user_id, produit_id, quantite):
+    """Incrémente la ligne (panier, produit), créée si besoin ; sûr en cas d'ajouts concurrents."""
+    lignes = PanierLigne.objects.filter(panier_id=user_id, produit_id=produit_id)
+    # Cas courant (produit déjà présent) : une seule requête
+    if lignes.update(quantite=F('quantite') + quantite):
+        return
+    Panier.objects.get_or_create(user_id=user_id)
+    try:
+        with transaction.atomic():
+            PanierLigne.objects.create(panier_id=user_id, produit_id=produit_id, quantite=quantite)
+    except IntegrityError:
+        # Ligne créée entre-temps par une autre requête
+        lignes.update(quantite=F('quantite') + quantite)
+
+
+def quantite_saisie(valeur):
+    """Quantité saisie dans un formulaire d'ajout, ou None si ce n'est pas un entier de 1 à QUANTITE_MAX."""
+    try:
+        quantite = int(valeur)
+    except (TypeError, ValueError):
+        return None
+    return quantite if 1 <= quantite <= QUANTITE_MAX else None
+
+
+def _panier_session(panier):
+    """{produit_id: quantité} ; les entrées invalides (panier d'une version antérieure, session altérée) sont ignorées."""
+    quantites = {}
+    for produit_id, quantite in (panier or {}).items():
+        try:
+            produit_id, quantite = int(produit_id), int(quantite)
+        except (TypeError, ValueError):
+            continue
+        if quantite > 0:
+            quantites[produit_id] = quantite
+    return quantites
+
+
+def fusionner_panier_session(request, user):
+    """Déplace le panier de session vers le panier en base de `user`."""
+    panier = _panier_session(request.session.pop(SESSION_KEY, None))
+    if not panier:
+        return
+    existants = set(Produit.objects.filter(pk__in=panier).values_list('pk', flat=True))
+    for produit_id, quantite in panier.items():
+        if produit_id in existants:
+            _ajouter_en_base(user.pk, produit_id, quantite)
+
+
+def ajouter(request, produit_id, quantite=1):
+    if _connecte(request):
+        _ajouter_en_base(request.user.pk, produit_id, quantite)
+        return
+    panier = request.session.setdefault(SESSION_KEY, {})
+    panier[str(produit_id)] = panier.get(str(produit_id), 0) + quantite
+    request.session.modified = True
+
+
+def retirer(request, produit_id):
+    if _connecte(request):
+        PanierLigne.objects.filter(panier_id=request.user.pk, produit_id=produit_id).delete()
+        return
+    panier = request.session.get(SESSION_KEY)
+    if panier and panier.pop(str(produit_id), None) is not None:
+        request.session.modified = True
+
+
+def vider(request):
+    if _connecte(request):
+        PanierLigne.objects.filter(panier_id=request.user.pk).delete()
+    if request.session.pop(SESSION_KEY, None) is not None:
+        request.session.modified = True
+
+
+def lignes(request):
+    """Liste de (produit, quantité) ; une requête (jointure sur le produit) pour un utilisateur connecté."""
+    if _connecte(request):
+        if request.session.get(SESSION_KEY):
+            # Panier de session antérieur à la connexion (session ouverte avant la fusion)
+            fusionner_panier_session(request, request.user)
+        qs = (
+            PanierLigne.objects.filter(panier_id=request.user.pk)
+            .select_related('produit').order_by('id')
+        )
+        return [(ligne.produit, ligne.quantite) for ligne in qs]
+    panier = _panier_session(request.session.get(SESSION_KEY))
+    if not panier:
+        return []
+    produits = Produit.objects.filter(pk__in=panier)
+    return [(p, panier[p.pk]) for p in produits]
@@ -0,0 +1,219 @@
+"""Positions des livreurs : encodage compact, enregistrement et réduction.
+
+Les positions arrivent par lots (`ping_positions`) et chaque lot devient
+une ligne SegmentPositions : un INSERT par envoi, quel que soit le nombre
+de points. Les points sont des triplets d'entiers (décalage en ms,
+latitude et longitude en millionièmes de degré, ~0,1 m) empaquetés par
+`struct`, 12 octets par point.
+
+Pendant la livraison tous les points sont conservés. Une fois la livraison
+terminée, `reduire_segments` fusionne ses segments en un seul, en ne gardant
+qu'un point par intervalle de temps (plus le premier et le dernier).
+L'archivage réduit de même les segments restants, puis les copie dans
+SegmentPositionsArchive.
+"""
+import struct
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Livraison, SegmentPositions, SegmentPositionsArchive
+
+POINT = struct.Struct('<Iii')
+ECHELLE = 1_000_000
+# Décalage maximal représentable dans un segment (uint32 en ms, ~49 jours)
+DECALAGE_MAX = 2 ** 32 - 1
+SALT = 'commandes.positions'
+# Statut « en cours » mémorisé (secondes) : évite une requête par envoi
+DUREE_STATUT = 30
+
+
+class PositionsInvalides(ValueError):
+    pass
+
+
+# --- Jetons des livreurs ---
+
+def jeton_livreur(livraison_id):
+    """Jeton signé autorisant l'envoi de positions pour une livraison (en-tête Authorization: Bearer)."""
+    return signing.TimestampSigner(salt=SALT).sign(str(livraison_id))
+
+
+def livraison_du_jeton(valeur):
+    """Identifiant de livraison porté par un jeton valide, ou None (sans requête SQL)."""
+    validite = getattr(settings, 'POSITIONS_VALIDITE_JETON', 86400)
+    try:
+        return int(signing.TimestampSigner(salt=SALT).unsign(valeur, max_age=validite))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+# --- Encodage ---
+
+def _ms(dt):
+    return round(dt.timestamp() * 1000)
+
+
+def _datetime(ms):
+    return datetime.fromtimestamp(ms / 1000, tz=dt_timezone.utc)
+
+
+def encoder(points):
+    """[(ms epoch, lat, lon), ...] triés -> (debut, octets)."""
+    base = points[0][0]
+    donnees = b''.join(
+        POINT.pack(ms - base, round(lat * ECHELLE), round(lon * ECHELLE)) for ms, lat, lon in points
+    )
+    return _datetime(base), donnees
+
+
+def decoder(segment):
+    """Points du segment : [(ms epoch, lat, lon), ...] avec lat / lon en degrés."""
+    base = _ms(segment.debut)
+    return [
+        (base + decalage, lat / ECHELLE, lon / ECHELLE)
+        for decalage, lat, lon in POINT.iter_unpack(bytes(segment.donnees))
+    ]
+
+
+def valider(brut, maintenant_ms, max_points):
+    """Valide et trie les points reçus ([ms epoch, lat, lon] ; ms absent ou null = maintenant)."""
+    if not isinstance(brut, list) or not brut:
+        raise PositionsInvalides("'points' doit être une liste non vide.")
+    if len(brut) > max_points:
+        raise PositionsInvalides(f"Au plus {max_points} points par envoi.")
+    points = []
+    for p in brut:
+        try:
+            ms, lat, lon = p
+            ms = maintenant_ms if ms is None else int(ms)
+            lat, lon = float(lat), float(lon)
+        except (TypeError, ValueError):
+            raise PositionsInvalides("Chaque point est [horodatage_ms, latitude, longitude].")
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise PositionsInvalides("Latitude ou longitude hors limites.")
+        # Tolérance d'une minute pour l'horloge du téléphone
+        if ms > maintenant_ms + 60_000:
+            raise PositionsInvalides("Horodatage dans le futur.")
+        points.append((ms, lat, lon))
+    points.sort()
+    if points[-1][0] - points[0][0] > DECALAGE_MAX:
+        raise PositionsInvalides("Lot couvrant une durée trop longue.")
+    return points
+
+
+def livraison_active(livraison_id):
+    """La livraison existe et n'est pas terminée (valeur mise en cache DUREE_STATUT secondes).
+
+    Des positions peuvent donc encore être acceptées peu après la fin de la
+    livraison ; elles sont fusionnées à la réduction suivante.
+    """
+    return cache.get_or_set(
+        f'livraison-active:{livraison_id}',
+        lambda: Livraison.objects.filter(pk=livraison_id).exclude(statut__in=Livraison.STATUTS_TERMINES).exists(),
+        DUREE_STATUT,
+    )
+
+
+def enregistrer(livraison_id, points):
+    """Ajoute un segment (points validés et triés)."""
+    debut, donnees = encoder(points)
+    return SegmentPositions.objects.create(
+        livraison_id=livraison_id, debut=debut, nb_points=len(points), donnees=donnees,
+    )
+
+
+def derniere_position(livraison_id):
+    """Dernier point connu (ms epoch, lat, lon) de la livraison, ou None."""
+    segment = (
+        SegmentPositions.objects.filter(livraison_id=livraison_id)
+        .order_by('-debut', '-pk').first()
+    )
+    return max(decoder(segment)) if segment else None
+
+
+def trace(livraison_id):
+    """Tous les points de la livraison (courante ou archivée), par ordre chronologique."""
+    points = []
+    for modele in (SegmentPositions, SegmentPositionsArchive):
+        for segment in modele.objects.filter(livraison_id=livraison_id).order_by('debut', 'pk'):
+            points.extend(decoder(segment))
+        if points:
+            break
+    points.sort()
+    return points
+
+
+# --- Réduction des livraisons terminées ---
+
+def amincir(points, intervalle_ms):
+    """Garde le premier point, puis un point au plus par `intervalle_ms`, et le dernier."""
+    if len(points) <= 2:
+        return points
+    gardes = [points[0]]
+    for point in points[1:-1]:
+        if point[0] - gardes[-1][0] >= intervalle_ms:
+            gardes.append(point)
+    gardes.append(points[-1])
+    return gardes
+
+
+def reduire_livraisons(ids, intervalle=30):
+    """Fusionne en un seul segment réduit tous les segments des livraisons `ids`.
+
+    Retourne (points avant, points après). Un DELETE et un INSERT groupé ; à
+    appeler dans une transaction.
+    """
+    intervalle_ms = int(intervalle * 1000)
+    par_livraison = defaultdict(list)
+    segments = SegmentPositions.objects.filter(livraison_id__in=ids).order_by('livraison_id', 'debut', 'pk')
+    for segment in segments:
+        par_livraison[segment.livraison_id].append(segment)
+    nouveaux, a_supprimer = [], []
+    avant = apres = 0
+    for livraison_id, liste in par_livraison.items():
+        points = sorted(p for s in liste for p in decoder(s))
+        # Points trop éloignés pour un seul segment : on garde le plus récent
+        points = [p for p in points if points[-1][0] - p[0] <= DECALAGE_MAX]
+        reduits = amincir(points, intervalle_ms)
+        debut, donnees = encoder(reduits)
+        nouveaux.append(SegmentPositions(
+            livraison_id=livraison_id, debut=debut, nb_points=len(reduits), donnees=donnees, reduit=True,
+        ))
+        a_supprimer.extend(s.pk for s in liste)
+        avant += len(points)
+        apres += len(reduits)
+    SegmentPositions.objects.filter(pk__in=a_supprimer).delete()
+    SegmentPositions.objects.bulk_create(nouveaux)
+    return avant, apres
+
+
+def reduire_segments(intervalle=30, batch_size=200):
+    """Réduit les segments des livraisons terminées ; retourne (livraisons, points avant, points après).
+
+    Les livraisons sont traitées par lots de `batch_size`, une transaction par lot.
+    """
+    a_reduire = (
+        SegmentPositions.objects
+        .filter(reduit=False, livraison__statut__in=Livraison.STATUTS_TERMINES)
+        .values_list('livraison_id', flat=True)
+        .distinct()
+        .order_by('livraison_id')
+    )
+    total_livraisons = avant = apres = 0
+    dernier = 0
+    while True:
+        ids = list(a_reduire.filter(livraison_id__gt=dernier)[:batch_size])
+        if not ids:
+            break
+        dernier = ids[-1]
+        with transaction.atomic():
+            n_avant, n_apres = reduire_livraisons(ids, intervalle)
+        total_livraisons += len(ids)
+        avant += n_avant
+        apres += n_apres
+    return total_livraisons, avant, apres
@@ -0,0 +1,151 @@
+"""Profilage de requêtes en production (voir ProfilingMiddleware).
+
+Une requête est profilée si elle est tirée au sort (PROFILAGE_TAUX, fraction
+entre 0 et 1) ou si elle porte l'en-tête X-Profilage avec un jeton signé
+(`manage.py profils_top --jeton`), valable PROFILAGE_VALIDITE_JETON secondes.
+
+Pour chaque requête profilée, deux fichiers sont écrits dans
+PROFILAGE_DOSSIER/<nom de vue>/ :
+  - <horodatage>.prof : statistiques cProfile (pstats) ;
+  - <horodatage>.txt  : piles échantillonnées au format « collapsed »
+    (`frame;frame;frame nombre`), lisible par flamegraph.pl ou speedscope.
+Seuls les PROFILAGE_MAX_PAR_VUE profils les plus récents sont conservés par vue.
+"""
+import cProfile
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+
+ENTETE = 'HTTP_X_PROFILAGE'
+SALT = 'commandes.profilage'
+SANS_NOM = '_sans_nom'
+
+
+def dossier():
+    return Path(getattr(settings, 'PROFILAGE_DOSSIER', settings.BASE_DIR.parent / 'profils'))
+
+
+def taux():
+    return float(getattr(settings, 'PROFILAGE_TAUX', 0))
+
+
+def jeton():
+    """Valeur à passer dans l'en-tête X-Profilage pour forcer le profilage d'une requête."""
+    return signing.TimestampSigner(salt=SALT).sign('profil')
+
+
+def jeton_valide(valeur):
+    validite = getattr(settings, 'PROFILAGE_VALIDITE_JETON', 3600)
+    try:
+        return signing.TimestampSigner(salt=SALT).unsign(valeur, max_age=validite) == 'profil'
+    except signing.BadSignature:
+        return False
+
+
+def a_profiler(request):
+    valeur = request.META.get(ENTETE)
+    if valeur:
+        return jeton_valide(valeur)
+    t = taux()
+    return t > 0 and random.random() < t
+
+
+def nom_vue(request):
+    """Nom de dossier pour la vue résolue ('commandes.produit_detail')."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.url_name:
+        return SANS_NOM
+    return match.view_name.replace(':', '.')
+
+
+class Echantillonneur(threading.Thread):
+    """Relève la pile du thread de la requête toutes les `intervalle` secondes."""
+
+    def __init__(self, thread_id, intervalle):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.intervalle = intervalle
+        self.piles = Counter()
+        self._arret = threading.Event()
+
+    def run(self):
+        while not self._arret.wait(self.intervalle):
+            frame = sys._current_frames().get(self.thread_id)
+            pile = []
+            while frame is not None:
+                code = frame.f_code
+                pile.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if pile:
+                self.piles[';'.join(reversed(pile))] += 1
+
+    def arreter(self):
+        self._arret.set()
+        self.join()
+
+
+class Profil:
+    """cProfile et échantillonnage des piles autour d'un appel.
+
+    `actif` est faux si cProfile n'a pas pu démarrer : depuis Python 3.12, un
+    seul profileur peut être actif par processus, et deux requêtes profilées
+    en même temps dans deux threads se heurtent. L'appel s'exécute alors
+    sans profilage.
+    """
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        intervalle = getattr(settings, 'PROFILAGE_INTERVALLE', 0.005)
+        self.echantillonneur = Echantillonneur(threading.get_ident(), intervalle)
+        self.actif = False
+
+    def __enter__(self):
+        try:
+            self.profiler.enable()
+        except ValueError:
+            # « Another profiling tool is already active »
+            return self
+        self.actif = True
+        self.echantillonneur.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.actif:
+            try:
+                self.profiler.disable()
+            finally:
+                self.echantillonneur.arreter()
+        return False
+
+    def enregistrer(self, vue):
+        """Écrit le .prof et les piles de `vue`, purge les plus anciens ; retourne le chemin du .prof."""
+        rep = dossier() / vue
+        rep.mkdir(parents=True, exist_ok=True)
+        # Horodatage en tête : l'ordre alphabétique est l'ordre chronologique
+        base = rep / f'{time.time_ns()}-{os.getpid()}'
+        self.profiler.dump_stats(f'{base}.prof')
+        with open(f'{base}.txt', 'w', encoding='utf-8') as f:
+            for pile, nombre in self.echantillonneur.piles.items():
+                f.write(f'{pile} {nombre}\n')
+        rotation(rep)
+        return Path(f'{base}.prof')
+
+
+def rotation(rep, garder=None):
+    if garder is None:
+        garder = getattr(settings, 'PROFILAGE_MAX_PAR_VUE', 50)
+    profils = sorted(rep.glob('*.prof'))
+    for ancien in profils[:max(len(profils) - garder, 0)]:
+        for chemin in (ancien, ancien.with_suffix('.txt')):
+            try:
+                chemin.unlink()
+            except FileNotFoundError:
+                # Déjà supprimé par un autre processus
+                pass
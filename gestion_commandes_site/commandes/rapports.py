@@ -0,0 +1,141 @@
+"""Rapport SLA des livraisons (délais, ponctualité, retours).
+
+Les compteurs sont calculés par une agrégation groupée en SQL. Les
+percentiles (médiane, p90) sont obtenus en une lecture en flux des durées
+triées par groupe : la mémoire reste constante quel que soit le volume.
+Les résultats sont mis en cache par période.
+"""
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Livraison
+
+GROUPES = {
+    'transport': ('transport', None),
+    'fournisseur': (
+        'commande__liens_fournisseurs__fournisseur',
+        'commande__liens_fournisseurs__fournisseur__nom',
+    ),
+}
+PERCENTILES = (('mediane', 0.5), ('p90', 0.9))
+
+# Livrée, avec les deux horodatages : délai mesurable
+MESUREE = Q(statut='livree', assigned_at__isnull=False, delivered_at__isnull=False)
+AVEC_PREVUE = Q(statut='livree', date_prevue__isnull=False)
+
+
+@dataclass
+class LigneSLA:
+    cle: object
+    libelle: str
+    total: int
+    livrees: int
+    retournees: int
+    avec_prevue: int
+    a_l_heure: int
+    mesurees: int
+    mediane: timedelta = None
+    p90: timedelta = None
+
+    @property
+    def taux_a_l_heure(self):
+        return self.a_l_heure / self.avec_prevue if self.avec_prevue else None
+
+    @property
+    def taux_retour(self):
+        return self.retournees / self.total if self.total else None
+
+
+def _livraisons(debut, fin):
+    """Livraisons prises en charge (assigned_at) pendant la période."""
+    return Livraison.objects.filter(assigned_at__gte=debut, assigned_at__lt=fin).order_by()
+
+
+def _compteurs():
+    return {
+        'total': Count('id'),
+        'livrees': Count('id', filter=Q(statut='livree')),
+        'retournees': Count('id', filter=Q(statut='retournee')),
+        'avec_prevue': Count('id', filter=AVEC_PREVUE),
+        'a_l_heure': Count('id', filter=AVEC_PREVUE & Q(effective__lte=F('date_prevue'))),
+        'mesurees': Count('id', filter=MESUREE),
+    }
+
+
+def _remplir_percentiles(qs, cle, lignes):
+    """Une passe sur les durées triées par (groupe, durée) ; ne garde que les rangs utiles."""
+    par_cle = {ligne.cle: ligne for ligne in lignes}
+    durees = (
+        qs.filter(MESUREE)
+        .annotate(duree=ExpressionWrapper(F('delivered_at') - F('assigned_at'), output_field=DurationField()))
+    )
+    if cle:
+        rows = durees.order_by(cle, 'duree').values_list(cle, 'duree').iterator(chunk_size=2000)
+    else:
+        rows = ((None, d) for (d,) in durees.order_by('duree').values_list('duree').iterator(chunk_size=2000))
+
+    courant, rang, cibles, ligne = object(), 0, {}, None
+    for valeur_cle, duree in rows:
+        if valeur_cle != courant:
+            courant, rang = valeur_cle, 0
+            ligne = par_cle.get(valeur_cle)
+            # Percentile par rang le plus proche (inférieur) : rang -> attributs à renseigner
+            cibles = {}
+            if ligne is not None and ligne.mesurees:
+                for attr, p in PERCENTILES:
+                    cibles.setdefault(int(p * (ligne.mesurees - 1)), []).append(attr)
+        for attr in cibles.get(rang, ()):
+            setattr(ligne, attr, duree)
+        rang += 1
+
+
+def _lignes(qs, groupe):
+    cle, libelle = GROUPES[groupe]
+    champs = [cle] + ([libelle] if libelle else [])
+    rows = (
+        qs.annotate(effective=Coalesce('date_effective', 'delivered_at'))
+        .values(*champs)
+        .annotate(**_compteurs())
+        .order_by(cle)
+    )
+    lignes = []
+    choix = dict(Livraison.TRANSPORT_CHOICES)
+    for row in rows:
+        valeur = row[cle]
+        if groupe == 'fournisseur' and valeur is None:
+            continue
+        texte = row[libelle] if libelle else choix.get(valeur, valeur or '—')
+        lignes.append(LigneSLA(cle=valeur, libelle=texte, **{k: row[k] for k in _compteurs()}))
+    _remplir_percentiles(qs, cle, lignes)
+    return lignes
+
+
+def calculer_sla(debut, fin):
+    """Calcule le rapport SLA pour la période [debut, fin[."""
+    qs = _livraisons(debut, fin)
+    agg = qs.annotate(effective=Coalesce('date_effective', 'delivered_at')).aggregate(**_compteurs())
+    global_ = LigneSLA(cle=None, libelle='Toutes livraisons', **agg)
+    _remplir_percentiles(qs, None, [global_])
+    return {
+        'debut': debut,
+        'fin': fin,
+        'global': global_,
+        'par_transport': _lignes(qs, 'transport'),
+        'par_fournisseur': _lignes(qs, 'fournisseur'),
+    }
+
+
+def rapport_sla(debut, fin):
+    """Rapport SLA mis en cache : courte durée si la période n'est pas terminée."""
+    cle = f"rapport-sla:{debut.isoformat()}:{fin.isoformat()}"
+    if fin > timezone.now():
+        timeout = getattr(settings, 'SLA_CACHE_TIMEOUT_EN_COURS', 300)
+    else:
+        timeout = getattr(settings, 'SLA_CACHE_TIMEOUT', 24 * 3600)
+    return cache.get_or_set(cle, lambda: calculer_sla(debut, fin), timeout)
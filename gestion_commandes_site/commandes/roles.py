@@ -0,0 +1,69 @@
+"""Résolution du profil fournisseur de l'utilisateur courant.
+
+Le rôle (profil fournisseur ou absence de profil) est calculé une fois puis
+mémorisé dans la session. Une version par utilisateur, stockée en base
+(commandes/versions.py) pour que tous les processus la voient, invalide
+l'entrée de session quand le profil change (création, approbation,
+révocation, suppression) : un fournisseur révoqué perd l'accès dès la
+requête suivante, quel que soit le worker qui la traite.
+"""
+from . import versions
+
+SESSION_KEY = '_fournisseur_role'
+
+
+def _version_key(user_id):
+    return f'fournisseur-role:{user_id}'
+
+
+def version_role(user_id):
+    return versions.lire(_version_key(user_id))
+
+
+def invalider_role_fournisseur(*user_ids):
+    """À appeler quand le profil fournisseur (ou son approbation) change (dans la même transaction)."""
+    versions.incrementer(*(_version_key(uid) for uid in user_ids if uid))
+
+
+def _mettre_en_cache_relation(user, profile):
+    """Renseigne le cache de `user.fournisseur_profile` (y compris l'absence de profil)."""
+    from .models import Fournisseur
+
+    Fournisseur.user.field.remote_field.set_cached_value(user, profile)
+    if profile is not None:
+        Fournisseur.user.field.set_cached_value(profile, user)
+
+
+def resoudre_fournisseur(request):
+    """Retourne le Fournisseur de l'utilisateur connecté, ou None.
+
+    Une seule lecture de version (clé primaire) quand la session contient une
+    entrée à jour ; les champs non mémorisés du profil sont chargés à la
+    demande (champs différés).
+    """
+    from .models import Fournisseur
+
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return None
+
+    version = version_role(user.pk)
+    role = request.session.get(SESSION_KEY)
+    if not role or role.get('uid') != user.pk or role.get('v') != version:
+        row = (
+            Fournisseur.objects.filter(user_id=user.pk)
+            .values('id', 'nom', 'approved')
+            .first()
+        )
+        role = {'uid': user.pk, 'v': version, **(row or {'id': None})}
+        request.session[SESSION_KEY] = role
+
+    if role['id'] is None:
+        profile = None
+    else:
+        profile = Fournisseur.from_db(
+            None, ['id', 'user_id', 'nom', 'approved'],
+            [role['id'], user.pk, role['nom'], role['approved']],
+        )
+    _mettre_en_cache_relation(user, profile)
+    return profile
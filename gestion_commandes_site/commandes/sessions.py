@@ -0,0 +1,148 @@
+"""Moteur de session « cache d'abord » (SESSION_ENGINE = 'commandes.sessions').
+
+Variante de cached_db : chaque enregistrement met à jour le cache, mais la
+table django_session n'est écrite que lorsque c'est utile :
+  - connexion / déconnexion (clés d'authentification modifiées) ;
+  - changement d'expiration (set_expiry) ;
+  - demande explicite via persister() (fin de commande) ;
+  - copie en base plus vieille que la moitié de la durée de vie de la
+    session, pour que la ligne n'expire pas alors que la session est active.
+Les modifications du panier de session ou des messages flash ne touchent
+donc plus la base. Si l'entrée de cache est perdue, la session est relue
+depuis la dernière copie en base.
+
+Le cache doit être partagé entre les processus (Redis, Memcached) : avec
+LocMemCache, chaque processus a ses propres sessions et une session anonyme,
+jamais écrite en base, serait perdue d'un worker à l'autre. Le démarrage
+échoue dans ce cas (verifier_cache_partage, appelé par CommandesConfig.ready).
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.base import CreateError, UpdateError
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+# Valeurs dont la modification impose une écriture en base
+CLES_CRITIQUES = (SESSION_KEY, HASH_SESSION_KEY, BACKEND_SESSION_KEY, '_session_expiry')
+# Horodatage (epoch) de la dernière écriture en base, conservé dans la session
+CLE_SYNCHRO = '_db_sync'
+# Backends de cache propres à chaque processus
+CACHES_LOCAUX = (LocMemCache, DummyCache)
+
+
+class SessionStore(CachedDBStore):
+    cache_key_prefix = 'commandes.sessions'
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._reference = dict.fromkeys(CLES_CRITIQUES)
+        self._persister = False
+
+    def _valeurs_critiques(self, data):
+        return {cle: data.get(cle) for cle in CLES_CRITIQUES}
+
+    def load(self):
+        data = super().load()
+        self._reference = self._valeurs_critiques(data)
+        return data
+
+    def persister(self):
+        """Force l'écriture en base au prochain enregistrement de la session."""
+        self._persister = True
+        self.modified = True
+
+    def _ecriture_en_base(self, data):
+        if self._persister:
+            return True
+        if self._valeurs_critiques(data) != self._reference:
+            return True
+        synchro = data.get(CLE_SYNCHRO)
+        # Session déjà en base : rafraîchir la copie avant qu'elle n'expire
+        return synchro is not None and time.time() - synchro > self.get_expiry_age() / 2
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        if not self._ecriture_en_base(data):
+            self._enregistrer_cache(data, must_create)
+            return
+        # La clé de synchro n'existe que dans une session déjà écrite en base
+        en_base = CLE_SYNCHRO in data
+        data[CLE_SYNCHRO] = int(time.time())
+        if must_create or not en_base:
+            try:
+                super().save(must_create=True)
+            except CreateError:
+                if must_create:
+                    raise
+                super().save()
+        else:
+            try:
+                super().save()
+            except UpdateError:
+                # Ligne supprimée entre-temps (nettoyage des sessions expirées)
+                super().save(must_create=True)
+        self._reference = self._valeurs_critiques(data)
+        self._persister = False
+
+    def cycle_key(self):
+        # Comme la version de base, sans DELETE en base pour une session jamais écrite en base
+        data = self._session
+        ancienne = self.session_key
+        en_base = CLE_SYNCHRO in data
+        self.create()
+        self._session_cache = data
+        if ancienne:
+            if en_base:
+                self.delete(ancienne)
+            else:
+                self._cache.delete(self.cache_key_prefix + ancienne)
+
+    def _enregistrer_cache(self, data, must_create):
+        if must_create:
+            # Unicité de la clé : add échoue si une session existe déjà en cache
+            if not self._cache.add(self.cache_key, data, self.get_expiry_age()):
+                raise CreateError
+        else:
+            self._cache.set(self.cache_key, data, self.get_expiry_age())
+
+    @classmethod
+    def clear_expired(cls, batch_size=1000):
+        """Supprime les sessions expirées par lots (transactions courtes) ; retourne le nombre supprimé."""
+        model = cls.get_model_class()
+        total = 0
+        while True:
+            cles = list(
+                model.objects.filter(expire_date__lt=timezone.now())
+                .values_list('session_key', flat=True)[:batch_size]
+            )
+            if not cles:
+                return total
+            total += model.objects.filter(session_key__in=cles).delete()[0]
+
+
+def persister(session):
+    """Demande l'écriture de la session en base (sans effet avec un autre moteur de session)."""
+    if isinstance(session, SessionStore):
+        session.persister()
+
+
+def verifier_cache_partage():
+    """Lève ImproperlyConfigured si ce moteur est actif sur un cache propre au processus."""
+    if settings.SESSION_ENGINE != __name__:
+        return
+    alias = settings.SESSION_CACHE_ALIAS
+    backend = import_string(settings.CACHES[alias]['BACKEND'])
+    if issubclass(backend, CACHES_LOCAUX):
+        raise ImproperlyConfigured(
+            f"SESSION_ENGINE = '{__name__}' exige un cache partagé entre les processus "
+            f"(Redis, Memcached) : le cache '{alias}' utilise {backend.__name__}. "
+            "Définissez CACHES['sessions'] ou utilisez django.contrib.sessions.backends.db."
+        )
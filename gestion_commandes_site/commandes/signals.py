@@ -0,0 +1,29 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import versions
+from .models import Produit, TarifZone, ZoneLivraison
+from .panier import fusionner_panier_session
+from .zones import invalider_zones
+
+
+@receiver(user_logged_in)
+def fusionner_panier(sender, request, user, **kwargs):
+    """À la connexion, le panier anonyme (session) rejoint le panier en base."""
+    if request is not None and hasattr(request, 'session'):
+        fusionner_panier_session(request, user)
+
+
+@receiver([post_save, post_delete], sender=ZoneLivraison)
+@receiver([post_save, post_delete], sender=TarifZone)
+def invalider_index_zones(sender, **kwargs):
+    """L'index des zones de livraison est reconstruit à la prochaine résolution (après commit)."""
+    transaction.on_commit(invalider_zones)
+
+
+@receiver([post_save, post_delete], sender=Produit)
+def invalider_catalogue(sender, **kwargs):
+    """Nouvelle version du catalogue, dans la transaction de la modification."""
+    versions.incrementer(versions.CATALOGUE)
@@ -0,0 +1,23 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def version_produits(lignes, fournisseurs=False):
+    """Horodatage de la dernière modification des produits des lignes (et de leurs
+    fournisseurs si l'argument est donné), à ajouter à la clé d'un fragment
+    {% cache %} qui affiche leurs noms.
+
+    Les produits (et fournisseurs) doivent être préchargés avec les lignes.
+    Exemple : `{% cache 600 cle o.pk o.lignes.all|version_produits:"fournisseurs" %}`
+    """
+    dates = []
+    for ligne in lignes:
+        produit = ligne.produit
+        if produit is None:
+            continue
+        dates.append(produit.updated_at)
+        if fournisseurs:
+            dates.append(produit.fournisseur.updated_at)
+    return max(dates).timestamp() if dates else 0
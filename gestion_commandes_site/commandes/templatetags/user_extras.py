@@ -8,6 +8,8 @@ def has_attr(obj, attr_name):
     """Return True if object has attribute `attr_name`, otherwise False.
 
     Use in templates like: `{% if user|has_attr:'fournisseur_profile' %}`
+    (for the supplier role, prefer the `est_fournisseur` context variable,
+    which does not hit the database).
     """
     try:
         return hasattr(obj, attr_name)
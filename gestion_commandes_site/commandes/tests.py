@@ -1,3 +1,1245 @@
-from django.test import TestCase
+import json
+import pstats
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.messages import get_messages
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import (
+    flux, jobs, metriques, notifications, panier, positions, profilage, sessions, throttling, transfert, versements,
+    webhooks, zones,
+)
+from .archive import archiver_commandes, historique_commandes
+from .exports import ENTETE_COMMANDES
+from .imports import detecter_format, importer_produits
+from .middleware import FournisseurProfileMiddleware, MetriquesMiddleware, ProfilingMiddleware, ThrottleMiddleware
+from .models import (
+    AbonnementWebhook, Commande, CommandeArchive, CommandeFournisseur, CommandeFournisseurArchive, EnvoiWebhook,
+    EvenementStatut, Fournisseur, LigneCommande, Livraison, NotificationFournisseur, Panier, PanierLigne, Produit,
+    PreferenceNotification, RapportJob, ReleveImmuable, ReleveVersement, SegmentPositions, SegmentPositionsArchive,
+    TarifZone, ZoneLivraison,
+)
+from .notifications import enregistrer_nouvelle_commande, parts_fournisseurs
+from .rapports import calculer_sla
+from .roles import invalider_role_fournisseur, resoudre_fournisseur, version_role
+from .views.backoffice import _commandes_qs, fournisseur_delete
+from .views.commun import LIGNES_PREFETCH
+from .views.catalogue import _catalogue_qs, _last_commande_qs
+from .views.fournisseur import (
+    CommandesFournisseurListView, _commandes_fournisseur_qs, _livraisons_fournisseur_qs, _ventes_fournisseur,
+    _ventes_fournisseur_qs,
+)
+
+# Tables qui grossissent avec l'activité : un parcours complet sans index y est interdit
+GRANDES_TABLES = {
+    'commandes_commande', 'commandes_lignecommande', 'commandes_livraison',
+    'commandes_commandefournisseur', 'commandes_produit',
+}
+# "SCAN table" sans "USING ... INDEX" : lecture de toute la table
+SCAN_COMPLET = re.compile(r'\bSCAN (\w+)\b(?! USING)')
+
+
+@skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN propre à SQLite")
+class PlansRequetesTests(TestCase):
+    """Plans d'exécution des requêtes fréquentes des vues.
+
+    Sans ANALYZE, SQLite suppose des tables volumineuses : le plan obtenu sur
+    la base de test vide est celui choisi en production.
+    """
+
+    # Seule la clé primaire est utilisée pour construire les requêtes
+    fournisseur = Fournisseur(pk=1)
+
+    def assertPlan(self, qs, *index, tri_temporaire=False):
+        plan = qs.explain()
+        for motif in index:
+            self.assertRegex(plan, rf'USING (COVERING )?INDEX {motif}\b', msg=plan)
+        scans = [table for table in SCAN_COMPLET.findall(plan) if table in GRANDES_TABLES]
+        self.assertEqual(scans, [], msg=plan)
+        if not tri_temporaire:
+            self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan)
+        return plan
+
+    def test_catalogue(self):
+        self.assertPlan(_catalogue_qs(), 'produit_actif_date_idx')
+
+    def test_liste_commandes(self):
+        self.assertPlan(_commandes_qs(), 'commande_date_idx')
+
+    def test_liste_commandes_par_statut(self):
+        self.assertPlan(_commandes_qs('en_cours'), 'commande_statut_date_idx')
+
+    def test_liste_commandes_recherche_produit(self):
+        self.assertPlan(
+            _commandes_qs('en_cours', 'chaise'),
+            'commande_statut_date_idx', r'commandes_lignecommande_commande_id_\w+',
+        )
+
+    def test_liste_commandes_recherche_id(self):
+        plan = self.assertPlan(_commandes_qs(None, '42'))
+        self.assertIn('USING INTEGER PRIMARY KEY', plan)
+
+    def test_commandes_fournisseur(self):
+        self.assertPlan(_commandes_fournisseur_qs(self.fournisseur), 'cmdfourn_fourn_date_idx')
+
+    def test_commandes_fournisseur_filtrees(self):
+        self.assertPlan(
+            _commandes_fournisseur_qs(self.fournisseur, 'en_cours', '2025-01-01', '2025-01-31'),
+            'cmdfourn_fourn_statut_date_idx',
+        )
+
+    def test_livraisons_fournisseur(self):
+        self.assertPlan(
+            _livraisons_fournisseur_qs(self.fournisseur, 'livree', '2025-01-01', '2025-01-31'),
+            'cmdfourn_fourn_date_idx', r'sqlite_autoindex_commandes_livraison_\d+',
+        )
+
+    def test_ventes_fournisseur(self):
+        # Le tri porte sur le total agrégé : un tri temporaire est inévitable,
+        # mais seules les lignes des produits du fournisseur sont lues.
+        self.assertPlan(
+            _ventes_fournisseur_qs(self.fournisseur),
+            r'commandes_produit_fournisseur_id_\w+', r'(lignecmd_produit_cmd_idx|commandes_lignecommande_produit_id_\w+)',
+            tri_temporaire=True,
+        )
+
+    def test_derniere_commande_produit(self):
+        self.assertPlan(_last_commande_qs('chaise')[:1], 'lignecmd_produit_cmd_idx')
+
+
+def creer_fournisseur(nom='Atelier', approved=True):
+    user = get_user_model().objects.create_user(nom.lower(), password='x')
+    return Fournisseur.objects.create(user=user, nom=nom, email=f'{nom.lower()}@exemple.fr', approved=approved)
+
+
+def creer_produit(fournisseur, slug='chaise', prix='10.00'):
+    return Produit.objects.create(fournisseur=fournisseur, nom=slug.title(), slug=slug, prix=Decimal(prix))
+
+
+class ArchivageTests(TestCase):
+    """Archivage des commandes terminées et conservation des lignes liées."""
+
+    def setUp(self):
+        self.fournisseur = creer_fournisseur()
+        produit = creer_produit(self.fournisseur)
+        self.commande = Commande.objects.create(statut='livree')
+        LigneCommande.objects.create(commande=self.commande, produit=produit, quantite=2)
+        self.livraison = Livraison.objects.create(commande=self.commande, statut='livree', adresse_livraison='Rue A')
+        Commande.objects.filter(pk=self.commande.pk).update(date_commande=timezone.now() - timedelta(days=200))
+        NotificationFournisseur.objects.create(fournisseur=self.fournisseur, commande=self.commande, nb_articles=2)
+        self.points = [(1_700_000_000_000, -18.9, 47.5), (1_700_000_060_000, -18.91, 47.51)]
+        positions.enregistrer(self.livraison.pk, self.points)
+
+    def test_aller_retour(self):
+        self.assertEqual(archiver_commandes(jours=90), 1)
+        self.assertFalse(Commande.objects.filter(pk=self.commande.pk).exists())
+        archive = CommandeArchive.objects.get(pk=self.commande.pk)
+        self.assertEqual([(lc.quantite, lc.prix_unitaire) for lc in archive.lignes.all()], [(2, Decimal('10.00'))])
+        self.assertEqual(archive.livraison.adresse_livraison, 'Rue A')
+        self.assertEqual([c.pk for c in historique_commandes()], [self.commande.pk])
+        # Récente : pas encore archivable
+        Commande.objects.create(statut='livree')
+        self.assertEqual(archiver_commandes(jours=90), 0)
+
+    def test_lignes_liees_archivees(self):
+        archiver_commandes(jours=90)
+        self.assertFalse(CommandeFournisseur.objects.exists())
+        self.assertFalse(SegmentPositions.objects.exists())
+        self.assertFalse(NotificationFournisseur.objects.exists())
+        lien = CommandeFournisseurArchive.objects.get(commande_id=self.commande.pk)
+        self.assertEqual(lien.fournisseur, self.fournisseur)
+        # Segments réduits au passage puis copiés : la trace reste lisible
+        self.assertTrue(SegmentPositionsArchive.objects.get(livraison_id=self.livraison.pk).reduit)
+        self.assertEqual(positions.trace(self.livraison.pk), self.points)
+
+    def test_fournisseur_voit_archives(self):
+        archiver_commandes(jours=90)
+        recente = Commande.objects.create(statut='en_attente')
+        LigneCommande.objects.create(commande=recente, produit=Produit.objects.get(), quantite=1)
+
+        request = RequestFactory().get('/fournisseur/commandes/')
+        request.user, request.fournisseur = self.fournisseur.user, self.fournisseur
+        view = CommandesFournisseurListView()
+        view.setup(request)
+        view.object_list = view.get_queryset()
+        commandes = view.get_context_data()['commandes']
+        self.assertEqual(
+            [(d['commande'].pk, d['commande'].est_archivee, [lc.quantite for lc in d['lignes']]) for d in commandes],
+            [(recente.pk, False, [1]), (self.commande.pk, True, [2])],
+        )
+        ventes = _ventes_fournisseur(self.fournisseur)
+        self.assertEqual([(v['produit__nom'], v['total_qte'], v['total_montant']) for v in ventes],
+                         [('Chaise', 3, Decimal('30.00'))])
+
+    def test_suppression_en_cascade(self):
+        self.commande.delete()
+        self.assertFalse(CommandeFournisseur.objects.exists())
+        self.assertFalse(NotificationFournisseur.objects.exists())
+        self.assertFalse(SegmentPositions.objects.exists())
+
+    def test_export_en_flux(self):
+        archiver_commandes(jours=90)
+        Commande.objects.create()
+        response = self.client.get(reverse('commandes:commandes-export-csv'))
+        self.assertTrue(response.streaming)
+        lignes = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lignes[0].split(',')[0], 'id')
+        self.assertEqual(len(lignes), 2)
+        self.assertIn('Chaise', lignes[1])
+
+
+class RolesFournisseurTests(TestCase):
+    """Rôle fournisseur mémorisé en session, invalidé par une version stockée en base."""
+
+    def setUp(self):
+        self.fournisseur = creer_fournisseur()
+        self.session = {}
+
+    def resoudre(self, user=None):
+        request = RequestFactory().get('/')
+        request.user = user or self.fournisseur.user
+        request.session = self.session
+        return resoudre_fournisseur(request)
+
+    def test_role_memorise_en_session(self):
+        self.assertTrue(self.resoudre().approved)
+        # Modification sans invalidation : l'entrée de session fait foi, sans lire Fournisseur
+        Fournisseur.objects.filter(pk=self.fournisseur.pk).update(approved=False)
+        with self.assertNumQueries(1):
+            self.assertTrue(self.resoudre().approved)
+
+    def test_revocation(self):
+        self.assertTrue(self.resoudre().approved)
+        version = version_role(self.fournisseur.user_id)
+        # Comme l'action admin : UPDATE groupé puis invalidation, lue en base par tous les processus
+        Fournisseur.objects.filter(pk=self.fournisseur.pk).update(approved=False)
+        invalider_role_fournisseur(self.fournisseur.user_id)
+        self.assertFalse(self.resoudre().approved)
+        self.assertEqual(version_role(self.fournisseur.user_id), version + 1)
+
+    def test_creation_et_suppression_du_profil(self):
+        user = get_user_model().objects.create_user('client', password='x')
+        self.assertIsNone(self.resoudre(user))
+        profil = Fournisseur.objects.create(user=user, nom='Nouveau', email='n@exemple.fr', approved=True)
+        self.assertEqual(self.resoudre(user).pk, profil.pk)
+        profil.delete()
+        self.assertIsNone(self.resoudre(user))
+
+    def test_resolution_paresseuse(self):
+        request = RequestFactory().get('/')
+        request.user, request.session = self.fournisseur.user, self.session
+        middleware = FournisseurProfileMiddleware(lambda r: HttpResponse())
+        # Vue qui ne lit pas request.fournisseur : ni version ni session
+        with self.assertNumQueries(0):
+            middleware(request)
+        self.assertEqual(self.session, {})
+        with self.assertNumQueries(2):
+            self.assertTrue(request.fournisseur.approved)
+        self.assertTrue(request.fournisseur)
+
+    def test_actions_admin_datent_la_modification(self):
+        hier = timezone.now() - timedelta(days=1)
+        Fournisseur.objects.filter(pk=self.fournisseur.pk).update(updated_at=hier)
+        self.client.force_login(get_user_model().objects.create_superuser('admin', password='x'))
+        self.client.post(reverse('admin:commandes_fournisseur_changelist'), {
+            'action': 'revoke_approval', '_selected_action': [self.fournisseur.pk],
+        })
+        self.fournisseur.refresh_from_db()
+        self.assertFalse(self.fournisseur.approved)
+        self.assertGreater(self.fournisseur.updated_at, hier)
+
+
+class ValidationConditionnelleTests(TestCase):
+    """ETag des pages produit et commande (If-None-Match: * : 304 dès qu'un validateur existe, sans rendu)."""
+
+    def setUp(self):
+        self.fournisseur = creer_fournisseur()
+        creer_produit(self.fournisseur)
+        self.url = reverse('commandes:produit-detail', args=['chaise'])
+
+    def etag(self, url):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 304)
+        return response['ETag']
+
+    def test_modification_du_fournisseur(self):
+        avant = self.etag(self.url)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=avant).status_code, 304)
+        self.fournisseur.telephone = '0340000000'
+        self.fournisseur.save()
+        self.assertNotEqual(self.etag(self.url), avant)
+
+    def test_version_du_catalogue(self):
+        url = reverse('commandes:index')
+        etags = [self.etag(url)]
+        produit = Produit.objects.get()
+        produit.is_active = False
+        produit.save()
+        etags.append(self.etag(url))
+        # Import en masse (bulk_create, sans signal)
+        importer_produits(self.fournisseur, SimpleUploadedFile('p.csv', b'nom,prix\nTable,20\n'))
+        etags.append(self.etag(url))
+        Produit.objects.filter(nom='Table').delete()
+        etags.append(self.etag(url))
+        self.assertEqual(len(set(etags)), 4)
+
+    def test_commande_inexistante_ou_archivee(self):
+        url = reverse('commandes:commande-detail', args=[999])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='*').status_code, 404)
+        CommandeArchive.objects.create(id=999, date_commande=timezone.now(), statut='livree')
+        self.etag(url)
+
+
+class StatutsLivraisonTests(TestCase):
+    """Changements de statut : validation et écriture atomique avec le journal EvenementStatut."""
+
+    def setUp(self):
+        self.livraison = Livraison.objects.create(commande=Commande.objects.create())
+
+    def url(self, statut):
+        return reverse('commandes:modifier_statut_livraison', args=[self.livraison.pk, statut])
+
+    def test_statut_inconnu(self):
+        self.assertEqual(self.client.get(self.url('perdue')).status_code, 404)
+        self.livraison.refresh_from_db()
+        self.assertEqual(self.livraison.statut, 'prep')
+        self.assertFalse(EvenementStatut.objects.exists())
+        with self.assertRaises(ValueError):
+            self.livraison.update_status('perdue')
+
+    def test_statut_journalise(self):
+        self.assertEqual(self.client.get(self.url('en_transit')).status_code, 302)
+        self.livraison.refresh_from_db()
+        self.assertEqual(self.livraison.statut, 'en_transit')
+        self.assertIsNotNone(self.livraison.assigned_at)
+        self.assertEqual(EvenementStatut.objects.get().statut_code, 'en_transit')
+
+    def test_etat_et_evenement_ensemble(self):
+        with mock.patch.object(EvenementStatut, 'enregistrer', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.livraison.update_status('livree')
+        self.livraison.refresh_from_db()
+        self.assertEqual(self.livraison.statut, 'prep')
+
+
+class ThrottlingTests(TestCase):
+    """Seaux de jetons : capacité, remplissage continu et réponse 429."""
+
+    def setUp(self):
+        self.cache = throttling.cache_throttle()
+        self.cache.clear()
+
+    def consommer(self, maintenant, capacite=3, periode=60):
+        return throttling.consommer(self.cache, 'throttle:test', capacite, periode, maintenant)
+
+    def test_capacite_puis_remplissage(self):
+        self.assertEqual([self.consommer(1000) for _ in range(4)], [0, 0, 0, 20])
+        # Un jeton toutes les 20 s
+        self.assertEqual(self.consommer(1010), 10)
+        self.assertEqual(self.consommer(1020), 0)
+        self.assertEqual(self.consommer(1020), 20)
+
+    def test_pas_de_rafale_au_changement_de_periode(self):
+        self.assertEqual([self.consommer(1199) for _ in range(3)], [0, 0, 0])
+        # Une fenêtre fixe de 60 s repartirait de zéro à 1200
+        self.assertNotEqual(self.consommer(1201), 0)
+
+    def test_seau_plafonne(self):
+        self.consommer(1000)
+        # Après une longue inactivité, le seau ne dépasse pas sa capacité
+        self.assertEqual([self.consommer(100000) for _ in range(4)], [0, 0, 0, 20])
+
+    @override_settings(THROTTLE_RATES={'add_to_cart': {'ip': '2/min', 'methodes': ['POST']}})
+    def test_reponse_429(self):
+        url = reverse('commandes:add_to_cart', args=[creer_produit(creer_fournisseur()).pk])
+        self.assertEqual([self.client.post(url).status_code for _ in range(2)], [302, 302])
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn(response['Retry-After'], {'29', '30'})
+        # Autre adresse IP : autre seau
+        self.assertEqual(self.client.post(url, REMOTE_ADDR='198.51.100.1').status_code, 302)
+
+
+class SessionsTests(TestCase):
+    """Sessions conservées d'un processus à l'autre (cache local vidé entre deux requêtes)."""
+
+    def setUp(self):
+        self.produit = creer_produit(creer_fournisseur())
+        self.url = reverse('commandes:add_to_cart', args=[self.produit.pk])
+
+    def session_relue(self):
+        # Autre worker : son cache local ne contient pas la session
+        cache.clear()
+        store = import_string(settings.SESSION_ENGINE + '.SessionStore')
+        return store(self.client.cookies[settings.SESSION_COOKIE_NAME].value).load()
+
+    @override_settings(THROTTLE_RATES={})
+    def test_panier_anonyme_conserve(self):
+        self.client.post(self.url, {'qty': 2})
+        self.assertEqual(self.session_relue()[panier.SESSION_KEY], {str(self.produit.pk): 2})
+
+    def test_connexion_conservee(self):
+        user = get_user_model().objects.create_user('client', password='secret')
+        self.client.force_login(user)
+        self.assertEqual(self.session_relue()['_auth_user_id'], str(user.pk))
+
+    @override_settings(SESSION_ENGINE='commandes.sessions', SESSION_CACHE_ALIAS='default')
+    def test_moteur_cache_refuse_sur_cache_local(self):
+        with self.assertRaises(ImproperlyConfigured):
+            sessions.verifier_cache_partage()
+
+    @override_settings(
+        SESSION_ENGINE='commandes.sessions', SESSION_CACHE_ALIAS='sessions',
+        CACHES={**settings.CACHES, 'sessions': {'BACKEND': 'commandes.cache.RedisCache', 'LOCATION': 'redis://'}},
+    )
+    def test_moteur_cache_accepte_sur_cache_partage(self):
+        sessions.verifier_cache_partage()
+
+
+class ProfilageTests(TestCase):
+    """ProfilingMiddleware : profil écrit, ou requête servie sans profil si cProfile est déjà actif."""
+
+    def setUp(self):
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        self.dossier = Path(dossier.name)
+        self.middleware = ProfilingMiddleware(lambda request: HttpResponse('ok'))
+
+    def requete(self):
+        return RequestFactory().get('/', HTTP_X_PROFILAGE=profilage.jeton())
+
+    def echantillonneurs(self):
+        return [t for t in threading.enumerate() if isinstance(t, profilage.Echantillonneur)]
+
+    def test_profil_enregistre(self):
+        with override_settings(PROFILAGE_DOSSIER=self.dossier):
+            response = self.middleware(self.requete())
+        self.assertTrue(response['X-Profilage-Fichier'].startswith(profilage.SANS_NOM + '/'))
+        self.assertEqual(len(list(self.dossier.glob('*/*.prof'))), 1)
+        self.assertEqual(self.echantillonneurs(), [])
+
+    def test_profileur_deja_actif(self):
+        erreur = ValueError("Another profiling tool is already active")
+        with override_settings(PROFILAGE_DOSSIER=self.dossier), \
+                mock.patch('cProfile.Profile.enable', side_effect=erreur):
+            response = self.middleware(self.requete())
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profilage-Fichier', response)
+        self.assertEqual(list(self.dossier.iterdir()), [])
+        self.assertEqual(self.echantillonneurs(), [])
+
+    def test_profil_sous_asgi(self):
+        def travail_synchrone():
+            return sum(range(1000))
+
+        async def vue(request):
+            # Vue synchrone sous ASGI : exécutée par sync_to_async, dans le thread profilé
+            await sync_to_async(travail_synchrone)()
+            return HttpResponse('ok')
+
+        with override_settings(PROFILAGE_DOSSIER=self.dossier):
+            response = async_to_sync(ProfilingMiddleware(vue))(self.requete())
+        self.assertIn('X-Profilage-Fichier', response)
+        [chemin] = self.dossier.glob('*/*.prof')
+        self.assertIn('travail_synchrone', {nom for _, _, nom in pstats.Stats(str(chemin)).stats})
+
+    def test_echantillonneur_arrete_si_la_vue_echoue(self):
+        def vue(request):
+            raise RuntimeError
+        with override_settings(PROFILAGE_DOSSIER=self.dossier), self.assertRaises(RuntimeError):
+            ProfilingMiddleware(vue)(self.requete())
+        self.assertEqual(self.echantillonneurs(), [])
+
+
+class VersementsTests(TestCase):
+    """Relevés de versement : montants au centime, périodes, immutabilité et fournisseur protégé."""
+
+    def setUp(self):
+        self.fournisseur = creer_fournisseur()
+        Fournisseur.objects.filter(pk=self.fournisseur.pk).update(commission_rate=Decimal('12.50'))
+        produit = creer_produit(self.fournisseur, prix='0.10')
+        self.commande = Commande.objects.create(statut='livree')
+        # 3 x 0,10 : 0.30000000000000004 en flottants
+        LigneCommande.objects.create(commande=self.commande, produit=produit, quantite=3)
+        LigneCommande.objects.create(commande=self.commande, produit=produit, quantite=1, prix_unitaire=Decimal('19.99'))
+        Livraison.objects.create(
+            commande=self.commande, statut='livree', adresse_livraison='Rue A', delivered_at=timezone.now(),
+        )
+        self.jour = timezone.localdate()
+
+    def test_montants_au_centime(self):
+        [releve] = versements.calculer_releves(self.jour, self.jour)
+        self.assertEqual(releve.ventes_brutes, Decimal('20.29'))
+        # 12,5 % de 20,29 = 2,53625 : arrondi au demi supérieur
+        self.assertEqual(releve.commission, Decimal('2.54'))
+        self.assertEqual(releve.net, Decimal('17.75'))
+        self.assertEqual((releve.nb_commandes, releve.nb_lignes), (1, 2))
+
+    def test_periodes(self):
+        versements.calculer_releves(self.jour, self.jour)
+        # Même période : rien de plus ; période chevauchante : refusée
+        self.assertEqual(versements.calculer_releves(self.jour, self.jour), [])
+        with self.assertRaises(ValueError):
+            versements.calculer_releves(self.jour - timedelta(days=1), self.jour)
+        self.assertEqual(ReleveVersement.objects.count(), 1)
+
+    def test_releve_immuable(self):
+        [releve] = versements.calculer_releves(self.jour, self.jour)
+        releve.net = Decimal('0')
+        for action in (releve.save, releve.delete, ReleveVersement.objects.all().delete,
+                       lambda: ReleveVersement.objects.update(net=0)):
+            with self.assertRaises(ReleveImmuable):
+                action()
+        self.assertEqual(ReleveVersement.objects.get().net, Decimal('17.75'))
+
+    def test_ventes_au_prix_de_la_ligne(self):
+        Produit.objects.update(prix=Decimal('99.00'))
+        [vente] = _ventes_fournisseur_qs(self.fournisseur)
+        self.assertEqual((vente['total_qte'], vente['total_montant']), (4, Decimal('20.29')))
+
+    def test_lignes_sans_prix(self):
+        # Ligne antérieure à prix_unitaire : prix payé inconnu, jamais remplacé par le prix courant
+        LigneCommande.objects.filter(prix_unitaire=Decimal('19.99')).update(prix_unitaire=None)
+        with self.assertRaisesRegex(ValueError, '1 ligne'):
+            versements.calculer_releves(self.jour, self.jour)
+        self.assertFalse(ReleveVersement.objects.exists())
+        [vente] = _ventes_fournisseur_qs(self.fournisseur)
+        self.assertEqual((vente['total_qte'], vente['total_montant'], vente['lignes_sans_prix']),
+                         (4, Decimal('0.30'), 1))
+
+    def test_suppression_fournisseur_avec_releves(self):
+        versements.calculer_releves(self.jour, self.jour)
+        request = RequestFactory().post('/')
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        with mock.patch('commandes.views.backoffice.redirect', return_value=HttpResponse(status=302)):
+            response = fournisseur_delete(request, self.fournisseur.pk)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual([m.level_tag for m in request._messages], ['error'])
+        self.assertTrue(Fournisseur.objects.filter(pk=self.fournisseur.pk).exists())
+
+        admin = get_user_model().objects.create_superuser('admin', password='x')
+        self.client.force_login(admin)
+        response = self.client.post(
+            reverse('admin:commandes_fournisseur_delete', args=[self.fournisseur.pk]), {'post': 'yes'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Fournisseur.objects.filter(pk=self.fournisseur.pk).exists())
+
+
+class ZonesTests(TestCase):
+    """Résolution des zones : plus long préfixe postal, puis nom de ville ; version partagée en base."""
+
+    def setUp(self):
+        # L'index d'un test précédent porterait une version rejouée depuis zéro
+        zones._index = None
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tana = ZoneLivraison.objects.create(nom='Tana', prefixes_postaux='101', villes='Antananarivo', ordre=1)
+            self.centre = ZoneLivraison.objects.create(nom='Centre', prefixes_postaux='1012', villes='Analakely')
+            self.est = ZoneLivraison.objects.create(nom='Est', villes='Toamasina\nSaint-Denis')
+            for zone, montant in ((self.tana, '3000'), (self.centre, '2000'), (self.est, '5000')):
+                TarifZone.objects.create(zone=zone, transport='moto', montant=Decimal(montant))
+
+    def zone(self, adresse):
+        return zones.index_zones().zone(adresse)
+
+    def test_plus_long_prefixe(self):
+        self.assertEqual(self.zone("Lot II M 12, 1012 Antananarivo"), self.centre.pk)
+        self.assertEqual(self.zone("Lot II M 12, 10150 Antananarivo"), self.tana.pk)
+        # Le code postal prime sur le nom de ville
+        self.assertEqual(self.zone("Rue A, 101 Analakely"), self.tana.pk)
+
+    def test_repli_sur_la_ville(self):
+        self.assertEqual(self.zone("Rue A, Analakely"), self.centre.pk)
+        self.assertEqual(self.zone("Bd Joffre, 9999 Saint Dénis"), self.est.pk)
+        self.assertIsNone(self.zone("Rue B, Fianarantsoa"))
+        self.assertEqual(zones.tarif_livraison("Rue A, 1012", 'moto'), Decimal('2000'))
+        self.assertIsNone(zones.tarif_livraison("Rue A, 1012", 'camion'))
+
+    def test_index_reconstruit_apres_modification(self):
+        version = zones.version_zones()
+        self.assertEqual(self.zone("Rue A, Mahajanga"), None)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.est.villes += '\nMahajanga'
+            self.est.save()
+        self.assertEqual(zones.version_zones(), version + 1)
+        self.assertEqual(self.zone("Rue A, Mahajanga"), self.est.pk)
+
+    @override_settings(THROTTLE_RATES={})
+    def test_checkout_ignore_le_montant_poste(self):
+        produit = creer_produit(creer_fournisseur())
+        self.client.force_login(get_user_model().objects.create_user('client', password='x'))
+        url = reverse('commandes:checkout')
+        for adresse, attendu in (("Rue A, 1012", Decimal('2000')), ("Rue B, Fianarantsoa", Decimal('4000'))):
+            self.client.post(reverse('commandes:add_to_cart', args=[produit.pk]))
+            with mock.patch('commandes.views.achat.render', return_value=HttpResponse()):
+                self.client.post(url, {'adresse': adresse, 'methode': 'moto', 'montant': '1'})
+            self.assertEqual(Livraison.objects.latest('pk').montant, attendu)
+        # Transport inconnu : refusé, pas de commande
+        self.client.post(reverse('commandes:add_to_cart', args=[produit.pk]))
+        response = self.client.post(url, {'adresse': 'Rue C', 'methode': 'camion'})
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        self.assertEqual(Commande.objects.count(), 2)
+
+
+class PositionsTests(TestCase):
+    """Positions des livreurs : encodage compact et réduction des livraisons terminées."""
+
+    def setUp(self):
+        self.debut = 1_700_000_000_000
+        # Un point toutes les 10 s pendant 2 min, en trois envois
+        self.points = [
+            (self.debut + i * 10_000, round(-18.9 + i / 10_000, 6), round(47.5 - i / 10_000, 6)) for i in range(13)
+        ]
+
+    def creer_livraison(self, statut):
+        livraison = Livraison.objects.create(
+            commande=Commande.objects.create(), statut=statut, adresse_livraison='Rue A',
+        )
+        for envoi in (self.points[:5], self.points[5:9], self.points[9:]):
+            positions.enregistrer(livraison.pk, envoi)
+        return livraison
+
+    def test_encodage(self):
+        points = [(self.debut, -18.879190, 47.507905), (self.debut + 1500, 90.0, -180.0)]
+        debut, donnees = positions.encoder(points)
+        self.assertEqual(len(donnees), 2 * positions.POINT.size)
+        self.assertEqual(positions.decoder(SegmentPositions(debut=debut, donnees=donnees)), points)
+
+    def test_validation(self):
+        maintenant = self.debut + 60_000
+        self.assertEqual(
+            positions.valider([[self.debut + 10, 1, 2], [None, 3, 4], [self.debut, 5, 6]], maintenant, 10),
+            [(self.debut, 5.0, 6.0), (self.debut + 10, 1.0, 2.0), (maintenant, 3.0, 4.0)],
+        )
+        for brut in ([], [[self.debut, 91, 0]], [[maintenant + 60_001, 0, 0]], [[0, 0, 0], [maintenant, 0, 0]],
+                     [[self.debut, 0, 0]] * 11, [['x', 0, 0]]):
+            with self.assertRaises(positions.PositionsInvalides):
+                positions.valider(brut, maintenant, 10)
+
+    def test_reduction(self):
+        terminee = self.creer_livraison('livree')
+        en_cours = self.creer_livraison('prep')
+        self.assertEqual(positions.reduire_segments(intervalle=30, batch_size=1), (1, 13, 5))
+        self.assertEqual(positions.trace(terminee.pk), self.points[::3])
+        self.assertEqual(SegmentPositions.objects.filter(livraison=terminee).count(), 1)
+        # Livraison en cours intacte ; une seconde passe ne refait rien
+        self.assertEqual(positions.trace(en_cours.pk), self.points)
+        self.assertEqual(SegmentPositions.objects.filter(livraison=en_cours).count(), 3)
+        self.assertEqual(positions.reduire_segments(intervalle=30), (0, 0, 0))
+
+
+class FluxTests(TestCase):
+    """Diffuseur SSE : un événement validé après un id supérieur est diffusé une fois."""
+
+    def setUp(self):
+        self.diffusion = flux.Diffuseur(None)
+        self.diffusion.stable = 0
+
+    def evenement(self, pk, anciennete=0):
+        return EvenementStatut.objects.create(
+            pk=pk, entite=EvenementStatut.ENTITE_COMMANDE, entite_id=1, statut=1,
+            horodatage=timezone.now() - timedelta(seconds=anciennete),
+        )
+
+    def scruter(self):
+        evenements, _ = async_to_sync(self.diffusion._lire)()
+        self.diffusion._avancer(evenements)
+        return [e.pk for e in evenements]
+
+    def test_validation_tardive(self):
+        self.evenement(10)
+        self.assertEqual(self.scruter(), [10])
+        # Id 5 attribué avant 10, visible après lui
+        self.evenement(5)
+        self.evenement(11)
+        self.assertEqual(self.scruter(), [5, 11])
+        self.assertEqual(self.scruter(), [])
+        self.assertEqual((self.diffusion.stable, self.diffusion.curseur), (0, 11))
+
+    def test_curseur_stable(self):
+        self.evenement(3, anciennete=60)
+        self.evenement(4)
+        self.assertEqual(self.scruter(), [3, 4])
+        self.assertEqual((self.diffusion.stable, set(self.diffusion.diffuses)), (3, {4}))
+        with override_settings(JOURNAL_DELAI_COMMIT=0):
+            self.assertEqual(self.scruter(), [])
+        self.assertEqual((self.diffusion.stable, self.diffusion.diffuses), (4, {}))
+
+
+class TimelineCommandeTests(TestCase):
+    """Historique des statuts : réservé au client de la commande et au staff."""
+
+    def setUp(self):
+        User = get_user_model()
+        self.client_commande = User.objects.create_user('cliente', password='x')
+        self.commande = Commande.objects.create(client=self.client_commande)
+        EvenementStatut.enregistrer(self.commande)
+        self.url = reverse('commandes:commande-timeline', args=[self.commande.pk])
+
+    def test_acces(self):
+        User = get_user_model()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.force_login(User.objects.create_user('autre', password='x'))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        for user in (self.client_commande, User.objects.create_user('staff', password='x', is_staff=True)):
+            self.client.force_login(user)
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()['evenements']), 1)
+
+
+class FragmentsTests(TestCase):
+    """Clés des fragments en cache : les noms de produit et de fournisseur affichés en font partie."""
+
+    GABARIT = (
+        '{% load cache fragments %}'
+        '{% cache 600 essai o.pk o.updated_at.timestamp o.lignes.all|version_produits:"fournisseurs" using="fragments" %}'
+        '{% for l in o.lignes.all %}{{ l.produit.nom }}/{{ l.produit.fournisseur.nom }}{% endfor %}'
+        '{% endcache %}'
+    )
+
+    def setUp(self):
+        caches['fragments'].clear()
+        self.fournisseur = creer_fournisseur()
+        self.produit = creer_produit(self.fournisseur)
+        self.commande = Commande.objects.create()
+        LigneCommande.objects.create(commande=self.commande, produit=self.produit, quantite=1)
+
+    def rendre(self):
+        commande = Commande.objects.prefetch_related(LIGNES_PREFETCH).get(pk=self.commande.pk)
+        return Template(self.GABARIT).render(Context({'o': commande}))
+
+    def test_renommages(self):
+        self.assertEqual(self.rendre(), 'Chaise/Atelier')
+        self.produit.nom = 'Fauteuil'
+        self.produit.save()
+        self.assertEqual(self.rendre(), 'Fauteuil/Atelier')
+        self.fournisseur.nom = 'Menuiserie'
+        self.fournisseur.save()
+        self.assertEqual(self.rendre(), 'Fauteuil/Menuiserie')
+
+
+@override_settings(THROTTLE_RATES={})
+class PanierTests(TestCase):
+    """Panier : saisies invalides refusées, panier de session fusionné en base à la connexion."""
+
+    def setUp(self):
+        self.produit = creer_produit(creer_fournisseur())
+        self.url = reverse('commandes:add_to_cart', args=[self.produit.pk])
+
+    def test_quantites_invalides(self):
+        self.client.force_login(get_user_model().objects.create_user('client', password='x'))
+        for qty in ('abc', '', '-2', '0', '1.5', str(panier.QUANTITE_MAX + 1)):
+            response = self.client.post(self.url, {'qty': qty})
+            self.assertRedirects(response, reverse('commandes:cart_detail'), fetch_redirect_response=False)
+            self.assertEqual(list(get_messages(response.wsgi_request))[-1].level_tag, 'error')
+        self.assertFalse(PanierLigne.objects.exists())
+        self.client.post(self.url, {'qty': '3'})
+        self.assertEqual(PanierLigne.objects.get().quantite, 3)
+
+    def test_produit_inconnu_ou_inactif(self):
+        self.assertEqual(self.client.post(reverse('commandes:add_to_cart', args=[999]), {'qty': 1}).status_code, 404)
+        Produit.objects.update(is_active=False)
+        self.assertEqual(self.client.post(self.url, {'qty': 1}).status_code, 404)
+        self.assertNotIn(panier.SESSION_KEY, self.client.session)
+
+    def test_fusion_a_la_connexion(self):
+        user = get_user_model().objects.create_user('client', password='x')
+        autre = creer_produit(self.produit.fournisseur, slug='table')
+        PanierLigne.objects.create(panier=Panier.objects.create(user=user), produit=self.produit, quantite=1)
+        self.client.post(self.url, {'qty': 2})
+        self.client.post(reverse('commandes:add_to_cart', args=[autre.pk]), {'qty': 4})
+        session = self.client.session
+        # Entrées invalides ou produit disparu : ignorées
+        session[panier.SESSION_KEY].update({'999': 1, 'x': 1, str(autre.pk + 1): 'deux'})
+        session.save()
+
+        self.assertTrue(self.client.login(username='client', password='x'))
+        self.assertEqual(
+            dict(PanierLigne.objects.filter(panier__user=user).values_list('produit__slug', 'quantite')),
+            {'chaise': 3, 'table': 4},
+        )
+        self.assertNotIn(panier.SESSION_KEY, self.client.session)
+        # Une nouvelle connexion ne refusionne rien
+        self.client.logout()
+        self.client.login(username='client', password='x')
+        self.assertEqual(PanierLigne.objects.get(produit=self.produit).quantite, 3)
+
+
+class MiddlewaresAsgiTests(TestCase):
+    """Middlewares de l'application en mode asynchrone (chaîne ASGI sans adaptateur synchrone)."""
+
+    def test_chaine_asynchrone(self):
+        async def vue(request):
+            return HttpResponse('ok')
+
+        for classe in (MetriquesMiddleware, ProfilingMiddleware, FournisseurProfileMiddleware, ThrottleMiddleware):
+            middleware = classe(vue)
+            self.assertTrue(iscoroutinefunction(middleware), classe.__name__)
+            self.assertEqual(async_to_sync(middleware)(RequestFactory().get('/')).content, b'ok')
+
+    def test_sql_compte_dans_les_vues_synchrones(self):
+        async def vue(request):
+            await sync_to_async(lambda: list(Produit.objects.all()))()
+            return HttpResponse('ok')
+
+        avant = metriques.SQL_REQUETES._valeurs.get(('',), 0)
+        async_to_sync(MetriquesMiddleware(vue))(RequestFactory().get('/'))
+        self.assertEqual(metriques.SQL_REQUETES._valeurs.get(('',), 0) - avant, 1)
+
+
+class ImportProduitsTests(TestCase):
+    """Import en masse : validation par ligne, slugs générés sans collision, mise à jour des siens seulement."""
+
+    def setUp(self):
+        self.fournisseur = creer_fournisseur()
+        creer_produit(self.fournisseur, slug='chaise', prix='10.00')
+
+    def importer(self, contenu, nom='produits.csv', **kwargs):
+        fichier = SimpleUploadedFile(nom, contenu.encode())
+        return importer_produits(self.fournisseur, fichier, format=detecter_format(nom), **kwargs)
+
+    def test_csv(self):
+        rapport = self.importer(
+            "nom,prix,slug,quantite_minimale,is_active\n"
+            "Table,20,,,\n"
+            "Table,25,,,non\n"
+            "Chaise pliante,\"12,50\",chaise,2,\n"
+            ",5,,,\n"
+            "Lampe,-1,,,\n"
+            "Lampe,1.234,,,\n"
+            "Tabouret,3,,0,\n"
+        )
+        self.assertEqual((rapport.crees, rapport.mis_a_jour, rapport.nb_erreurs), (2, 1, 4))
+        self.assertEqual([n for n, _ in rapport.erreurs], [5, 6, 7, 8])
+        produits = {p.slug: p for p in Produit.objects.all()}
+        self.assertEqual(sorted(produits), ['chaise', 'table', 'table-2'])
+        self.assertEqual((produits['chaise'].nom, produits['chaise'].prix, produits['chaise'].quantite_minimale),
+                         ('Chaise pliante', Decimal('12.50'), 2))
+        self.assertFalse(produits['table-2'].is_active)
+
+    def test_ndjson_par_lots(self):
+        lignes = [json.dumps({'nom': 'Vase', 'prix': i}) for i in range(5)]
+        lignes[2] = '{pas du json'
+        lignes.append('[1, 2]')
+        rapport = self.importer('\n'.join(lignes) + '\n', nom='produits.ndjson', batch_size=2)
+        self.assertEqual((rapport.crees, rapport.nb_erreurs), (4, 2))
+        # Suffixes continus d'un lot à l'autre
+        self.assertEqual(
+            sorted(Produit.objects.filter(nom='Vase').values_list('slug', flat=True)),
+            ['vase', 'vase-2', 'vase-3', 'vase-4'],
+        )
+
+    def test_slugs_existants(self):
+        autre = creer_fournisseur(nom='Autre')
+        creer_produit(autre, slug='bureau')
+        rapport = self.importer("nom,prix,slug\nBureau,10,bureau\nChaise,11,chaise\n", mettre_a_jour=False)
+        self.assertEqual((rapport.crees, rapport.mis_a_jour), (0, 0))
+        self.assertEqual([m for _, m in rapport.erreurs], [
+            "slug « bureau » déjà utilisé par un autre fournisseur", "slug « chaise » déjà existant",
+        ])
+        self.assertEqual(Produit.objects.get(slug='chaise').prix, Decimal('10.00'))
+
+
+class RapportSLATests(TestCase):
+    """Rapport SLA : compteurs groupés, percentiles par rang et export CSV."""
+
+    def setUp(self):
+        cache.clear()
+        fournisseur = creer_fournisseur()
+        self.debut = timezone.now() - timedelta(days=2)
+        # Cinq livraisons moto livrées en 1, 2, 3, 4 et 10 heures, attendues en 3 heures
+        for heures in (1, 2, 3, 4, 10):
+            self.livraison('moto', 'livree', delivered_at=self.debut + timedelta(hours=heures),
+                           date_prevue=self.debut + timedelta(hours=3), fournisseur=fournisseur)
+        self.livraison('voiture', 'retournee')
+        # Hors période
+        self.livraison('moto', 'livree', assigned_at=self.debut - timedelta(days=60))
+
+    def livraison(self, transport, statut, assigned_at=None, fournisseur=None, **kwargs):
+        commande = Commande.objects.create(statut='livree')
+        if fournisseur:
+            CommandeFournisseur.lier(commande, [fournisseur.pk])
+        return Livraison.objects.create(
+            commande=commande, transport=transport, statut=statut, montant=Decimal('1'),
+            assigned_at=assigned_at or self.debut, **kwargs,
+        )
+
+    def test_calcul(self):
+        rapport = calculer_sla(self.debut, timezone.now())
+        global_ = rapport['global']
+        self.assertEqual((global_.total, global_.livrees, global_.retournees, global_.mesurees), (6, 5, 1, 5))
+        self.assertEqual((global_.mediane, global_.p90), (timedelta(hours=3), timedelta(hours=4)))
+        self.assertEqual(global_.taux_a_l_heure, 3 / 5)
+        par_transport = {ligne.cle: ligne for ligne in rapport['par_transport']}
+        self.assertEqual(sorted(par_transport), ['moto', 'voiture'])
+        self.assertEqual(par_transport['moto'].libelle, 'Moto')
+        self.assertEqual(par_transport['voiture'].taux_retour, 1)
+        self.assertIsNone(par_transport['voiture'].mediane)
+        [atelier] = rapport['par_fournisseur']
+        self.assertEqual((atelier.libelle, atelier.total, atelier.p90), ('Atelier', 5, timedelta(hours=4)))
+
+    def test_export_csv(self):
+        self.client.force_login(get_user_model().objects.create_user('staff', password='x', is_staff=True))
+        jour = timezone.localdate(self.debut).isoformat()
+        response = self.client.get(reverse('commandes:rapport-sla'), {'debut': jour, 'format': 'csv'})
+        lignes = response.content.decode().splitlines()
+        self.assertEqual(lignes[1:], [
+            'global,Toutes livraisons,6,5,1,3.0,4.0,60.0,16.7',
+            'transport,Moto,5,5,0,3.0,4.0,60.0,0.0',
+            'transport,Voiture,1,0,1,,,,100.0',
+            'fournisseur,Atelier,5,5,0,3.0,4.0,60.0,0.0',
+        ])
+
+
+class RapportJobsTests(TestCase):
+    """Jobs de rapport : quota par utilisateur, réservation unique, exécution, téléchargement et purge."""
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        reglages = override_settings(MEDIA_ROOT=self.media.name, RAPPORTS_MAX_JOBS_PAR_UTILISATEUR=2)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.staff = get_user_model().objects.create_user('staff', password='x', is_staff=True)
+        commande = Commande.objects.create(statut='livree')
+        LigneCommande.objects.create(
+            commande=commande, produit=creer_produit(creer_fournisseur()), quantite=2, prix_unitaire=Decimal('10.00'),
+        )
+
+    def test_quota(self):
+        jobs.creer_job(self.staff, 'commandes_csv')
+        jobs.creer_job(self.staff, 'commandes_csv')
+        with self.assertRaises(jobs.LimiteJobsAtteinte):
+            jobs.creer_job(self.staff, 'commandes_csv')
+        with self.assertRaises(ValueError):
+            jobs.creer_job(self.staff, 'inconnu')
+
+    def test_creation_par_la_vue(self):
+        url = reverse('commandes:rapport-job-creer')
+        self.client.force_login(get_user_model().objects.create_user('client', password='x'))
+        self.client.post(url, {'type': 'commandes_csv'})
+        self.assertFalse(RapportJob.objects.exists())
+        self.client.force_login(self.staff)
+        response = self.client.post(url, {'type': 'commandes_csv', 'statut': 'livree'})
+        job = RapportJob.objects.get()
+        self.assertRedirects(response, reverse('commandes:rapport-job', args=[job.pk]), fetch_redirect_response=False)
+        self.assertEqual(job.parametres, {'statut': 'livree'})
+
+    def test_execution_et_telechargement(self):
+        job = jobs.creer_job(self.staff, 'commandes_csv')
+        self.assertEqual(jobs.reserver_jobs(5), [job.pk])
+        self.assertEqual(jobs.reserver_jobs(5), [])
+        jobs.executer_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.statut, job.progression), ('termine', 100))
+        self.assertIsNotNone(job.expires_at)
+
+        url = reverse('commandes:rapport-job-telecharger', args=[job.pk])
+        self.client.force_login(get_user_model().objects.create_user('autre', password='x', is_staff=True))
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_login(self.staff)
+        lignes = b''.join(self.client.get(url).streaming_content).decode().splitlines()
+        self.assertEqual(lignes[0].split(','), ENTETE_COMMANDES)
+        self.assertEqual(lignes[1].split(',')[-4:], ['2', '10.00', '20.00', 'livree'])
+
+        chemin = job.fichier.path
+        RapportJob.objects.filter(pk=job.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(jobs.purger_jobs_expires(), 1)
+        self.assertFalse(Path(chemin).exists())
+
+    def test_echec_et_jobs_bloques(self):
+        job = jobs.creer_job(self.staff, 'ventes_fournisseur_csv', {'inattendu': 1})
+        jobs.reserver_jobs(1)
+        with self.assertRaises(TypeError):
+            jobs.executer_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.statut, 'echec')
+        self.assertEqual(list(Path(self.media.name).rglob('*')), [])
+
+        bloque = jobs.creer_job(self.staff, 'commandes_csv')
+        jobs.reserver_jobs(1)
+        self.assertEqual(jobs.liberer_jobs_bloques(timedelta(hours=1)), 0)
+        RapportJob.objects.filter(pk=bloque.pk).update(started_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(jobs.liberer_jobs_bloques(timedelta(hours=1)), 1)
+        bloque.refresh_from_db()
+        self.assertEqual((bloque.statut, bloque.erreur), ('echec', 'Interrompu'))
+
+
+class TransfertNdjsonTests(TestCase):
+    """Export / import NDJSON : aller-retour à l'identique (dates, décimaux, horodatages) et reprise."""
+
+    LABELS = ['auth.user', 'commandes.fournisseur', 'commandes.produit', 'commandes.commande',
+              'commandes.lignecommande', 'commandes.livraison']
+
+    def setUp(self):
+        self.dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dossier.cleanup)
+        produit = creer_produit(creer_fournisseur(), prix='12.34')
+        for quantite in (1, 2, 3):
+            commande = Commande.objects.create(statut='livree')
+            LigneCommande.objects.create(
+                commande=commande, produit=produit, quantite=quantite, prix_unitaire=produit.prix,
+            )
+            Livraison.objects.create(
+                commande=commande, transport='moto', montant=Decimal('4000.50'), adresse_livraison='Rue « A »',
+                delivered_at=timezone.now() - timedelta(days=quantite, microseconds=quantite),
+            )
+        self.modeles = transfert.ordre_dependances(transfert.resoudre_modeles(self.LABELS))
+        transfert.exporter(self.dossier.name, self.LABELS, batch_size=2, log=lambda message: None)
+        self.avant = self.contenu()
+        get_user_model().objects.all().delete()
+        Commande.objects.all().delete()
+        self.assertEqual(sum(map(len, self.contenu().values())), 0)
+
+    def contenu(self):
+        return {m: list(m._base_manager.order_by('pk').values_list()) for m in self.modeles}
+
+    def test_aller_retour(self):
+        transfert.importer(self.dossier.name, batch_size=2, log=lambda message: None)
+        self.assertEqual(self.contenu(), self.avant)
+        self.assertFalse(Path(self.dossier.name, transfert.REPRISE).exists())
+
+    def test_reprise(self):
+        original = transfert.importer_modele
+
+        def interrompu(model, *args, **kwargs):
+            lignes = original(model, *args, **kwargs)
+            if model is Livraison:
+                # Dernier lot validé, mais l'arrêt survient avant l'écriture de la reprise
+                raise KeyboardInterrupt
+            return lignes
+
+        with mock.patch.object(transfert, 'importer_modele', interrompu), self.assertRaises(KeyboardInterrupt):
+            transfert.importer(self.dossier.name, log=lambda message: None)
+        with self.assertRaises(ValueError):
+            transfert.importer(self.dossier.name, log=lambda message: None)
+        journal = []
+        transfert.importer(self.dossier.name, reprendre=True, log=journal.append)
+        self.assertEqual(journal[0], 'auth.User : déjà importé')
+        self.assertEqual(self.contenu(), self.avant)
+
+
+class RecapitulatifsTests(TestCase):
+    """Récapitulatifs fournisseurs : regroupement par fournisseur, intervalle, préférences et reprise après échec."""
+
+    def setUp(self):
+        self.atelier = creer_fournisseur()
+        self.lent = creer_fournisseur(nom='Lent')
+        PreferenceNotification.objects.create(fournisseur=self.lent, intervalle_minutes=60, email='ventes@lent.fr')
+        muet = creer_fournisseur(nom='Muet')
+        PreferenceNotification.objects.create(fournisseur=muet, recapitulatif=False)
+        chaise, table = creer_produit(self.atelier), creer_produit(self.atelier, slug='table', prix='25.50')
+        lampe, vase = creer_produit(self.lent, slug='lampe'), creer_produit(muet, slug='vase')
+        paniers = [[(chaise, 2), (table, 1), (lampe, 1)], [(chaise, 2), (vase, 3)]]
+        for contenu in paniers:
+            items = [{'produit': p, 'qty': q, 'subtotal': p.prix * q} for p, q in contenu]
+            commande = Commande.objects.create()
+            enregistrer_nouvelle_commande(commande.pk, parts_fournisseurs(items))
+            # Rejoué (double commit) : ignoré
+            enregistrer_nouvelle_commande(commande.pk, parts_fournisseurs(items))
+        self.maintenant = timezone.now()
+
+    def test_une_notification_par_fournisseur_et_commande(self):
+        self.assertEqual(NotificationFournisseur.objects.count(), 4)
+        self.assertEqual(notifications.non_lues(self.atelier.pk), 2)
+        notif = NotificationFournisseur.objects.get(fournisseur=self.atelier, nb_articles=3)
+        self.assertEqual(notif.montant, Decimal('45.50'))
+
+    def test_envoi_groupe(self):
+        self.assertEqual(notifications.envoyer_recapitulatifs(self.maintenant), (0, 1, 0))
+        self.assertEqual(mail.outbox, [])
+        apres = self.maintenant + timedelta(minutes=20)
+        self.assertEqual(notifications.envoyer_recapitulatifs(apres, dry_run=True), (1, 0, 0))
+        self.assertEqual(notifications.envoyer_recapitulatifs(apres), (1, 0, 0))
+        [message] = mail.outbox
+        self.assertEqual((message.to, message.subject), (['atelier@exemple.fr'], '2 nouvelle(s) commande(s)'))
+        self.assertIn('- articles : 5', message.body)
+        self.assertIn('- montant : 65.50', message.body)
+        self.assertEqual(notifications.envoyer_recapitulatifs(apres), (0, 0, 0))
+
+        self.assertEqual(notifications.envoyer_recapitulatifs(self.maintenant + timedelta(minutes=61)), (1, 0, 0))
+        self.assertEqual(mail.outbox[1].to, ['ventes@lent.fr'])
+        self.assertFalse(NotificationFournisseur.objects.filter(envoyee_at__isnull=True).exists())
+
+    def test_echec_laisse_en_attente(self):
+        apres = self.maintenant + timedelta(hours=2)
+        with mock.patch('django.core.mail.EmailMessage.send', side_effect=OSError), self.assertLogs('commandes'):
+            self.assertEqual(notifications.envoyer_recapitulatifs(apres), (0, 1, 2))
+        self.assertEqual(NotificationFournisseur.objects.filter(envoyee_at__isnull=True).count(), 3)
+        self.assertEqual(notifications.envoyer_recapitulatifs(apres), (2, 0, 0))
+
+    def test_marquees_lues_sur_action_explicite(self):
+        self.client.force_login(self.atelier.user)
+        url = reverse('commandes:notifications-lues')
+        with mock.patch.object(CommandesFournisseurListView, 'render_to_response', return_value=HttpResponse()):
+            self.assertEqual(self.client.get(reverse('commandes:commandes-fournisseur')).status_code, 200)
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.assertEqual(notifications.non_lues(self.atelier.pk), 2)
+        response = self.client.post(url)
+        self.assertRedirects(response, reverse('commandes:commandes-fournisseur'), fetch_redirect_response=False)
+        self.assertEqual(notifications.non_lues(self.atelier.pk), 0)
+        self.assertEqual(notifications.non_lues(self.lent.pk), 1)
+
+
+class _Recepteur(BaseHTTPRequestHandler):
+    """Point de réception de test : mémorise les POST et répond `serveur.code`."""
+
+    def do_POST(self):
+        corps = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.recus.append((dict(self.headers), corps))
+        self.send_response(self.server.code)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(WEBHOOKS_TIMEOUT=5, WEBHOOKS_MAX_TENTATIVES=3, WEBHOOKS_DELAI_BASE=30, WEBHOOKS_LOT_MAX=100)
+class WebhooksTests(TestCase):
+    """Webhooks sortants vers un serveur HTTP local (les threads d'envoi ne touchent pas la base)."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.serveur = ThreadingHTTPServer(('127.0.0.1', 0), _Recepteur)
+        threading.Thread(target=cls.serveur.serve_forever, daemon=True).start()
+        cls.url = f'http://127.0.0.1:{cls.serveur.server_port}/hook'
+        cls.pool = ThreadPoolExecutor(2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.shutdown()
+        cls.serveur.shutdown()
+        cls.serveur.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.serveur.recus = []
+        self.serveur.code = 200
+        self.abonnement = AbonnementWebhook.objects.create(nom='Partenaire', url=self.url)
+        self.commande = Commande.objects.create()
+        self.livraison = Livraison.objects.create(commande=self.commande)
+
+    def _changements(self, n=1):
+        # Événements plus vieux que JOURNAL_DELAI_COMMIT : planifiables aussitôt
+        horodatage = timezone.now() - timedelta(minutes=1)
+        for _ in range(n):
+            EvenementStatut.enregistrer(self.commande, self.livraison, horodatage=horodatage)
+
+    def _rendre_dus(self):
+        EnvoiWebhook.objects.filter(statut='en_attente').update(prochain_essai=timezone.now())
+
+    def test_lot_signe(self):
+        self._changements()
+        self.assertEqual(webhooks.planifier(), 1)
+        self.assertEqual(webhooks.traiter(self.pool, 4), {'envoye': 1})
+
+        [(entetes, corps)] = self.serveur.recus
+        self.assertTrue(webhooks.verifier_signature(self.abonnement.secret, entetes[webhooks.ENTETE_SIGNATURE], corps))
+        self.assertFalse(webhooks.verifier_signature('autre', entetes[webhooks.ENTETE_SIGNATURE], corps))
+        evenements = json.loads(corps)['evenements']
+        self.assertEqual([e['entite'] for e in evenements], ['commande', 'livraison'])
+        self.assertEqual({e['commande_id'] for e in evenements}, {self.commande.pk})
+        envoi = EnvoiWebhook.objects.get()
+        self.assertEqual((envoi.statut, envoi.code_http, envoi.tentatives), ('envoye', 200, 1))
+        self.assertEqual(entetes[webhooks.ENTETE_ID], str(envoi.pk))
+        # Curseur avancé : rien de plus à planifier
+        self.assertEqual(webhooks.planifier(), 0)
+
+    def test_decoupage_et_filtre_entite(self):
+        livraisons = AbonnementWebhook.objects.create(
+            nom='Transporteur', url=self.url, entite=EvenementStatut.ENTITE_LIVRAISON,
+        )
+        self._changements(3)
+        self.assertEqual(webhooks.planifier(lot_max=2), 5)
+        self.assertEqual(
+            list(self.abonnement.envois.order_by('pk').values_list('nb_evenements', flat=True)), [2, 2, 2],
+        )
+        self.assertEqual(
+            list(livraisons.envois.order_by('pk').values_list('nb_evenements', flat=True)), [2, 1],
+        )
+        dernier = EvenementStatut.objects.latest('pk').pk
+        self.assertEqual(AbonnementWebhook.objects.get(pk=livraisons.pk).curseur, dernier)
+
+    def test_evenements_recents_differes(self):
+        self._changements()
+        stable = EvenementStatut.objects.latest('pk').pk
+        # Événement récent : un id inférieur peut encore être validé par une autre transaction
+        EvenementStatut.enregistrer(self.commande)
+        self.assertEqual(webhooks.planifier(), 1)
+        self.assertEqual(AbonnementWebhook.objects.get(pk=self.abonnement.pk).curseur, stable)
+        with override_settings(JOURNAL_DELAI_COMMIT=0):
+            self.assertEqual(webhooks.planifier(), 1)
+        self.assertEqual(EnvoiWebhook.objects.latest('pk').nb_evenements, 1)
+
+    def test_reprise_puis_abandon(self):
+        self.serveur.code = 500
+        self._changements()
+        webhooks.planifier()
+        avant = timezone.now()
+        self.assertEqual(webhooks.traiter(self.pool, 4), {'en_attente': 1})
+        envoi = EnvoiWebhook.objects.get()
+        self.assertEqual((envoi.tentatives, envoi.code_http), (1, 500))
+        self.assertGreaterEqual(envoi.prochain_essai, avant + timedelta(seconds=24))
+        # Pas encore dû
+        self.assertEqual(webhooks.traiter(self.pool, 4), {})
+
+        self._rendre_dus()
+        webhooks.traiter(self.pool, 4)
+        self.assertGreaterEqual(EnvoiWebhook.objects.get().prochain_essai, timezone.now() + timedelta(seconds=48))
+        self._rendre_dus()
+        self.assertEqual(webhooks.traiter(self.pool, 4), {'mort': 1})
+        self.assertEqual(len(self.serveur.recus), 3)
+
+        self.assertEqual(webhooks.renvoyer(EnvoiWebhook.objects.all()), 1)
+        self.serveur.code = 204
+        self.assertEqual(webhooks.traiter(self.pool, 4), {'envoye': 1})
+
+    def test_ordre_par_abonnement(self):
+        self._changements()
+        webhooks.planifier()
+        self._changements()
+        webhooks.planifier()
+        premier, second = EnvoiWebhook.objects.order_by('pk')
+        # Le lot suivant attend que le premier soit envoyé, même s'il est dû
+        EnvoiWebhook.objects.filter(pk=premier.pk).update(prochain_essai=timezone.now() + timedelta(hours=1))
+        self.assertEqual(webhooks.reserver_envois(10), [])
+
+        EnvoiWebhook.objects.filter(pk=premier.pk).update(prochain_essai=timezone.now())
+        self.assertEqual(webhooks.reserver_envois(10), [premier.pk])
+        EnvoiWebhook.objects.filter(pk=premier.pk).update(statut='envoye')
+        self.assertEqual(webhooks.reserver_envois(10), [second.pk])
+
+    def test_serveur_injoignable(self):
+        self.abonnement.url = 'http://127.0.0.1:9/hook'
+        self.abonnement.save()
+        self._changements()
+        webhooks.planifier()
+        self.assertEqual(webhooks.traiter(self.pool, 4), {'en_attente': 1})
+        envoi = EnvoiWebhook.objects.get()
+        self.assertIsNone(envoi.code_http)
+        self.assertTrue(envoi.erreur)
@@ -0,0 +1,171 @@
+"""Limitation de débit (throttling) par seaux de jetons stockés dans le cache.
+
+Un seau contient au plus `capacite` jetons, par IP et/ou par utilisateur, et
+se remplit en continu au débit capacite / période. Chaque requête prend un
+jeton ; sans jeton, elle est refusée avec le délai avant le prochain. L'état
+d'un seau (jetons restants, horodatage du dernier calcul) est mis à jour de
+façon atomique :
+  - avec Redis, par un script Lua (un seul aller-retour) ;
+  - avec les autres caches, sous un verrou posé par cache.add (l'ajout est
+    atomique), relâché aussitôt ; il expire seul si le processus s'arrête.
+Contrairement à un compteur par fenêtre fixe, un client ne peut pas passer
+deux fois la capacité de part et d'autre d'un changement de fenêtre.
+
+Configuration (settings) :
+    THROTTLE_RATES = {
+        'add_to_cart': {'ip': '60/min', 'user': '30/min'},
+        'signup': {'ip': '10/h', 'methodes': ['POST']},
+    }
+Les clés sont des noms d'URL, avec ou sans espace de noms ('commandes:checkout').
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.http import HttpResponse
+
+UNITES = {
+    's': 1, 'sec': 1, 'seconde': 1,
+    'm': 60, 'min': 60, 'minute': 60,
+    'h': 3600, 'heure': 3600, 'hour': 3600,
+    'j': 86400, 'jour': 86400, 'd': 86400, 'day': 86400,
+}
+PORTEES = ('ip', 'user')
+# Verrou des caches sans script : durée de vie (s) et tentatives espacées d'1 ms
+DUREE_VERROU = 1
+ESSAIS_VERROU = 20
+
+# KEYS[1] : seau ; ARGV : capacité, période, maintenant (s), durée de vie (s).
+# Retourne l'attente en secondes (0 : jeton pris), en texte pour garder les décimales.
+SCRIPT_REDIS = """
+local capacite, periode, maintenant = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local etat = redis.call('HMGET', KEYS[1], 'jetons', 'horodatage')
+local jetons, horodatage = tonumber(etat[1]), tonumber(etat[2])
+if jetons == nil then
+    jetons, horodatage = capacite, maintenant
+end
+local debit = capacite / periode
+jetons = math.min(capacite, jetons + math.max(0, maintenant - horodatage) * debit)
+local attente = 0
+if jetons >= 1 then
+    jetons = jetons - 1
+elseif debit > 0 then
+    attente = (1 - jetons) / debit
+else
+    attente = periode
+end
+redis.call('HSET', KEYS[1], 'jetons', tostring(jetons), 'horodatage', tostring(maintenant))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[4]))
+return tostring(attente)
+"""
+_script_redis = None
+
+
+def parser_taux(taux):
+    """'30/min' -> (30, 60)."""
+    nombre, _, unite = taux.partition('/')
+    return int(nombre), UNITES[unite.strip().lower()]
+
+
+def charger_regles(config=None):
+    """THROTTLE_RATES -> {nom d'URL: (méthodes ou None, [(portée, capacité, période), ...])}."""
+    if config is None:
+        config = getattr(settings, 'THROTTLE_RATES', {})
+    regles = {}
+    for nom, options in config.items():
+        seaux = [(portee, *parser_taux(options[portee])) for portee in PORTEES if options.get(portee)]
+        methodes = options.get('methodes')
+        regles[nom] = (frozenset(m.upper() for m in methodes) if methodes else None, seaux)
+    return regles
+
+
+def cache_throttle():
+    return caches[getattr(settings, 'THROTTLE_CACHE', 'default')]
+
+
+def remplir(etat, capacite, periode, maintenant):
+    """Prend un jeton dans le seau `etat` (jetons, horodatage) ou None (seau plein).
+
+    Retourne (nouvel état, attente en secondes ; 0 si le jeton a été pris).
+    """
+    jetons, horodatage = etat if etat is not None else (capacite, maintenant)
+    debit = capacite / periode
+    jetons = min(capacite, jetons + max(0.0, maintenant - horodatage) * debit)
+    if jetons >= 1:
+        return (jetons - 1, maintenant), 0
+    return (jetons, maintenant), (1 - jetons) / debit if debit else periode
+
+
+def _consommer_redis(cache, cle, capacite, periode, maintenant, duree):
+    global _script_redis
+    cle = cache.make_and_validate_key(cle)
+    client = cache._cache.get_client(cle, write=True)
+    if _script_redis is None:
+        _script_redis = client.register_script(SCRIPT_REDIS)
+    return float(_script_redis(keys=[cle], args=[capacite, periode, maintenant, duree], client=client))
+
+
+def _consommer_verrou(cache, cle, capacite, periode, maintenant, duree):
+    verrou = f'{cle}:verrou'
+    for _ in range(ESSAIS_VERROU):
+        if cache.add(verrou, 1, DUREE_VERROU):
+            try:
+                etat, attente = remplir(cache.get(cle), capacite, periode, maintenant)
+                cache.set(cle, etat, duree)
+                return attente
+            finally:
+                cache.delete(verrou)
+        time.sleep(0.001)
+    # Seau disputé à ce point : seul un client qui martèle la même clé en arrive là
+    return 1
+
+
+def consommer(cache, cle, capacite, periode, maintenant=None):
+    """Consomme un jeton ; retourne 0 si accepté, sinon le nombre de secondes avant le prochain jeton."""
+    if maintenant is None:
+        maintenant = time.time()
+    # Un seau inutilisé pendant une période est plein : son état peut expirer
+    duree = math.ceil(periode) + 1
+    if isinstance(cache, RedisCache):
+        attente = _consommer_redis(cache, cle, capacite, periode, maintenant, duree)
+    else:
+        attente = _consommer_verrou(cache, cle, capacite, periode, maintenant, duree)
+    return max(1, math.ceil(attente)) if attente else 0
+
+
+def adresse_ip(request):
+    entete = getattr(settings, 'THROTTLE_IP_HEADER', None)
+    if entete and request.META.get(entete):
+        # X-Forwarded-For : la première adresse est celle du client
+        return request.META[entete].split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def verifier(request, nom, seaux, cache):
+    """Retourne 0 si la requête est acceptée, sinon le délai d'attente en secondes.
+
+    Le seau par IP est vérifié en premier : une requête rejetée ne charge pas la session.
+    """
+    for portee, capacite, periode in seaux:
+        if portee == 'ip':
+            ident = adresse_ip(request)
+        else:
+            user = getattr(request, 'user', None)
+            if user is None or not user.is_authenticated:
+                continue
+            ident = user.pk
+        attente = consommer(cache, f'throttle:{nom}:{portee}:{ident}', capacite, periode)
+        if attente:
+            return attente
+    return 0
+
+
+def reponse_trop_de_requetes(attente):
+    return HttpResponse(
+        "Trop de requêtes, réessayez plus tard.",
+        status=429,
+        content_type='text/plain; charset=utf-8',
+        headers={'Retry-After': str(attente)},
+    )
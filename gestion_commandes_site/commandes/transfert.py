@@ -0,0 +1,232 @@
+"""Export / import complet des données en NDJSON compressé (gzip).
+
+Alternative à dumpdata / loaddata pour les gros volumes : chaque modèle est
+lu par pages de clé primaire (keyset) et écrit ligne à ligne, la mémoire
+reste constante. À l'import, les lignes sont insérées par bulk_create dans
+une transaction par lot, dans l'ordre des dépendances (clés étrangères), et
+un fichier de reprise permet de repartir du dernier lot validé.
+
+Format d'un dossier d'export :
+  manifest.json                      modèles (ordre d'import), colonnes, nombre de lignes
+  <app>.<modele>.ndjson.gz           une ligne JSON (liste de valeurs) par objet
+Les relations plusieurs-à-plusieurs ne sont pas exportées.
+"""
+import datetime
+import gzip
+import json
+import os
+import uuid
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.apps import apps
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils.duration import duration_iso_string
+
+VERSION = 1
+MANIFEST = 'manifest.json'
+REPRISE = 'reprise.json'
+# Modèles exportés par défaut : les utilisateurs et l'application, sans les jobs de rapport (temporaires)
+MODELES_DEFAUT = ['auth.user', 'commandes']
+EXCLUS_DEFAUT = {'commandes.rapportjob'}
+
+
+def _json_defaut(valeur):
+    if isinstance(valeur, (datetime.datetime, datetime.date, datetime.time)):
+        # isoformat complet : microsecondes et fuseau conservés
+        return valeur.isoformat()
+    if isinstance(valeur, datetime.timedelta):
+        return duration_iso_string(valeur)
+    if isinstance(valeur, (Decimal, uuid.UUID)):
+        return str(valeur)
+    raise TypeError(f"Valeur non sérialisable : {type(valeur).__name__}")
+
+
+def resoudre_modeles(labels=None):
+    """Résout 'app' ou 'app.modele' en liste de modèles concrets."""
+    modeles = []
+    for label in labels or MODELES_DEFAUT:
+        if '.' in label:
+            candidats = [apps.get_model(label)]
+        else:
+            candidats = [
+                m for m in apps.get_app_config(label).get_models()
+                if labels or m._meta.label_lower not in EXCLUS_DEFAUT
+            ]
+        for model in candidats:
+            if not model._meta.proxy and model not in modeles:
+                modeles.append(model)
+    return modeles
+
+
+def _dependances(model):
+    return {
+        f.related_model for f in model._meta.concrete_fields
+        if f.is_relation and f.related_model is not model
+    }
+
+
+def ordre_dependances(modeles):
+    """Tri topologique : un modèle vient après les modèles qu'il référence (parmi ceux exportés)."""
+    restants, ordre = list(modeles), []
+    while restants:
+        prets = [m for m in restants if not (_dependances(m) & set(restants))]
+        if not prets:
+            raise ValueError("Dépendances circulaires entre : " + ', '.join(m._meta.label for m in restants))
+        ordre += prets
+        restants = [m for m in restants if m not in prets]
+    return ordre
+
+
+def _nom_fichier(model):
+    return f'{model._meta.label_lower}.ndjson.gz'
+
+
+# === Export ===
+
+def exporter_modele(model, chemin, batch_size=5000):
+    """Écrit toutes les lignes de `model` par ordre de clé primaire ; retourne le nombre de lignes."""
+    champs = [f.attname for f in model._meta.concrete_fields]
+    pk = model._meta.pk.attname
+    qs = model._base_manager.order_by(pk).values_list(*champs)
+    index_pk = champs.index(pk)
+    total, dernier = 0, None
+    with gzip.open(chemin, 'wt', encoding='utf-8', compresslevel=5) as f:
+        while True:
+            page = qs.filter(**{f'{pk}__gt': dernier}) if dernier is not None else qs
+            lignes = list(page[:batch_size])
+            if not lignes:
+                break
+            f.writelines(
+                json.dumps(ligne, default=_json_defaut, ensure_ascii=False, separators=(',', ':')) + '\n'
+                for ligne in lignes
+            )
+            total += len(lignes)
+            dernier = lignes[-1][index_pk]
+    return total
+
+
+def exporter(dossier, labels=None, batch_size=5000, log=print):
+    os.makedirs(dossier, exist_ok=True)
+    manifest = {'version': VERSION, 'modeles': []}
+    for model in ordre_dependances(resoudre_modeles(labels)):
+        fichier = _nom_fichier(model)
+        lignes = exporter_modele(model, os.path.join(dossier, fichier), batch_size)
+        manifest['modeles'].append({
+            'label': model._meta.label_lower,
+            'fichier': fichier,
+            'champs': [f.attname for f in model._meta.concrete_fields],
+            'lignes': lignes,
+        })
+        log(f"{model._meta.label} : {lignes} ligne(s)")
+    with open(os.path.join(dossier, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+# === Import ===
+
+@contextmanager
+def _horodatages_conserves(model):
+    """Désactive auto_now / auto_now_add le temps de l'import : les dates exportées sont conservées."""
+    champs = [f for f in model._meta.concrete_fields if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)]
+    etats = [(f, f.auto_now, f.auto_now_add) for f in champs]
+    for f in champs:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in etats:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+def _lire_reprise(dossier):
+    chemin = os.path.join(dossier, REPRISE)
+    if not os.path.exists(chemin):
+        return None
+    with open(chemin, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _ecrire_reprise(dossier, etat):
+    chemin = os.path.join(dossier, REPRISE)
+    with open(chemin + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(etat, f)
+    os.replace(chemin + '.tmp', chemin)
+
+
+def importer_modele(model, chemin, colonnes, dossier, etat, batch_size=5000, rejouer=False):
+    """Insère les lignes du fichier par lots, en sautant celles déjà validées (reprise).
+
+    `rejouer` : le premier lot peut avoir été validé avant l'interruption sans
+    que le fichier de reprise le sache ; il est alors inséré en ignorant les conflits.
+    """
+    label = model._meta.label_lower
+    deja = etat['lignes'] if etat.get('modele') == label else 0
+    par_attname = {f.attname: f for f in model._meta.concrete_fields}
+    manquants = [c for c in colonnes if c not in par_attname]
+    if manquants:
+        raise ValueError(f"{model._meta.label} : colonnes inconnues {manquants}")
+    champs = [par_attname[c] for c in colonnes]
+
+    def inserer(objets, ignorer_conflits):
+        with transaction.atomic():
+            model._base_manager.bulk_create(objets, batch_size=batch_size, ignore_conflicts=ignorer_conflits)
+
+    faites = 0
+    ignorer_conflits = rejouer
+    with gzip.open(chemin, 'rt', encoding='utf-8') as f, _horodatages_conserves(model):
+        lot = []
+        for numero, ligne in enumerate(f):
+            if numero < deja:
+                continue
+            valeurs = json.loads(ligne)
+            lot.append(model(**{champ.attname: champ.to_python(v) for champ, v in zip(champs, valeurs)}))
+            if len(lot) >= batch_size:
+                inserer(lot, ignorer_conflits)
+                ignorer_conflits = False
+                faites += len(lot)
+                lot = []
+                _ecrire_reprise(dossier, {**etat, 'modele': label, 'lignes': deja + faites})
+        if lot:
+            inserer(lot, ignorer_conflits)
+            faites += len(lot)
+    return faites
+
+
+def importer(dossier, batch_size=5000, reprendre=False, log=print):
+    with open(os.path.join(dossier, MANIFEST), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != VERSION:
+        raise ValueError(f"Version de manifest non supportée : {manifest.get('version')}")
+
+    etat = _lire_reprise(dossier)
+    if etat is not None and not reprendre:
+        raise ValueError(f"Import interrompu détecté ({REPRISE}) : relancer avec la reprise ou supprimer le fichier.")
+    rejouer = etat is not None
+    etat = etat or {'termines': []}
+    # Écrit dès le départ : une interruption avant le premier lot est aussi reprise
+    _ecrire_reprise(dossier, etat)
+
+    modeles = []
+    for entree in manifest['modeles']:
+        model = apps.get_model(entree['label'])
+        modeles.append(model)
+        if entree['label'] in etat['termines']:
+            log(f"{model._meta.label} : déjà importé")
+            continue
+        lignes = importer_modele(
+            model, os.path.join(dossier, entree['fichier']), entree['champs'], dossier, etat, batch_size, rejouer,
+        )
+        rejouer = False
+        etat = {'termines': etat['termines'] + [entree['label']]}
+        _ecrire_reprise(dossier, etat)
+        log(f"{model._meta.label} : {lignes} ligne(s) importée(s)")
+
+    # Les clés primaires ont été insérées explicitement : recaler les séquences (PostgreSQL, Oracle)
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), modeles):
+            cursor.execute(sql)
+    if os.path.exists(os.path.join(dossier, REPRISE)):
+        os.remove(os.path.join(dossier, REPRISE))
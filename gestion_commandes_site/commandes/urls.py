@@ -26,19 +26,35 @@ urlpatterns = [
     path('commandes/json/', views.commandes_json, name='commandes-json'),
     path('commandes/<int:pk>/', views.commande_detail, name='commande-detail'),
     path('commandes/<int:commande_pk>/livraison/', views.livraison_update, name='livraison-update'),
+    path('commandes/<int:pk>/timeline/', views.commande_timeline, name='commande-timeline'),
+    path('commandes/<int:pk>/position/', views.position_livraison, name='commande-position'),
+    path('evenements/transitions/', views.transitions_statut, name='transitions-statut'),
+    path('rapports/sla/', views.rapport_sla, name='rapport-sla'),
+    path('rapports/jobs/', views.rapport_job_creer, name='rapport-job-creer'),
+    path('rapports/jobs/<int:pk>/', views.rapport_job_detail, name='rapport-job'),
+    path('rapports/jobs/<int:pk>/statut/', views.rapport_job_statut, name='rapport-job-statut'),
+    path('rapports/jobs/<int:pk>/telecharger/', views.rapport_job_telecharger, name='rapport-job-telecharger'),
 
     # Fournisseurs (regroupés sous /fournisseur/ pour éviter collisions)
     path('fournisseur/devenir/', views.DevenirFournisseurView.as_view(), name='devenir'),
     path('fournisseur/attente/', views.AttenteApprobationView.as_view(), name='attente_approbation'),
     path('fournisseur/dashboard/', views.FournisseurDashboardView.as_view(), name='dashboard'),
     path('fournisseur/produit/add/', views.ProduitCreateView.as_view(), name='produit_add'),
+    path('fournisseur/produit/import/', views.ProduitImportView.as_view(), name='produit_import'),
     path('fournisseur/produit/<int:pk>/edit/', views.ProduitUpdateView.as_view(), name='produit_edit'),
     path('fournisseur/produit/<int:pk>/delete/', views.ProduitDeleteView.as_view(), name='produit_delete'),
     path('fournisseur/ventes/', views.VentesFournisseurView.as_view(), name='ventes'),
     path('fournisseur/commandes/', views.CommandesFournisseurListView.as_view(), name='commandes-fournisseur'),
     path('fournisseur/livraisons/', views.LivraisonFournisseurListView.as_view(), name='livraisons-fournisseur'),
     path('fournisseur/commande/<int:pk>/marquer-prete/', views.MarquerPreteView.as_view(), name='marquer_prete'),
+    path('fournisseur/notifications/', views.PreferencesNotificationView.as_view(), name='notifications-fournisseur'),
+    path('fournisseur/notifications/lues/', views.MarquerNotificationsLuesView.as_view(), name='notifications-lues'),
     path("livraisons/", views.dashboard_livraison, name="dashboard_livraison"),
+    path('livraisons/flux/', views.flux_statuts, name='flux-statuts'),
+    path('livraison/<int:pk>/positions/', views.ping_positions, name='livraison-positions'),
     path("livraison/<int:pk>/<str:statut>/", views.modifier_statut_livraison, name="modifier_statut_livraison"),
+
+    # Sans barre finale : chemin par défaut des scrapes Prometheus
+    path('metrics', views.metrics, name='metrics'),
     
 ]
\ No newline at end of file
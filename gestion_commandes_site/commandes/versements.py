@@ -0,0 +1,185 @@
+"""Relevés de versement des fournisseurs (ventes brutes, commission, net).
+
+Les ventes d'une période sont les lignes des commandes livrées pendant
+cette période (date `delivered_at` de la livraison), commandes courantes et
+archivées. Elles sont agrégées par fournisseur en une requête groupée par
+table ; les montants sont sommés en centimes entiers pour rester exacts sur
+tous les moteurs (SQLite stocke les décimaux en flottants). Commission et net
+sont ensuite calculés en Decimal, arrondis au centime.
+
+Seul le prix figé sur la ligne (`prix_unitaire`) fait foi : une période
+contenant des lignes sans prix (antérieures au champ) est refusée plutôt que
+versée au prix courant du produit.
+"""
+import csv
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import BigIntegerField, Count, F, Q, Sum
+from django.db.models.functions import Cast, Round
+from django.utils import timezone
+
+from .models import Fournisseur, LigneCommande, LigneCommandeArchive, ReleveVersement
+
+CENTIME = Decimal('0.01')
+# Fournisseurs lus / relevés écrits par requête
+BATCH_SIZE = 1000
+
+ENTETE_RELEVES = [
+    'fournisseur_id', 'fournisseur', 'debut', 'fin', 'ventes_brutes', 'taux_commission',
+    'commission', 'net', 'compte_bancaire', 'nb_commandes', 'nb_lignes',
+]
+
+
+def _bornes(debut, fin):
+    """Jours `debut` à `fin` inclus -> [debut 00:00, lendemain de fin 00:00[ (heure locale)."""
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(debut, time.min), tz),
+        timezone.make_aware(datetime.combine(fin + timedelta(days=1), time.min), tz),
+    )
+
+
+def _lignes_livrees(modele, debut, fin):
+    return modele.objects.filter(
+        commande__livraison__statut='livree',
+        commande__livraison__delivered_at__gte=debut,
+        commande__livraison__delivered_at__lt=fin,
+        produit__isnull=False,
+    )
+
+
+def lignes_sans_prix(debut, fin):
+    """Nombre de lignes livrées sur les jours `debut` à `fin` inclus dont le prix payé est inconnu."""
+    d, f = _bornes(debut, fin)
+    return sum(
+        _lignes_livrees(modele, d, f).filter(prix_unitaire__isnull=True).count()
+        for modele in (LigneCommande, LigneCommandeArchive)
+    )
+
+
+def _agreger(modele, debut, fin):
+    """{fournisseur_id: (centimes, nb_lignes, nb_commandes)} pour une table de lignes."""
+    centimes = Cast(Round(F('prix_unitaire') * 100), BigIntegerField())
+    qs = (
+        _lignes_livrees(modele, debut, fin)
+        .values('produit__fournisseur_id')
+        .annotate(
+            centimes=Sum(F('quantite') * centimes),
+            lignes=Count('id'),
+            commandes=Count('commande_id', distinct=True),
+        )
+        .order_by()
+    )
+    return {
+        r['produit__fournisseur_id']: (r['centimes'] or 0, r['lignes'], r['commandes'])
+        for r in qs
+    }
+
+
+def ventes_par_fournisseur(debut, fin):
+    """{fournisseur_id: (ventes_brutes, nb_lignes, nb_commandes)} sur les jours `debut` à `fin` inclus.
+
+    Une commande est entièrement courante ou entièrement archivée : les
+    nombres de commandes des deux tables s'additionnent sans doublon.
+    """
+    d, f = _bornes(debut, fin)
+    totaux = defaultdict(lambda: [0, 0, 0])
+    for modele in (LigneCommande, LigneCommandeArchive):
+        for fournisseur_id, valeurs in _agreger(modele, d, f).items():
+            cumul = totaux[fournisseur_id]
+            for i, v in enumerate(valeurs):
+                cumul[i] += v
+    return {
+        fournisseur_id: ((Decimal(centimes) / 100).quantize(CENTIME), lignes, commandes)
+        for fournisseur_id, (centimes, lignes, commandes) in totaux.items()
+    }
+
+
+def commission(brut, taux):
+    """Commission (taux en %) arrondie au centime, au demi supérieur."""
+    return (brut * taux / 100).quantize(CENTIME, rounding=ROUND_HALF_UP)
+
+
+def _reglages(ids):
+    """{fournisseur_id: (taux_commission, compte_bancaire)}, lus par lots."""
+    reglages = {}
+    for i in range(0, len(ids), BATCH_SIZE):
+        reglages.update(
+            (pk, (taux, compte))
+            for pk, taux, compte in Fournisseur.objects
+            .filter(pk__in=ids[i:i + BATCH_SIZE])
+            .values_list('pk', 'commission_rate', 'bank_account')
+        )
+    return reglages
+
+
+def calculer_releves(debut, fin):
+    """Crée les relevés de la période pour les fournisseurs ayant des ventes livrées.
+
+    Idempotent : les fournisseurs ayant déjà un relevé pour exactement cette
+    période sont ignorés. Une période qui chevauche d'autres relevés est
+    refusée (une vente ne doit être versée qu'une fois), de même qu'une
+    période contenant des lignes sans prix. Retourne la liste des relevés créés.
+    """
+    if fin < debut:
+        raise ValueError("La fin de période précède son début.")
+    sans_prix = lignes_sans_prix(debut, fin)
+    if sans_prix:
+        raise ValueError(
+            f"{sans_prix} ligne(s) livrée(s) du {debut} au {fin} sans prix unitaire : "
+            "renseigner le prix payé avant de calculer les relevés."
+        )
+    ventes = ventes_par_fournisseur(debut, fin)
+
+    with transaction.atomic():
+        chevauchement = ReleveVersement.objects.filter(debut__lte=fin, fin__gte=debut).exclude(debut=debut, fin=fin)
+        if chevauchement.exists():
+            raise ValueError(f"La période {debut} - {fin} chevauche des relevés existants.")
+        deja = set(
+            ReleveVersement.objects.filter(debut=debut, fin=fin).values_list('fournisseur_id', flat=True)
+        )
+        a_creer = sorted(pk for pk in ventes if pk not in deja)
+        reglages = _reglages(a_creer)
+
+        releves = []
+        for pk in a_creer:
+            brut, lignes, commandes = ventes[pk]
+            taux, compte = reglages[pk]
+            part = commission(brut, taux)
+            releves.append(ReleveVersement(
+                fournisseur_id=pk, debut=debut, fin=fin,
+                ventes_brutes=brut, taux_commission=taux, compte_bancaire=compte,
+                commission=part, net=brut - part,
+                nb_commandes=commandes, nb_lignes=lignes,
+            ))
+        ReleveVersement.objects.bulk_create(releves, batch_size=BATCH_SIZE)
+    return releves
+
+
+def releves_periode(debut=None, fin=None):
+    """Relevés dont la période est comprise dans [debut, fin]."""
+    qs = ReleveVersement.objects.order_by('debut', 'fournisseur_id')
+    filtres = Q()
+    if debut:
+        filtres &= Q(debut__gte=debut)
+    if fin:
+        filtres &= Q(fin__lte=fin)
+    return qs.filter(filtres)
+
+
+def exporter_csv(releves, sortie):
+    """Écrit le queryset `releves` en CSV dans le fichier texte `sortie` ; retourne le nombre de relevés."""
+    writer = csv.writer(sortie)
+    writer.writerow(ENTETE_RELEVES)
+    n = 0
+    for r in releves.select_related('fournisseur').iterator(chunk_size=BATCH_SIZE):
+        writer.writerow([
+            r.fournisseur_id, r.fournisseur.nom, r.debut.isoformat(), r.fin.isoformat(),
+            r.ventes_brutes, r.taux_commission, r.commission, r.net, r.compte_bancaire,
+            r.nb_commandes, r.nb_lignes,
+        ])
+        n += 1
+    return n
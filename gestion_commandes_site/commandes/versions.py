@@ -0,0 +1,30 @@
+"""Numéros de version stockés en base, partagés par tous les processus.
+
+Une donnée mémorisée hors de la base (rôle fournisseur en session, index des
+zones en mémoire, page catalogue dans le cache HTTP du client) garde la
+version lue au moment de son calcul ; une version
+différente signale qu'elle doit être recalculée. Contrairement au cache par
+défaut (LocMemCache, propre à chaque processus), une incrémentation est vue
+par tous les workers dès le commit, et elle est annulée avec la transaction
+qui l'a faite. Une lecture est une recherche par clé primaire.
+"""
+from django.db.models import F
+
+from .models import VersionDonnees
+
+# Produits (création, modification, suppression, import) : ETag de la page catalogue
+CATALOGUE = 'catalogue'
+
+
+def lire(cle):
+    """Version courante de `cle` (0 tant qu'elle n'a jamais été incrémentée)."""
+    return VersionDonnees.objects.filter(cle=cle).values_list('valeur', flat=True).first() or 0
+
+
+def incrementer(*cles):
+    """Incrémente les versions données (deux requêtes, quel que soit leur nombre)."""
+    cles = set(cles)
+    if not cles:
+        return
+    VersionDonnees.objects.bulk_create([VersionDonnees(cle=cle) for cle in cles], ignore_conflicts=True)
+    VersionDonnees.objects.filter(cle__in=cles).update(valeur=F('valeur') + 1)
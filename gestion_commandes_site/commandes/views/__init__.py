@@ -0,0 +1,30 @@
+"""Vues de l'application, regroupées par domaine :
+
+  - catalogue  : accueil, fiche produit, commande simple, inscription ;
+  - achat      : panier, checkout, commandes du client ;
+  - backoffice : listes / exports de commandes, fournisseurs, journal des statuts, rapports, métriques ;
+  - fournisseur: espace fournisseur (produits, commandes, livraisons, ventes) ;
+  - livraisons : mise à jour des livraisons, positions des livreurs, flux des statuts.
+
+Les dépendances lourdes utilisées par quelques vues seulement (csv,
+sérialiseurs, envoi d'e-mails, imports / exports, jobs) sont importées dans
+ces vues. Les noms sont réexportés ici : `views.index` reste valable dans urls.py.
+"""
+from .catalogue import signup, index, produit_detail, commander_produit
+from .achat import add_to_cart, remove_from_cart, cart_detail, checkout, mes_commandes
+from .backoffice import (
+    commandes_list, commande_detail, commandes_json, export_commandes_csv,
+    fournisseurs_list, fournisseur_create, fournisseur_edit, fournisseur_delete,
+    commande_timeline, transitions_statut, rapport_sla,
+    rapport_job_creer, rapport_job_detail, rapport_job_statut, rapport_job_telecharger, metrics,
+)
+from .fournisseur import (
+    DevenirFournisseurView, AttenteApprobationView, FournisseurDashboardView,
+    ProduitCreateView, ProduitImportView, ProduitUpdateView, ProduitDeleteView,
+    CommandesFournisseurListView, LivraisonFournisseurListView, VentesFournisseurView, MarquerPreteView,
+    MarquerNotificationsLuesView, PreferencesNotificationView,
+)
+from .livraisons import (
+    livraison_update, dashboard_livraison, modifier_statut_livraison, ping_positions, position_livraison,
+    flux_statuts,
+)
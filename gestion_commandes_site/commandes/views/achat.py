@@ -0,0 +1,158 @@
+from decimal import Decimal
+from datetime import datetime
+from functools import partial
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.shortcuts import get_object_or_404, render, redirect
+
+from .. import metriques, panier
+from ..archive import historique_commandes
+from ..models import Commande, Livraison, LigneCommande, CommandeFournisseur, EvenementStatut, Produit
+from ..notifications import enregistrer_nouvelle_commande, parts_fournisseurs
+from ..sessions import persister as persister_session
+from ..zones import tarif_livraison
+
+
+# === Panier (session) et checkout ===
+def _contenu_panier(request):
+    items = []
+    total = Decimal('0')
+    for p, q in panier.lignes(request):
+        subtotal = (p.prix or Decimal('0')) * q
+        total += subtotal
+        items.append({'produit': p, 'qty': q, 'subtotal': subtotal})
+    return items, total
+
+
+def add_to_cart(request, product_id):
+    produit = get_object_or_404(Produit.objects.only('pk'), pk=product_id, is_active=True)
+    qty = panier.quantite_saisie(request.POST.get('qty', 1))
+    if qty is None:
+        messages.error(request, f"Quantité invalide : indiquez un nombre entier entre 1 et {panier.QUANTITE_MAX}.")
+        return redirect('commandes:cart_detail')
+    panier.ajouter(request, produit.pk, qty)
+    return redirect('commandes:cart_detail')
+
+
+def remove_from_cart(request, product_id):
+    panier.retirer(request, product_id)
+    return redirect('commandes:cart_detail')
+
+
+def cart_detail(request):
+    items, total = _contenu_panier(request)
+    return render(request, 'commandes/cart.html', {'items': items, 'total': total})
+
+
+def _envoyer_confirmation(request, items, montant, total, adresse):
+    # Import différé : l'envoi d'e-mails n'est utile qu'en fin de commande
+    from django.core.mail import send_mail
+
+    subject = 'Confirmation de votre commande'
+    lines = [f'Bonjour {request.user.get_full_name() or request.user.username},', '', 'Merci pour votre commande. Voici le récapitulatif :', '']
+    for it in items:
+        lines.append(f"- {it['produit'].nom} x{it['qty']} — {it['subtotal']}")
+    lines.append('')
+    lines.append(f"Total (produits) : {sum(it['subtotal'] for it in items)}")
+    lines.append(f'Frais de livraison estimés : {montant}')
+    lines.append(f'Total général : {total}')
+    lines.append('')
+    lines.append(f'Adresse de livraison : {adresse}')
+    body = "\n".join(lines)
+    send_mail(subject, body, getattr(settings, 'DEFAULT_FROM_EMAIL', 'no-reply@localhost'), [request.user.email], fail_silently=True)
+
+
+@login_required
+def checkout(request):
+    items, total_products = _contenu_panier(request)
+    if not items:
+        if request.method == 'POST':
+            metriques.CHECKOUT.inc('panier_vide')
+        return redirect('commandes:cart_detail')
+
+    if request.method == 'POST':
+        adresse = request.POST.get('adresse', '')
+        methode = request.POST.get('methode', 'moto')
+        description = request.POST.get('description', '')
+        date_livraison_raw = request.POST.get('date_livraison')
+
+        # Montant toujours calculé côté serveur : tarif de zone, sinon forfait du transport
+        if methode not in Livraison.TARIFS:
+            messages.error(request, "Méthode de livraison inconnue.")
+            return redirect('commandes:checkout')
+        montant = tarif_livraison(adresse, methode)
+        if montant is None:
+            montant = Decimal(Livraison.TARIFS[methode])
+
+        date_livraison = None
+        if date_livraison_raw:
+            try:
+                date_livraison = datetime.fromisoformat(date_livraison_raw)
+            except Exception:
+                date_livraison = None
+
+        try:
+            with transaction.atomic():
+                # Une seule commande avec N lignes et une livraison
+                commande = Commande.objects.create(client=request.user if request.user.is_authenticated else None)
+                LigneCommande.objects.bulk_create([
+                    LigneCommande(commande=commande, produit=it['produit'], quantite=it['qty'], prix_unitaire=it['produit'].prix)
+                    for it in items
+                ])
+                # bulk_create ne passe pas par LigneCommande.save : liens fournisseur en une requête
+                CommandeFournisseur.lier(commande, [it['produit'].fournisseur_id for it in items])
+                livraison = Livraison.objects.create(
+                    commande=commande,
+                    transport=methode,
+                    adresse_livraison=adresse,
+                    montant=montant,
+                    description=description,
+                    date_livraison=date_livraison,
+                    statut='prep'
+                )
+                EvenementStatut.enregistrer(commande, livraison)
+                transaction.on_commit(partial(enregistrer_nouvelle_commande, commande.pk, parts_fournisseurs(items)))
+                panier.vider(request)
+            # Fin de commande : la session est recopiée en base
+            persister_session(request.session)
+        except Exception as e:
+            metriques.CHECKOUT.inc('erreur')
+            messages.error(request, f"Erreur lors du traitement de la commande : {e}")
+            return redirect('commandes:cart_detail')
+        metriques.CHECKOUT.inc('succes')
+
+        total = total_products + Decimal(montant)
+
+        try:
+            if getattr(request.user, 'email', None):
+                _envoyer_confirmation(request, items, montant, total, adresse)
+        except Exception:
+            pass
+
+        return render(request, 'commandes/checkout_success.html', {
+            'items': items,
+            'total': total,
+            'livraison_cost': montant,
+            'total_produits': total_products,
+            'adresse': adresse,
+        })
+
+    # Forfaits par transport (le tarif de zone, selon l'adresse, est appliqué à la validation)
+    transports = [(code, libelle, Livraison.TARIFS[code]) for code, libelle in Livraison.TRANSPORT_CHOICES]
+    return render(request, 'commandes/checkout.html', {
+        'items': items,
+        'total': total_products,
+        'transports': transports,
+    })
+
+
+def mes_commandes(request):
+    if not request.user.is_authenticated:
+        return redirect('commandes:login')
+    statut = request.GET.get('statut')
+    qs = historique_commandes(client=request.user, statut=statut, avec_lignes=True)
+    statut_choices = Commande._meta.get_field('statut').choices
+    return render(request, 'commandes/commandes_list.html', {'commandes': qs, 'statut_choices': statut_choices, 'mes': True})
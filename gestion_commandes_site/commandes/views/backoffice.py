@@ -0,0 +1,343 @@
+"""Back-office : listes et exports de commandes, fournisseurs, journal des statuts, rapports, métriques.
+
+Les dépendances propres aux exports et rapports (csv, sérialiseurs, jobs) sont
+importées à la première utilisation, pas au démarrage du worker.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.decorators import login_required
+from django.db.models import Exists, OuterRef, Max, Count, ProtectedError
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+
+from .. import metriques
+from ..archive import prefetch_lignes
+from ..forms import FournisseurForm
+from ..models import Fournisseur, Commande, LigneCommande, CommandeArchive, EvenementStatut, RapportJob
+from .commun import LIGNES_PREFETCH, _bornes_dates, _conditionnel
+
+
+# === Listes et détails des commandes (admin / back-office) ===
+def _commandes_qs(statut=None, q=None):
+    qs = Commande.objects.all().order_by('-date_commande')
+    if statut:
+        qs = qs.filter(statut=statut)
+    if q:
+        if q.isdigit():
+            qs = qs.filter(id=int(q))
+        else:
+            # EXISTS plutôt qu'une jointure + DISTINCT sur les lignes
+            qs = qs.filter(Exists(LigneCommande.objects.filter(commande=OuterRef('pk'), produit__nom__icontains=q)))
+    return qs
+
+
+def commandes_list(request):
+    qs = _commandes_qs(request.GET.get('statut'), request.GET.get('q')).prefetch_related(LIGNES_PREFETCH)
+    statut_choices = Commande._meta.get_field('statut').choices
+    return render(request, 'commandes/commandes_list.html', {'commandes': qs, 'statut_choices': statut_choices})
+
+
+def _etat_commande(request, pk):
+    row = Commande.objects.filter(pk=pk).values_list('updated_at', 'livraison__updated_at').first()
+    if row is None:
+        # Les commandes archivées ne changent plus ; sans validateur, une commande inexistante donne un 404
+        if CommandeArchive.objects.filter(pk=pk).exists():
+            return ('archive', pk), None
+        return None, None
+    return row, max(filter(None, row))
+
+
+@_conditionnel('commande', _etat_commande)
+def commande_detail(request, pk):
+    if not Commande.objects.filter(pk=pk).exists():
+        # Commande déplacée dans les archives
+        commande = get_object_or_404(CommandeArchive.objects.prefetch_related(prefetch_lignes(CommandeArchive)), pk=pk)
+    else:
+        commande = Commande.objects.prefetch_related(LIGNES_PREFETCH).get(pk=pk)
+    livraison = getattr(commande, 'livraison', None)
+    return render(request, 'commandes/commande_detail.html', {'commande': commande, 'livraison': livraison})
+
+
+def _etat_commandes_json(request):
+    agg = Commande.objects.aggregate(m=Max('updated_at'), n=Count('id'))
+    return (agg['n'], agg['m']), agg['m']
+
+
+@_conditionnel('commandes_json', _etat_commandes_json)
+def commandes_json(request):
+    from django.core import serializers
+
+    qs = Commande.objects.all()
+    json_data = serializers.serialize('json', qs, use_natural_foreign_keys=True)
+    return HttpResponse(json_data, content_type='application/json; charset=utf-8')
+
+
+def export_commandes_csv(request):
+    import csv
+
+    from ..exports import export_commandes
+
+    class _Tampon:
+        # csv.writer retourne ce qu'il écrit : chaque ligne est émise telle quelle
+        def write(self, valeur):
+            return valeur
+
+    # Commandes courantes + archivées, fusionnées par date ; une ligne CSV par ligne de commande.
+    # Réponse en flux : la mémoire reste bornée quel que soit l'historique.
+    entete, _, lots = export_commandes(statut=request.GET.get('statut'))
+    writer = csv.writer(_Tampon())
+
+    def contenu():
+        yield writer.writerow(entete)
+        for lignes in lots:
+            yield ''.join(writer.writerow(ligne) for ligne in lignes)
+
+    response = StreamingHttpResponse(contenu(), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="commandes.csv"'
+    return response
+
+
+# === CRUD Fournisseurs (admin-like) ===
+def fournisseurs_list(request):
+    fournisseurs = Fournisseur.objects.all().order_by('-id')
+    return render(request, 'commandes/fournisseurs_list.html', {"fournisseurs": fournisseurs})
+
+
+def fournisseur_create(request):
+    if request.method == 'POST':
+        form = FournisseurForm(request.POST)
+        if form.is_valid():
+            form.save()
+            messages.success(request, "Fournisseur ajouté.")
+            return redirect('commandes:fournisseurs-list')
+    else:
+        form = FournisseurForm()
+    return render(request, 'commandes/fournisseur_form.html', {'form': form, 'action': 'Ajouter'})
+
+
+def fournisseur_edit(request, pk):
+    fournisseur = get_object_or_404(Fournisseur, pk=pk)
+    if request.method == 'POST':
+        form = FournisseurForm(request.POST, instance=fournisseur)
+        if form.is_valid():
+            form.save()
+            messages.success(request, "Fournisseur mis à jour.")
+            return redirect('commandes:fournisseurs-list')
+    else:
+        form = FournisseurForm(instance=fournisseur)
+    return render(request, 'commandes/fournisseur_form.html', {'form': form, 'action': 'Éditer'})
+
+
+def fournisseur_delete(request, pk):
+    fournisseur = get_object_or_404(Fournisseur, pk=pk)
+    if request.method == 'POST':
+        try:
+            fournisseur.delete()
+        except ProtectedError:
+            # Les relevés de versement sont conservés : désactiver le fournisseur à la place
+            messages.error(
+                request,
+                "Ce fournisseur a des relevés de versement et ne peut pas être supprimé : retirez plutôt son approbation.",
+            )
+            return redirect('commandes:fournisseurs-list')
+        messages.success(request, "Fournisseur supprimé.")
+        return redirect('commandes:fournisseurs-list')
+    return render(request, 'commandes/fournisseur_confirm_delete.html', {'fournisseur': fournisseur})
+
+
+# === Journal des statuts : API JSON ===
+
+def _evenement_json(evt):
+    return {
+        'id': evt.id,
+        'entite': evt.get_entite_display().lower(),
+        'entite_id': evt.entite_id,
+        'statut': evt.statut_code,
+        'horodatage': evt.horodatage.isoformat(),
+    }
+
+
+def commande_timeline(request, pk):
+    """Historique des statuts d'une commande et de sa livraison (client de la commande ou staff)."""
+    user = request.user
+    if not user.is_staff:
+        # 404 plutôt que 403 : ne pas révéler l'existence des commandes des autres clients
+        if not user.is_authenticated or not (
+            Commande.objects.filter(pk=pk, client_id=user.pk).exists()
+            or CommandeArchive.objects.filter(pk=pk, client_id=user.pk).exists()
+        ):
+            raise Http404
+    evenements = EvenementStatut.timeline_commande(pk)
+    return JsonResponse({'commande': pk, 'evenements': [_evenement_json(e) for e in evenements]})
+
+
+@staff_member_required
+def transitions_statut(request):
+    """Nombre de transitions vers un statut sur une période.
+
+    Ex. : ?entite=livraison&statut=en_transit&debut=2025-01-01T10:00&fin=2025-01-01T11:00
+    """
+    entites = {label.lower(): code for code, label in EvenementStatut.ENTITE_CHOICES}
+    entite = entites.get(request.GET.get('entite', ''))
+    statut = request.GET.get('statut', '')
+    try:
+        debut = datetime.fromisoformat(request.GET['debut'])
+        fin = datetime.fromisoformat(request.GET['fin'])
+    except (KeyError, ValueError):
+        return JsonResponse({'erreur': "paramètres debut et fin (ISO 8601) obligatoires"}, status=400)
+    if entite is None or statut not in EvenementStatut.STATUTS[entite]:
+        return JsonResponse({'erreur': "entite ou statut inconnu"}, status=400)
+    if timezone.is_naive(debut):
+        debut = timezone.make_aware(debut)
+    if timezone.is_naive(fin):
+        fin = timezone.make_aware(fin)
+    total = EvenementStatut.entre(entite, statut, debut, fin).count()
+    return JsonResponse({
+        'entite': request.GET['entite'], 'statut': statut,
+        'debut': debut.isoformat(), 'fin': fin.isoformat(), 'total': total,
+    })
+
+
+# === Rapport SLA des livraisons (back-office) ===
+
+def _duree_heures(duree):
+    return '' if duree is None else round(duree.total_seconds() / 3600, 2)
+
+
+def _taux(valeur):
+    return '' if valeur is None else round(valeur * 100, 1)
+
+
+@staff_member_required
+def rapport_sla(request):
+    """Délais, ponctualité et retours des livraisons ; ?debut=AAAA-MM-JJ&fin=AAAA-MM-JJ (30 derniers jours par défaut)."""
+    from ..rapports import rapport_sla as calculer_rapport_sla
+
+    aujourd_hui = timezone.localdate()
+    try:
+        jour_debut = datetime.strptime(request.GET['debut'], '%Y-%m-%d').date() if request.GET.get('debut') else aujourd_hui - timedelta(days=30)
+        jour_fin = datetime.strptime(request.GET['fin'], '%Y-%m-%d').date() if request.GET.get('fin') else aujourd_hui
+    except ValueError:
+        messages.error(request, "Dates invalides (format AAAA-MM-JJ).")
+        jour_debut, jour_fin = aujourd_hui - timedelta(days=30), aujourd_hui
+    if jour_fin < jour_debut:
+        jour_debut, jour_fin = jour_fin, jour_debut
+    # Jour de fin inclus : borne exclusive au lendemain minuit
+    debut = timezone.make_aware(datetime.combine(jour_debut, time.min))
+    fin = timezone.make_aware(datetime.combine(jour_fin + timedelta(days=1), time.min))
+    rapport = calculer_rapport_sla(debut, fin)
+
+    if request.GET.get('format') == 'csv':
+        import csv
+
+        response = HttpResponse(content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="sla_{jour_debut}_{jour_fin}.csv"'
+        writer = csv.writer(response)
+        writer.writerow([
+            'groupe', 'valeur', 'total', 'livrees', 'retournees', 'mediane_heures', 'p90_heures',
+            'taux_a_l_heure_pct', 'taux_retour_pct',
+        ])
+        sections = [('global', [rapport['global']]), ('transport', rapport['par_transport']),
+                    ('fournisseur', rapport['par_fournisseur'])]
+        for groupe, lignes in sections:
+            for ligne in lignes:
+                writer.writerow([
+                    groupe, ligne.libelle, ligne.total, ligne.livrees, ligne.retournees,
+                    _duree_heures(ligne.mediane), _duree_heures(ligne.p90),
+                    _taux(ligne.taux_a_l_heure), _taux(ligne.taux_retour),
+                ])
+        return response
+
+    return render(request, 'commandes/rapport_sla.html', {
+        'rapport': rapport,
+        'jour_debut': jour_debut,
+        'jour_fin': jour_fin,
+    })
+
+
+# === Jobs de rapport (exports en arrière-plan) ===
+
+def _parametres_job(request, type):
+    """Paramètres d'un job selon son type, ou None si l'utilisateur n'y a pas droit."""
+    if type == 'commandes_csv':
+        if not request.user.is_staff:
+            return None
+        return {'statut': request.POST.get('statut') or None}
+    if type == 'ventes_fournisseur_csv':
+        profile = request.fournisseur
+        if not (profile and profile.approved):
+            return None
+        debut, fin = _bornes_dates(request.POST.get('start'), request.POST.get('end'))
+        return {
+            'fournisseur_id': profile.pk,
+            'debut': debut.isoformat() if debut else None,
+            'fin': fin.isoformat() if fin else None,
+        }
+    return None
+
+
+@login_required
+def rapport_job_creer(request):
+    from ..jobs import creer_job, LimiteJobsAtteinte
+
+    if request.method != 'POST':
+        return redirect('commandes:index')
+    type = request.POST.get('type')
+    parametres = _parametres_job(request, type)
+    if parametres is None:
+        messages.error(request, "Rapport non autorisé.")
+        return HttpResponseRedirect(request.META.get('HTTP_REFERER', reverse_lazy('commandes:index')))
+    try:
+        job = creer_job(request.user, type, parametres)
+    except LimiteJobsAtteinte:
+        messages.error(request, "Trop de rapports en cours : attendez la fin des exports précédents.")
+        return HttpResponseRedirect(request.META.get('HTTP_REFERER', reverse_lazy('commandes:index')))
+    return redirect('commandes:rapport-job', pk=job.pk)
+
+
+def _job_json(job):
+    termine = job.statut == 'termine' and job.fichier
+    return {
+        'id': job.pk,
+        'type': job.type,
+        'statut': job.statut,
+        'progression': job.progression,
+        'erreur': job.erreur,
+        'telechargement': reverse('commandes:rapport-job-telecharger', args=[job.pk]) if termine else None,
+        'expires_at': job.expires_at.isoformat() if job.expires_at else None,
+    }
+
+
+@login_required
+def rapport_job_detail(request, pk):
+    job = get_object_or_404(RapportJob, pk=pk, user=request.user)
+    return render(request, 'commandes/rapport_job.html', {'job': job})
+
+
+@login_required
+def rapport_job_statut(request, pk):
+    """Progression du job, interrogée périodiquement par la page du rapport."""
+    job = get_object_or_404(RapportJob, pk=pk, user=request.user)
+    return JsonResponse(_job_json(job))
+
+
+@login_required
+def rapport_job_telecharger(request, pk):
+    job = get_object_or_404(RapportJob, pk=pk, user=request.user, statut='termine')
+    if not job.fichier or not job.fichier.storage.exists(job.fichier.name):
+        raise Http404("Rapport expiré.")
+    nom = f"{job.type}_{job.created_at:%Y%m%d_%H%M}.csv"
+    return FileResponse(job.fichier.open('rb'), as_attachment=True, filename=nom, content_type='text/csv')
+
+
+def metrics(request):
+    """Métriques au format Prometheus, réservées aux adresses METRIQUES_IPS_AUTORISEES."""
+    if request.META.get('REMOTE_ADDR') not in getattr(settings, 'METRIQUES_IPS_AUTORISEES', ['127.0.0.1', '::1']):
+        return HttpResponse(status=403)
+    texte = metriques.registre.exposer(metriques.jauges_files_attente())
+    return HttpResponse(texte, content_type='text/plain; version=0.0.4; charset=utf-8')
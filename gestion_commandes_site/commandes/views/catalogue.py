@@ -0,0 +1,83 @@
+from django.contrib import messages
+from django.contrib.auth import login
+from django.contrib.auth.forms import UserCreationForm
+from django.db import transaction
+from django.shortcuts import render, get_object_or_404, redirect
+
+from .. import versions
+from ..forms import CommandeForm
+from ..models import Produit, Commande, LigneCommande, EvenementStatut
+from .commun import _conditionnel
+
+
+# === Inscription basique (signup) ===
+def signup(request):
+    if request.method == 'POST':
+        form = UserCreationForm(request.POST)
+        if form.is_valid():
+            user = form.save()
+            login(request, user)
+            return redirect('commandes:index')
+    else:
+        form = UserCreationForm()
+    return render(request, 'commandes/signup.html', {'form': form})
+
+
+def _etat_catalogue(request, *args, **kwargs):
+    # Version incrémentée à chaque écriture de produit (signals.py, imports.py) : une lecture par clé
+    return (versions.lire(versions.CATALOGUE),), None
+
+
+def _etat_produit(request, slug):
+    # La page affiche aussi les coordonnées du fournisseur
+    produit = (
+        Produit.objects.filter(slug=slug, is_active=True)
+        .values_list('updated_at', 'fournisseur__updated_at').first()
+    )
+    if produit is None:
+        return None, None
+    last_commande = _last_commande_qs(slug).values_list('pk', 'updated_at').first()
+    last_modified = max(filter(None, [*produit, last_commande and last_commande[1]]))
+    return (produit, last_commande), last_modified
+
+
+def _catalogue_qs():
+    return Produit.objects.filter(is_active=True).order_by('-created_at')
+
+
+def _last_commande_qs(slug):
+    # Tri sur l'id de commande (croissant avec date_commande) : lu dans l'index (produit, commande)
+    return Commande.objects.filter(lignes__produit__slug=slug).exclude(statut='livree').order_by('-lignes__commande_id')
+
+
+# === Pages produits / détails / commande simple ===
+@_conditionnel('catalogue', _etat_catalogue)
+def index(request):
+    return render(request, 'commandes/index.html', {"produits": _catalogue_qs()})
+
+
+@_conditionnel('produit', _etat_produit)
+def produit_detail(request, slug):
+    produit = get_object_or_404(Produit, slug=slug, is_active=True)
+    last_commande = _last_commande_qs(slug).first()
+    return render(request, 'commandes/detail.html', {"produit": produit, "last_commande": last_commande})
+
+
+def commander_produit(request, slug):
+    produit = get_object_or_404(Produit, slug=slug, is_active=True)
+    if request.method == 'POST':
+        form = CommandeForm(request.POST)
+        if form.is_valid():
+            quantite = form.cleaned_data['quantite']
+            if quantite < produit.quantite_minimale:
+                messages.error(request, f"La quantité minimale pour ce produit est {produit.quantite_minimale}.")
+                return redirect('commandes:produit-detail', slug=produit.slug)
+            with transaction.atomic():
+                commande = Commande.objects.create(client=request.user if request.user.is_authenticated else None)
+                LigneCommande.objects.create(commande=commande, produit=produit, quantite=quantite)
+                EvenementStatut.enregistrer(commande)
+            messages.success(request, f"Commande #{commande.id} créée.")
+            return redirect('commandes:commande-detail', pk=commande.pk)
+    else:
+        form = CommandeForm(initial={'quantite': produit.quantite_minimale})
+    return render(request, 'commandes/commander_form.html', {'produit': produit, 'form': form})
@@ -0,0 +1,59 @@
+import hashlib
+from datetime import datetime, time, timedelta
+
+from django.contrib import messages
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from ..archive import prefetch_lignes
+from ..models import Commande
+
+
+# Lignes d'une commande avec produit et fournisseur (une requête pour toute la page)
+LIGNES_PREFETCH = prefetch_lignes(Commande)
+
+
+# === Validateurs HTTP (ETag / Last-Modified) ===
+# Calculés par des agrégats indexés sur updated_at, ou lus dans un numéro de
+# version (commandes/versions.py) : une page inchangée
+# répond 304 sans exécuter la vue ni rendre le template.
+
+def _validateurs(request, cle, calcul):
+    """Mémorise (etag, last_modified) sur la requête : etag_func et last_modified_func partagent la requête SQL."""
+    cache_attr = f'_validateurs_{cle}'
+    if not hasattr(request, cache_attr):
+        etag, last_modified = None, None
+        # Un message flash en attente doit être affiché : pas de 304
+        if not len(messages.get_messages(request)):
+            parts, last_modified = calcul(request)
+            if parts is not None:
+                user_id = request.user.pk if request.user.is_authenticated else 0
+                etag = hashlib.md5(repr((user_id,) + tuple(parts)).encode()).hexdigest()
+        setattr(request, cache_attr, (etag, last_modified))
+    return getattr(request, cache_attr)
+
+
+def _conditionnel(cle, calcul):
+    """Décorateur `condition` avec validateurs calculés une seule fois par requête."""
+    return condition(
+        etag_func=lambda request, *a, **kw: _validateurs(request, cle, lambda r: calcul(r, *a, **kw))[0],
+        last_modified_func=lambda request, *a, **kw: _validateurs(request, cle, lambda r: calcul(r, *a, **kw))[1],
+    )
+
+
+def _bornes_dates(start, end):
+    """Convertit les filtres YYYY-MM-DD en bornes datetime [debut, fin[ (None si absent ou invalide).
+
+    Filtrer sur un intervalle plutôt que sur `__date` permet d'utiliser l'index.
+    """
+    bornes = []
+    for raw, decalage in ((start, 0), (end, 1)):
+        borne = None
+        if raw:
+            try:
+                jour = datetime.fromisoformat(raw).date() + timedelta(days=decalage)
+                borne = timezone.make_aware(datetime.combine(jour, time.min))
+            except Exception:
+                borne = None
+        bornes.append(borne)
+    return bornes
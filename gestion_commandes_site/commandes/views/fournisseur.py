@@ -0,0 +1,301 @@
+import heapq
+from operator import attrgetter, itemgetter
+
+from django.contrib import messages
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import transaction
+from django.db.models import Count, Sum, F, Prefetch, Q
+from django.http import HttpResponseRedirect
+from django.shortcuts import get_object_or_404, redirect
+from django.urls import reverse_lazy
+from django.views import View
+from django.views.generic import CreateView, UpdateView, DeleteView, ListView, TemplateView, FormView
+
+from ..forms import FournisseurForm, PreferenceNotificationForm, ProduitForm, ProduitImportForm
+from ..mixins import FournisseurRequiredMixin
+from ..models import (
+    Produit, Fournisseur, Commande, Livraison, LigneCommande, CommandeFournisseur, EvenementStatut,
+    PreferenceNotification, CommandeArchive, CommandeFournisseurArchive, LigneCommandeArchive, LivraisonArchive,
+)
+from ..notifications import marquer_lues
+from .commun import _bornes_dates
+
+
+# === Fournisseur / Dashboard / CRUD produit pour fournisseur ===
+
+def _filtres_appartenance(prefix, profile, statut, start, end):
+    """Construit les filtres sur CommandeFournisseur (à passer dans un seul appel à filter())."""
+    filtres = {f'{prefix}__fournisseur': profile}
+    if statut:
+        filtres[f'{prefix}__statut'] = statut
+    debut, fin = _bornes_dates(start, end)
+    if debut:
+        filtres[f'{prefix}__date_commande__gte'] = debut
+    if fin:
+        filtres[f'{prefix}__date_commande__lt'] = fin
+    return filtres
+
+
+class DevenirFournisseurView(LoginRequiredMixin, CreateView):
+    model = Fournisseur
+    form_class = FournisseurForm
+    template_name = "fournisseur/devenir.html"
+    success_url = reverse_lazy("commandes:attente_approbation")
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.fournisseur:
+            return redirect('commandes:dashboard')
+        return super().dispatch(request, *args, **kwargs)
+
+    def form_valid(self, form):
+        form.instance.user = self.request.user
+        # approved par défaut False -> attente admin
+        return super().form_valid(form)
+
+
+class AttenteApprobationView(LoginRequiredMixin, TemplateView):
+    template_name = "fournisseur/attente.html"
+
+
+class FournisseurDashboardView(FournisseurRequiredMixin, ListView):
+    """
+    Vue tableau de bord fournisseur utilisée par urls.py :
+    path('fournisseur/dashboard/', views.FournisseurDashboardView.as_view(), name='dashboard')
+    """
+    template_name = "fournisseur/dashboard.html"
+    context_object_name = "produits"
+
+    def get_queryset(self):
+        # Retourne uniquement les produits du fournisseur connecté
+        return Produit.objects.filter(fournisseur=self.request.fournisseur).order_by('-created_at')
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        profile = self.request.fournisseur
+
+        # KPIs (via les tables d'appartenance indexées, commandes courantes et archivées)
+        total_produits = Produit.objects.filter(fournisseur=profile).count()
+        commandes_total = (
+            CommandeFournisseur.objects.filter(fournisseur=profile).count()
+            + CommandeFournisseurArchive.objects.filter(fournisseur=profile).count()
+        )
+
+        qs_liv = Livraison.objects.filter(commande__liens_fournisseurs__fournisseur=profile)
+        livraisons_total = (
+            qs_liv.count()
+            + LivraisonArchive.objects.filter(commande__liens_fournisseurs__fournisseur=profile).count()
+        )
+        livraisons_en_attente = qs_liv.filter(statut__in=['prep', 'en_transit']).count()
+
+        total_qte = sum(
+            model.objects.filter(produit__fournisseur=profile).aggregate(total_qte=Sum('quantite'))['total_qte'] or 0
+            for model in (LigneCommande, LigneCommandeArchive)
+        )
+
+        ctx.update({
+            'kpi_total_produits': total_produits,
+            'kpi_commandes_total': commandes_total,
+            'kpi_livraisons_total': livraisons_total,
+            'kpi_livraisons_en_attente': livraisons_en_attente,
+            'kpi_total_qte_vendue': total_qte,
+        })
+        return ctx
+
+
+class ProduitCreateView(FournisseurRequiredMixin, CreateView):
+    model = Produit
+    form_class = ProduitForm
+    template_name = "fournisseur/produit_form.html"
+    success_url = reverse_lazy('commandes:dashboard')
+
+    def form_valid(self, form):
+        form.instance.fournisseur = self.request.fournisseur
+        return super().form_valid(form)
+
+
+class ProduitImportView(FournisseurRequiredMixin, FormView):
+    """Import en masse (CSV / NDJSON) du catalogue du fournisseur connecté."""
+    form_class = ProduitImportForm
+    template_name = "fournisseur/produit_import.html"
+
+    def form_valid(self, form):
+        # Import différé : module utilisé seulement lors d'un import
+        from ..imports import importer_produits, detecter_format
+
+        fichier = form.cleaned_data['fichier']
+        rapport = importer_produits(
+            self.request.fournisseur,
+            fichier,
+            format=form.cleaned_data['format'] or detecter_format(fichier.name),
+            mettre_a_jour=form.cleaned_data['mettre_a_jour'],
+        )
+        return self.render_to_response(self.get_context_data(form=form, rapport=rapport))
+
+
+class ProduitUpdateView(FournisseurRequiredMixin, UpdateView):
+    model = Produit
+    form_class = ProduitForm
+    template_name = "fournisseur/produit_form.html"
+    success_url = reverse_lazy('commandes:dashboard')
+
+    def get_queryset(self):
+        return Produit.objects.filter(fournisseur=self.request.fournisseur)
+
+
+class ProduitDeleteView(FournisseurRequiredMixin, DeleteView):
+    model = Produit
+    template_name = "fournisseur/produit_confirm_delete.html"
+    success_url = reverse_lazy('commandes:dashboard')
+
+    def get_queryset(self):
+        # Restreindre la suppression aux produits du fournisseur connecté
+        return Produit.objects.filter(fournisseur=self.request.fournisseur)
+
+
+def _commandes_fournisseur_qs(profile, statut=None, start=None, end=None, modele=Commande):
+    # Un seul filter() : toutes les conditions portent sur la même ligne d'appartenance
+    # (CommandeFournisseur, ou CommandeFournisseurArchive pour modele=CommandeArchive)
+    return (
+        modele.objects.filter(**_filtres_appartenance('liens_fournisseurs', profile, statut, start, end))
+        .select_related('livraison')
+        .order_by('-liens_fournisseurs__date_commande')
+    )
+
+
+def _livraisons_fournisseur_qs(profile, statut=None, start=None, end=None):
+    livs = Livraison.objects.filter(**_filtres_appartenance('commande__liens_fournisseurs', profile, None, start, end))
+    if statut:
+        livs = livs.filter(statut=statut)
+    return livs.select_related('commande').order_by('-commande__liens_fournisseurs__date_commande')
+
+
+def _ventes_fournisseur_qs(profile, modele=LigneCommande):
+    # Agréger les ventes à partir des lignes de commande, au prix payé sur chaque
+    # ligne ; les lignes sans prix (antérieures à prix_unitaire) sont comptées à part
+    return modele.objects.filter(produit__fournisseur=profile) \
+        .values('produit_id', 'produit__nom') \
+        .annotate(total_qte=Sum('quantite')) \
+        .annotate(total_montant=Sum(F('quantite') * F('prix_unitaire'))) \
+        .annotate(lignes_sans_prix=Count('id', filter=Q(prix_unitaire__isnull=True))) \
+        .order_by('-total_qte')
+
+
+def _ventes_fournisseur(profile):
+    """Ventes par produit, lignes courantes et archivées additionnées."""
+    ventes = {}
+    for modele in (LigneCommande, LigneCommandeArchive):
+        for vente in _ventes_fournisseur_qs(profile, modele):
+            cumul = ventes.setdefault(
+                vente['produit_id'], {**vente, 'total_qte': 0, 'total_montant': 0, 'lignes_sans_prix': 0},
+            )
+            for cle in ('total_qte', 'total_montant', 'lignes_sans_prix'):
+                cumul[cle] += vente[cle] or 0
+    return sorted(ventes.values(), key=itemgetter('total_qte'), reverse=True)
+
+
+class CommandesFournisseurListView(FournisseurRequiredMixin, ListView):
+    template_name = "fournisseur/commandes.html"
+    context_object_name = "commandes"
+
+    def get_queryset(self):
+        # Nous ne l'utilisons pas directement; nous préparons une liste dans get_context_data.
+        return Commande.objects.none()
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        profile = self.request.fournisseur
+
+        statut = self.request.GET.get('statut')
+        start = self.request.GET.get('start')  # YYYY-MM-DD
+        end = self.request.GET.get('end')      # YYYY-MM-DD
+
+        # Construire une liste adaptée au template: [{'commande': c, 'lignes': [LigneCommande, ...]}]
+        # Les lignes du fournisseur sont préchargées en une seule requête par table ;
+        # commandes courantes et archivées sont fusionnées par date décroissante
+        flux = []
+        for modele in (Commande, CommandeArchive):
+            lignes_fournisseur = Prefetch(
+                'lignes',
+                queryset=modele._meta.get_field('lignes').related_model.objects
+                .filter(produit__fournisseur=profile).select_related('produit'),
+                to_attr='lignes_fournisseur',
+            )
+            flux.append(
+                _commandes_fournisseur_qs(profile, statut, start, end, modele).prefetch_related(lignes_fournisseur)
+            )
+        data_list = [
+            {'commande': c, 'lignes': c.lignes_fournisseur}
+            for c in heapq.merge(*flux, key=attrgetter('date_commande'), reverse=True)
+        ]
+
+        ctx.update({
+            'commandes': data_list,
+            'filter_statut': statut or '',
+            'filter_start': start or '',
+            'filter_end': end or '',
+            'statut_choices': Commande._meta.get_field('statut').choices,
+        })
+        return ctx
+
+
+class LivraisonFournisseurListView(FournisseurRequiredMixin, ListView):
+    template_name = "fournisseur/livraisons.html"
+    context_object_name = "livraisons"
+
+    def get_queryset(self):
+        get = self.request.GET
+        return _livraisons_fournisseur_qs(self.request.fournisseur, get.get('statut'), get.get('start'), get.get('end'))
+
+
+class VentesFournisseurView(FournisseurRequiredMixin, ListView):
+    """ Vue pour voir les ventes agrégées par produit pour un fournisseur """
+    template_name = "fournisseur/ventes.html"
+    context_object_name = "ventes"
+
+    def get_queryset(self):
+        return _ventes_fournisseur(self.request.fournisseur)
+
+
+class PreferencesNotificationView(FournisseurRequiredMixin, UpdateView):
+    """Réglages des e-mails récapitulatifs de nouvelles commandes."""
+    form_class = PreferenceNotificationForm
+    template_name = "fournisseur/notifications.html"
+    success_url = reverse_lazy('commandes:dashboard')
+
+    def get_object(self, queryset=None):
+        profile = self.request.fournisseur
+        return (
+            PreferenceNotification.objects.filter(fournisseur=profile).first()
+            or PreferenceNotification(fournisseur=profile)
+        )
+
+    def form_valid(self, form):
+        messages.success(self.request, "Préférences de notification enregistrées.")
+        return super().form_valid(form)
+
+
+class MarquerNotificationsLuesView(FournisseurRequiredMixin, View):
+    """Remet à zéro le compteur de nouvelles commandes (action explicite, jamais sur un GET)."""
+    def post(self, request):
+        marquer_lues(request.fournisseur.pk)
+        return redirect('commandes:commandes-fournisseur')
+
+
+# Action fournisseur : marquer prête / en cours
+class MarquerPreteView(FournisseurRequiredMixin, View):
+    def post(self, request, pk):
+        commande = get_object_or_404(Commande, pk=pk)
+        profile = request.fournisseur
+        # Vérifie que le fournisseur a bien un produit dans cette commande
+        is_related = CommandeFournisseur.objects.filter(commande=commande, fournisseur=profile).exists()
+        if not is_related:
+            messages.error(request, "Action non autorisée.")
+            return redirect('commandes:commandes-fournisseur')
+
+        if commande.statut != 'en_cours':
+            commande.statut = 'en_cours' # ou un autre statut pertinent
+            with transaction.atomic():
+                commande.save()
+                EvenementStatut.enregistrer(commande)
+        messages.success(request, f"La commande #{commande.id} a été marquée comme prête.")
+        return HttpResponseRedirect(request.META.get('HTTP_REFERER', reverse_lazy('commandes:commandes-fournisseur')))
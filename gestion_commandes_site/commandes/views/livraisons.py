@@ -0,0 +1,179 @@
+import json
+import time
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.shortcuts import render, get_object_or_404, redirect
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from .. import flux, positions
+from ..forms import LivraisonForm
+from ..models import Commande, Livraison, EvenementStatut
+
+
+# === Mise à jour / création d'une livraison (back-office) ===
+def livraison_update(request, commande_pk):
+    commande = get_object_or_404(Commande, pk=commande_pk)
+    # État et événement journalisé sont écrits ensemble ou pas du tout
+    with transaction.atomic():
+        livraison, created = Livraison.objects.get_or_create(commande=commande)
+        if created:
+            EvenementStatut.enregistrer(livraison)
+    if request.method == 'POST':
+        # Statuts avant modification (le formulaire modifie l'instance pendant la validation)
+        anciens = (commande.statut, livraison.statut)
+        form = LivraisonForm(request.POST, instance=livraison)
+        if form.is_valid():
+            liv = form.save(commit=False)
+            # timestamps automatiques et synchronisation du statut commande
+            if liv.statut == 'en_transit' and not liv.assigned_at:
+                liv.assigned_at = timezone.now()
+                commande.statut = 'en_cours'
+            if liv.statut == 'livree':
+                if not liv.delivered_at:
+                    liv.delivered_at = timezone.now()
+                commande.statut = 'livree'
+            if liv.statut == 'prep':
+                commande.statut = 'en_attente'
+            if liv.statut == 'retournee':
+                commande.statut = 'annulee'
+            with transaction.atomic():
+                liv.save()
+                commande.save()
+                EvenementStatut.enregistrer(*[
+                    obj for obj, ancien in zip((commande, liv), anciens) if obj.statut != ancien
+                ])
+            messages.success(request, "Statut / infos de livraison mises à jour.")
+            return redirect('commandes:commande-detail', pk=commande.pk)
+    else:
+        form = LivraisonForm(instance=livraison)
+    return render(request, 'commandes/livraison_form.html', {
+        'form': form,
+        'commande': commande,
+        # À transmettre à l'application du livreur pour l'envoi des positions
+        'jeton_livreur': positions.jeton_livreur(livraison.pk) if request.user.is_staff else None,
+    })
+
+
+# Livraisons en cours affichées au plus ; les statuts sont ensuite tenus à jour par le flux SSE
+DASHBOARD_LIMITE = 200
+
+
+def dashboard_livraison(request):
+    livraisons = (
+        Livraison.objects.exclude(statut__in=Livraison.STATUTS_TERMINES)
+        .only('id', 'commande_id', 'transport', 'adresse_livraison', 'statut')
+        .order_by('-id')[:DASHBOARD_LIMITE]
+    )
+    return render(request, "commandes/livraison_dashboard.html", {
+        "livraisons": livraisons,
+        "limite": DASHBOARD_LIMITE,
+    })
+
+
+def modifier_statut_livraison(request, pk, statut):
+    if not Livraison.statut_valide(statut):
+        raise Http404("Statut de livraison inconnu.")
+    livraison = get_object_or_404(Livraison, pk=pk)
+    livraison.update_status(statut)
+    messages.success(request, f"Statut mis à jour : {statut}")
+    return redirect("commandes:dashboard_livraison")
+
+
+# === Flux des changements de statut (SSE) ===
+def _dernier_id(request):
+    valeur = request.headers.get('Last-Event-ID') or request.GET.get('depuis')
+    try:
+        return int(valeur) if valeur else None
+    except ValueError:
+        return None
+
+
+async def flux_statuts(request):
+    """Changements de statut en Server-Sent Events.
+
+    ?commande=<pk> : commande et livraison de la commande (client de la
+    commande ou staff) ; sans paramètre : toutes les livraisons (staff).
+    """
+    user = await request.auser()
+    commande_pk = request.GET.get('commande')
+    if commande_pk:
+        try:
+            commande_pk = int(commande_pk)
+        except ValueError:
+            return JsonResponse({'erreur': "commande invalide"}, status=400)
+        client_id = await Commande.objects.filter(pk=commande_pk).values_list('client_id', flat=True).afirst()
+        if client_id is None and not await Commande.objects.filter(pk=commande_pk).aexists():
+            return JsonResponse({'erreur': "commande inconnue"}, status=404)
+        if not (user.is_staff or (user.is_authenticated and client_id == user.pk)):
+            return JsonResponse({'erreur': "accès refusé"}, status=403)
+        cles = {(EvenementStatut.ENTITE_COMMANDE, commande_pk)}
+        cles.update([
+            (EvenementStatut.ENTITE_LIVRAISON, pk)
+            async for pk in Livraison.objects.filter(commande_id=commande_pk).values_list('pk', flat=True)
+        ])
+        filtre = {'cles': cles}
+    elif user.is_staff:
+        filtre = {'entite': EvenementStatut.ENTITE_LIVRAISON}
+    else:
+        return JsonResponse({'erreur': "accès refusé"}, status=403)
+
+    dernier = _dernier_id(request)
+    entetes = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    if isinstance(request, ASGIRequest):
+        contenu = flux.evenements(dernier, **filtre)
+    else:
+        # Serveur WSGI : pas de connexion longue, le navigateur se reconnecte (scrutation)
+        contenu = await flux.reponse_courte(dernier, **filtre)
+    return StreamingHttpResponse(contenu, content_type='text/event-stream', headers=entetes)
+
+
+# === Positions des livreurs ===
+@csrf_exempt
+@require_POST
+def ping_positions(request, pk):
+    """Lot de positions envoyé par l'application du livreur.
+
+    En-tête `Authorization: Bearer <jeton>` (positions.jeton_livreur) ;
+    corps JSON `{"points": [[horodatage_ms, latitude, longitude], ...]}`.
+    """
+    entete = request.META.get('HTTP_AUTHORIZATION', '')
+    if not entete.startswith('Bearer ') or positions.livraison_du_jeton(entete[7:]) != pk:
+        return JsonResponse({'erreur': "jeton invalide"}, status=401)
+    try:
+        corps = json.loads(request.body)
+        points = positions.valider(
+            corps.get('points') if isinstance(corps, dict) else None,
+            int(time.time() * 1000),
+            getattr(settings, 'POSITIONS_MAX_POINTS', 500),
+        )
+    except ValueError as e:
+        # json.JSONDecodeError et PositionsInvalides sont des ValueError
+        return JsonResponse({'erreur': str(e)}, status=400)
+    if not positions.livraison_active(pk):
+        return JsonResponse({'erreur': "livraison inconnue ou terminée"}, status=409)
+    positions.enregistrer(pk, points)
+    return JsonResponse({'points': len(points)}, status=201)
+
+
+@require_GET
+def position_livraison(request, pk):
+    """Dernière position du livreur d'une commande (client de la commande ou staff) ; ?trace=1 : tout le trajet."""
+    livraison = get_object_or_404(Livraison.objects.select_related('commande').only(
+        'id', 'statut', 'commande__client_id'), commande_id=pk)
+    if not (request.user.is_staff or (request.user.is_authenticated and livraison.commande.client_id == request.user.pk)):
+        return JsonResponse({'erreur': "accès refusé"}, status=403)
+
+    def _point(p):
+        return {'horodatage': p[0], 'latitude': p[1], 'longitude': p[2]}
+
+    derniere = positions.derniere_position(livraison.pk)
+    donnees = {'commande': pk, 'statut': livraison.statut, 'position': _point(derniere) if derniere else None}
+    if request.GET.get('trace'):
+        donnees['trace'] = [_point(p) for p in positions.trace(livraison.pk)]
+    return JsonResponse(donnees)
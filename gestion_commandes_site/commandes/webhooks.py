@@ -0,0 +1,226 @@
+"""Webhooks sortants : changements de statut postés aux partenaires.
+
+Les changements de statut sont déjà journalisés dans EvenementStatut
+(livraison_update, MarquerPreteView, modifier_statut_livraison, checkout...).
+La commande `envoyer_webhooks` :
+
+  1. planifie : pour chaque abonnement actif, lit le journal après son
+     curseur et regroupe jusqu'à WEBHOOKS_LOT_MAX événements dans un
+     EnvoiWebhook (un seul POST), puis avance le curseur, sans dépasser les
+     événements de moins de JOURNAL_DELAI_COMMIT secondes (un id inférieur
+     peut encore être validé, voir EvenementStatut.ids_stables) ;
+  2. réserve les envois dus, au plus un par abonnement (le plus ancien non
+     envoyé) pour que chaque partenaire reçoive les lots dans l'ordre ;
+  3. poste les lots dans un pool de threads (concurrence bornée), sans
+     accès à la base depuis les threads ;
+  4. enregistre les résultats : succès, nouvel essai avec délai exponentiel,
+     ou abandon (« mort ») après WEBHOOKS_MAX_TENTATIVES essais.
+
+Chaque POST porte l'en-tête X-Webhook-Signature : `t=<horodatage>,v1=<hex>`,
+HMAC-SHA256 de `<horodatage>.<corps>` avec le secret de l'abonnement, et
+X-Webhook-Id (identifiant du lot, stable entre les essais).
+"""
+import hashlib
+import hmac
+import json
+import random
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import AbonnementWebhook, EnvoiWebhook, EvenementStatut, Livraison, LivraisonArchive
+
+ENTETE_SIGNATURE = 'X-Webhook-Signature'
+ENTETE_ID = 'X-Webhook-Id'
+ENTITES = {code: label.lower() for code, label in EvenementStatut.ENTITE_CHOICES}
+
+
+def _reglage(nom, defaut):
+    return getattr(settings, nom, defaut)
+
+
+# --- Signature ---
+
+def signer(secret, horodatage, corps):
+    """Valeur de l'en-tête X-Webhook-Signature pour `corps` (octets)."""
+    mac = hmac.new(secret.encode(), f'{horodatage}.'.encode() + corps, hashlib.sha256).hexdigest()
+    return f't={horodatage},v1={mac}'
+
+
+def verifier_signature(secret, entete, corps, tolerance=300, maintenant=None):
+    """Vérification côté partenaire : signature valide et horodatage récent (secondes)."""
+    try:
+        champs = dict(partie.split('=', 1) for partie in entete.split(','))
+        horodatage = int(champs['t'])
+    except (KeyError, ValueError):
+        return False
+    maintenant = time.time() if maintenant is None else maintenant
+    if abs(maintenant - horodatage) > tolerance:
+        return False
+    attendu = signer(secret, horodatage, corps).split('v1=', 1)[1]
+    return hmac.compare_digest(attendu, champs.get('v1', ''))
+
+
+# --- Planification : journal -> lots ---
+
+def _commandes_des_livraisons(livraison_ids):
+    """{livraison_id: commande_id}, livraisons courantes et archivées."""
+    livraison_ids = set(livraison_ids)
+    if not livraison_ids:
+        return {}
+    commandes = dict(Livraison.objects.filter(pk__in=livraison_ids).values_list('pk', 'commande_id'))
+    manquantes = livraison_ids - commandes.keys()
+    if manquantes:
+        commandes.update(LivraisonArchive.objects.filter(pk__in=manquantes).values_list('pk', 'commande_id'))
+    return commandes
+
+
+def _evenement_json(evt, commandes):
+    entite = ENTITES[evt.entite]
+    commande_id = evt.entite_id if evt.entite == EvenementStatut.ENTITE_COMMANDE else commandes.get(evt.entite_id)
+    return {
+        'id': evt.pk,
+        'type': f'{entite}.statut',
+        'entite': entite,
+        'entite_id': evt.entite_id,
+        'commande_id': commande_id,
+        'statut': evt.statut_code,
+        'horodatage': evt.horodatage.isoformat(),
+    }
+
+
+def planifier(lot_max=None):
+    """Crée les lots des événements non encore mis en file ; retourne le nombre de lots créés."""
+    lot_max = lot_max or _reglage('WEBHOOKS_LOT_MAX', 100)
+    plafond = EvenementStatut.ids_stables().first() or 0
+    crees = 0
+    for abonnement in AbonnementWebhook.objects.filter(actif=True, curseur__lt=plafond):
+        curseur = abonnement.curseur
+        while curseur < plafond:
+            qs = EvenementStatut.objects.filter(pk__gt=curseur, pk__lte=plafond)
+            if abonnement.entite:
+                qs = qs.filter(entite=abonnement.entite)
+            evenements = list(qs.order_by('pk')[:lot_max])
+            # Lot incomplet : tout le journal jusqu'au plafond a été vu
+            nouveau = evenements[-1].pk if len(evenements) == lot_max else plafond
+            with transaction.atomic():
+                # Avance conditionnelle : deux planificateurs concurrents ne dupliquent pas un lot
+                if not AbonnementWebhook.objects.filter(pk=abonnement.pk, curseur=curseur).update(curseur=nouveau):
+                    break
+                if evenements:
+                    commandes = _commandes_des_livraisons(
+                        e.entite_id for e in evenements if e.entite == EvenementStatut.ENTITE_LIVRAISON
+                    )
+                    corps = json.dumps(
+                        {'abonnement': abonnement.pk, 'evenements': [_evenement_json(e, commandes) for e in evenements]},
+                        separators=(',', ':'),
+                    )
+                    EnvoiWebhook.objects.create(
+                        abonnement=abonnement, corps=corps, nb_evenements=len(evenements),
+                        premier_evenement=evenements[0].pk, dernier_evenement=evenements[-1].pk,
+                    )
+                    crees += 1
+            curseur = nouveau
+    return crees
+
+
+# --- Réservation et envoi ---
+
+def reserver_envois(limite):
+    """Passe à « en cours » au plus `limite` envois dus ; un seul par abonnement, le plus ancien."""
+    tetes = (
+        EnvoiWebhook.objects.filter(statut__in=EnvoiWebhook.STATUTS_ACTIFS)
+        .values('abonnement_id').annotate(premier=Min('pk')).values('premier')
+    )
+    candidats = (
+        EnvoiWebhook.objects.filter(statut='en_attente', prochain_essai__lte=timezone.now(), pk__in=tetes)
+        .order_by('prochain_essai').values_list('pk', flat=True)[:limite]
+    )
+    ids = []
+    for pk in candidats:
+        if EnvoiWebhook.objects.filter(pk=pk, statut='en_attente').update(statut='en_cours', started_at=timezone.now()):
+            ids.append(pk)
+    return ids
+
+
+def poster(url, corps, entetes, timeout):
+    """POST HTTP (exécuté dans un thread, sans base) ; retourne (code HTTP ou None, erreur)."""
+    requete = urllib.request.Request(url, data=corps, headers=entetes, method='POST')
+    try:
+        with urllib.request.urlopen(requete, timeout=timeout) as reponse:
+            return reponse.status, ''
+    except urllib.error.HTTPError as e:
+        return e.code, f"HTTP {e.code}"
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        return None, str(getattr(e, 'reason', e))
+
+
+def delai_essai(tentatives):
+    """Délai avant l'essai suivant : exponentiel, plafonné, avec ±20 % d'aléa pour étaler les reprises."""
+    base = _reglage('WEBHOOKS_DELAI_BASE', 30)
+    delai = min(base * 2 ** (tentatives - 1), _reglage('WEBHOOKS_DELAI_MAX', 3600))
+    return timedelta(seconds=delai * random.uniform(0.8, 1.2))
+
+
+def enregistrer_resultat(envoi, code, erreur):
+    maintenant = timezone.now()
+    tentatives = envoi.tentatives + 1
+    champs = {'tentatives': tentatives, 'code_http': code, 'erreur': erreur[:1000]}
+    if code is not None and 200 <= code < 300:
+        champs.update(statut='envoye', envoye_at=maintenant)
+    elif tentatives >= _reglage('WEBHOOKS_MAX_TENTATIVES', 8):
+        champs.update(statut='mort')
+    else:
+        champs.update(statut='en_attente', prochain_essai=maintenant + delai_essai(tentatives))
+    EnvoiWebhook.objects.filter(pk=envoi.pk, statut='en_cours').update(**champs)
+    return champs['statut']
+
+
+def _entetes(envoi, corps):
+    return {
+        'Content-Type': 'application/json',
+        'User-Agent': 'commandes-webhooks/1',
+        ENTETE_ID: str(envoi.pk),
+        ENTETE_SIGNATURE: signer(envoi.abonnement.secret, int(time.time()), corps),
+    }
+
+
+def traiter(executor, limite):
+    """Réserve, poste en parallèle (executor) et enregistre au plus `limite` envois ; retourne {statut: nombre}."""
+    ids = reserver_envois(limite)
+    if not ids:
+        return {}
+    timeout = _reglage('WEBHOOKS_TIMEOUT', 10)
+    futures = {}
+    for envoi in EnvoiWebhook.objects.filter(pk__in=ids).select_related('abonnement'):
+        corps = envoi.corps.encode()
+        futures[executor.submit(poster, envoi.abonnement.url, corps, _entetes(envoi, corps), timeout)] = envoi
+    resultats = {}
+    for future in as_completed(futures):
+        code, erreur = future.result()
+        statut = enregistrer_resultat(futures[future], code, erreur)
+        resultats[statut] = resultats.get(statut, 0) + 1
+    return resultats
+
+
+def liberer_envois_bloques(delai=None):
+    """Remet en file les envois « en cours » depuis trop longtemps (worker arrêté pendant l'envoi)."""
+    if delai is None:
+        delai = timedelta(seconds=_reglage('WEBHOOKS_TIMEOUT', 10) * 10)
+    return EnvoiWebhook.objects.filter(statut='en_cours', started_at__lt=timezone.now() - delai).update(
+        statut='en_attente', prochain_essai=timezone.now(),
+    )
+
+
+def renvoyer(envois):
+    """Remet en file des envois abandonnés (file « morte »), avec un compteur d'essais à zéro."""
+    return envois.filter(statut='mort').update(
+        statut='en_attente', tentatives=0, prochain_essai=timezone.now(), erreur='',
+    )
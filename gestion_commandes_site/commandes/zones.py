@@ -0,0 +1,161 @@
+"""Tarifs de livraison par zone.
+
+Les zones et leurs tarifs sont chargés une fois dans un index en mémoire :
+un arbre de préfixes sur les chiffres des codes postaux et un dictionnaire
+des noms de villes / quartiers normalisés. Résoudre une adresse ne fait
+ensuite aucune requête SQL, hormis la lecture de la version de l'index :
+stockée en base (commandes/versions.py, comme pour les rôles fournisseur),
+elle signale à tous les processus qu'une zone ou un tarif a changé ; l'index
+est alors reconstruit à la prochaine résolution.
+"""
+import re
+import threading
+import unicodedata
+
+from . import versions
+
+VERSION_KEY = 'zones-livraison'
+# Codes postaux : groupes de 3 à 6 chiffres isolés
+CODE_POSTAL = re.compile(r'(?<!\d)\d{3,6}(?!\d)')
+FIN = object()
+
+_index = None
+_verrou = threading.Lock()
+
+
+def normaliser(texte):
+    """Minuscules sans accents ni ponctuation, en liste de mots ('Saint-Denis' -> ['saint', 'denis'])."""
+    texte = unicodedata.normalize('NFKD', texte or '')
+    texte = ''.join(c for c in texte if not unicodedata.combining(c)).lower()
+    return re.sub(r'[^a-z0-9]+', ' ', texte).split()
+
+
+class IndexZones:
+    """Résolution adresse -> zone -> tarif, construite à partir des zones actives."""
+
+    def __init__(self, zones, tarifs):
+        self.trie = {}
+        self.villes = {}
+        self.mots_max = 0
+        self.tarifs = {(t.zone_id, t.transport): t.montant for t in tarifs}
+        # Zones triées par priorité : la première inscrite garde la clé
+        for zone in zones:
+            for prefixe in zone.liste_prefixes():
+                noeud = self.trie
+                for chiffre in prefixe:
+                    noeud = noeud.setdefault(chiffre, {})
+                noeud.setdefault(FIN, zone.pk)
+            for ville in zone.liste_villes():
+                mots = tuple(normaliser(ville))
+                if mots:
+                    self.villes.setdefault(mots, zone.pk)
+                    self.mots_max = max(self.mots_max, len(mots))
+
+    def _par_code_postal(self, adresse):
+        """Zone du plus long préfixe correspondant au dernier code postal reconnu."""
+        for code in reversed(CODE_POSTAL.findall(adresse)):
+            noeud, trouvee = self.trie, None
+            for chiffre in code:
+                noeud = noeud.get(chiffre)
+                if noeud is None:
+                    break
+                trouvee = noeud.get(FIN, trouvee)
+            if trouvee is not None:
+                return trouvee
+        return None
+
+    def _par_ville(self, adresse):
+        """Zone du plus long nom de ville présent, en partant de la fin de l'adresse."""
+        mots = normaliser(adresse)
+        for n in range(min(self.mots_max, len(mots)), 0, -1):
+            for i in range(len(mots) - n, -1, -1):
+                zone_id = self.villes.get(tuple(mots[i:i + n]))
+                if zone_id is not None:
+                    return zone_id
+        return None
+
+    def zone(self, adresse):
+        """Identifiant de la zone de `adresse`, ou None ; le code postal prime sur le nom."""
+        if not adresse:
+            return None
+        zone_id = self._par_code_postal(adresse) if self.trie else None
+        if zone_id is None and self.villes:
+            zone_id = self._par_ville(adresse)
+        return zone_id
+
+    def tarif(self, adresse, transport):
+        """Montant (Decimal) pour ce transport dans la zone de l'adresse, ou None."""
+        zone_id = self.zone(adresse)
+        if zone_id is None:
+            return None
+        return self.tarifs.get((zone_id, transport))
+
+
+def version_zones():
+    return versions.lire(VERSION_KEY)
+
+
+def invalider_zones():
+    """À appeler après le commit d'une modification de zone ou de tarif (voir signals.py)."""
+    versions.incrementer(VERSION_KEY)
+
+
+def charger_index():
+    from .models import TarifZone, ZoneLivraison
+
+    zones = ZoneLivraison.objects.filter(actif=True).order_by('ordre', 'pk')
+    tarifs = TarifZone.objects.filter(zone__actif=True).only('zone_id', 'transport', 'montant')
+    return IndexZones(list(zones), list(tarifs))
+
+
+def index_zones():
+    """Index courant, reconstruit si la version en base a changé."""
+    global _index
+    version = version_zones()
+    courant = _index
+    if courant is None or courant[0] != version:
+        with _verrou:
+            courant = _index
+            if courant is None or courant[0] != version:
+                courant = _index = (version, charger_index())
+    return courant[1]
+
+
+def tarif_livraison(adresse, transport):
+    """Tarif de zone pour l'adresse et le transport, ou None (le tarif forfaitaire s'applique)."""
+    return index_zones().tarif(adresse, transport)
+
+
+def repricer_livraisons(statuts=('prep',), batch_size=1000, dry_run=False):
+    """Recalcule le montant des livraisons non parties selon les zones actuelles.
+
+    Parcours par tranches de clé primaire ; seules les livraisons dont
+    l'adresse relève d'une zone tarifée et dont le montant change sont
+    réécrites (bulk_update). Retourne (examinées, modifiées).
+    """
+    from .models import Livraison
+
+    index = index_zones()
+    qs = (
+        Livraison.objects.filter(statut__in=statuts, transport__isnull=False)
+        .only('id', 'adresse_livraison', 'transport', 'montant')
+        .order_by('pk')
+    )
+    examinees = modifiees = 0
+    dernier = 0
+    while True:
+        lot = list(qs.filter(pk__gt=dernier)[:batch_size])
+        if not lot:
+            break
+        dernier = lot[-1].pk
+        examinees += len(lot)
+        a_modifier = []
+        for liv in lot:
+            montant = index.tarif(liv.adresse_livraison, liv.transport)
+            if montant is not None and liv.montant != montant:
+                liv.montant = montant
+                a_modifier.append(liv)
+        modifiees += len(a_modifier)
+        if a_modifier and not dry_run:
+            Livraison.objects.bulk_update(a_modifier, ['montant'])
+    return examinees, modifiees
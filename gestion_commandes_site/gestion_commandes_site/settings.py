@@ -28,19 +28,6 @@ DEBUG = True
 ALLOWED_HOSTS = []
 
 
-# ... (autres imports)
-from decimal import Decimal
-
-# ... (le reste de vos settings)
-
-# Définition centralisée des coûts de transport
-TRANSPORT_COSTS = {
-    'camion': Decimal('12000'),
-    'moto': Decimal('4000'),
-    'velo': Decimal('1500'),
-}
-
-
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -53,10 +40,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'commandes.middleware.MetriquesMiddleware',
+    'commandes.middleware.ProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'commandes.middleware.FournisseurProfileMiddleware',
+    'commandes.middleware.ThrottleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -74,11 +65,23 @@ TEMPLATES = [
                 'django.template.context_processors.media',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'commandes.context_processors.fournisseur',
             ],
         },
     },
 ]
 
+if not DEBUG:
+    # Production : gabarits compilés une fois par processus (chargeur en cache,
+    # sans vérification des fichiers modifiés)
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'gestion_commandes_site.wsgi.application'
 
 
@@ -155,3 +158,81 @@ LOGIN_REDIRECT_URL = 'commandes:index'
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
+
+# Limitation de débit par nom d'URL (voir commandes/throttling.py)
+THROTTLE_RATES = {
+    'add_to_cart': {'ip': '60/min', 'user': '30/min'},
+    'checkout': {'ip': '20/min', 'user': '5/min', 'methodes': ['POST']},
+    'signup': {'ip': '10/h', 'methodes': ['POST']},
+}
+
+# Profilage des requêtes (voir commandes/profilage.py) : fraction tirée au sort,
+# 0 = seules les requêtes portant l'en-tête X-Profilage signé sont profilées.
+PROFILAGE_TAUX = 0
+PROFILAGE_DOSSIER = BASE_DIR.parent / "profils"
+PROFILAGE_MAX_PAR_VUE = 50
+
+# Cache par défaut avec comptage des hits / miss (commandes/cache.py)
+CACHES = {
+    'default': {
+        'BACKEND': 'commandes.cache.LocMemCache',
+    },
+    # Fragments de gabarits ({% cache ... using="fragments" %}) : clés versionnées par
+    # updated_at, donc sans invalidation ; cache local au processus pour éviter
+    # un aller-retour réseau par ligne affichée.
+    'fragments': {
+        'BACKEND': 'commandes.cache.LocMemCache',
+        'TIMEOUT': 600,
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+
+# Sessions : avec un cache 'sessions' partagé entre les processus (Redis, Memcached),
+# moteur « cache d'abord » : écriture en base à la connexion, en fin de commande et
+# avant expiration (voir commandes/sessions.py). Sans cache partagé, sessions en base :
+# avec LocMemCache, chaque worker aurait ses propres sessions. Par exemple :
+#   CACHES['sessions'] = {'BACKEND': 'commandes.cache.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379/1'}
+if 'sessions' in CACHES:
+    SESSION_ENGINE = 'commandes.sessions'
+    SESSION_CACHE_ALIAS = 'sessions'
+else:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+
+# Métriques Prometheus (voir commandes/metriques.py) : /metrics n'est servi
+# qu'aux adresses listées. Avec plusieurs workers, METRIQUES_DOSSIER désigne un
+# dossier partagé, à vider au redémarrage du serveur.
+METRIQUES_IPS_AUTORISEES = ['127.0.0.1', '::1']
+METRIQUES_DOSSIER = None
+METRIQUES_INTERVALLE = 5
+
+# Récapitulatifs e-mail des nouvelles commandes fournisseurs (commande
+# envoyer_recapitulatifs) : délai par défaut, en minutes, quand le fournisseur
+# n'a pas enregistré de préférences. SITE_URL préfixe les liens des e-mails.
+NOTIFICATIONS_INTERVALLE_MINUTES = 15
+SITE_URL = ''
+
+# Positions des livreurs (commandes/positions.py) : durée de validité des jetons
+# livreur (secondes) et nombre maximal de points par envoi.
+POSITIONS_VALIDITE_JETON = 86400
+POSITIONS_MAX_POINTS = 500
+
+# Journal des statuts lu par curseur (webhooks, flux SSE) : un événement n'est
+# dépassé qu'après ce délai (secondes), pour ne pas sauter un id validé en
+# retard. Doit dépasser la durée des transactions qui journalisent un statut
+# et l'écart d'horloge entre les serveurs d'application.
+JOURNAL_DELAI_COMMIT = 5
+
+# Flux SSE des statuts (commandes/flux.py) : scrutation du journal (secondes),
+# commentaire de maintien de connexion, durée maximale d'une connexion.
+FLUX_INTERVALLE = 0.5
+FLUX_MAINTIEN = 15
+FLUX_DUREE_MAX = 300
+
+# Webhooks sortants (commandes/webhooks.py, commande envoyer_webhooks) : délai
+# d'un POST (secondes), essais avant abandon, délai de reprise exponentiel
+# (base et plafond, secondes) et nombre maximal d'événements par POST.
+WEBHOOKS_TIMEOUT = 10
+WEBHOOKS_MAX_TENTATIVES = 8
+WEBHOOKS_DELAI_BASE = 30
+WEBHOOKS_DELAI_MAX = 3600
+WEBHOOKS_LOT_MAX = 100